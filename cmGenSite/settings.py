@@ -104,6 +104,52 @@ DATABASES = {
     }
 }
 
+# Story generation
+# The model name is part of the background cache key, so changing it
+# regenerates backgrounds rather than serving ones from the old model.
+
+LLM_BASE_URL = os.getenv('LLM_BASE_URL', 'http://192.168.0.123:1234/v1')
+LLM_API_KEY = os.getenv('LLM_API_KEY', 'lm-studio')
+LLM_MODEL = os.getenv('LLM_MODEL', 'your-model')
+LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', 120))  # seconds per request
+LLM_CONNECT_TIMEOUT = float(os.getenv('LLM_CONNECT_TIMEOUT', 5))
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', 2))
+LLM_BREAKER_THRESHOLD = 3  # consecutive failures before failing fast
+LLM_BREAKER_RESET = 30  # seconds before trying the model server again
+LLM_SECTION_CONCURRENCY = int(os.getenv('LLM_SECTION_CONCURRENCY', 4))  # 1 = single prompt
+
+BACKGROUND_CACHE_TTL = int(os.getenv('BACKGROUND_CACHE_TTL', 60 * 60 * 24 * 30))  # seconds
+BACKGROUND_CACHE_MEMORY_SIZE = 256  # entries kept in each process
+BACKGROUND_CACHE_MAX_ROWS = 5000  # entries kept in the ClubBackground table
+# Workers coalesce generations of the same club through a Postgres session
+# advisory lock. Turn this off behind a transaction-mode pooler (e.g. the
+# Supabase pooler on port 6543), where session locks are not reliable.
+BACKGROUND_LOCK_ACROSS_WORKERS = os.getenv('BACKGROUND_LOCK_ACROSS_WORKERS', '1') == '1'
+BACKGROUND_LOCK_WAIT = 30  # seconds to wait for another worker before generating anyway
+
+# Ready-made stories kept topped up by `manage.py fill_story_pool`
+STORY_POOL_SIZE = int(os.getenv('STORY_POOL_SIZE', 20))
+
+# Asynchronous generation queue processed by `manage.py run_generation_workers`
+GENERATION_QUEUE_MAX = int(os.getenv('GENERATION_QUEUE_MAX', 50))  # pending jobs before rejecting
+GENERATION_QUEUE_RETRY_AFTER = 10  # seconds suggested to rejected clients
+GENERATION_STREAM_SECONDS = 25  # longest a job status stream stays open
+GENERATION_STREAM_RETRY_MS = 1000  # EventSource reconnect delay after it closes
+
+# FIFA player import (`manage.py import_players`); EUR wage conversion when the
+# CSV has no USD or GBP wage columns
+PLAYER_IMPORT_USD_RATE = os.getenv('PLAYER_IMPORT_USD_RATE', '1.08')
+PLAYER_IMPORT_GBP_RATE = os.getenv('PLAYER_IMPORT_GBP_RATE', '0.85')
+
+# Stories per page on My Stories
+MY_STORIES_PAGE_SIZE = 20
+
+# All-time story leaderboards, cached per story data_version in each process
+LEADERBOARD_SIZE = 10  # players per leaderboard unless ?limit= asks otherwise
+LEADERBOARD_MAX_SIZE = 50
+LEADERBOARD_MIN_APPEARANCES = 10  # career appearances to be ranked by average rating
+LEADERBOARD_CACHE_SIZE = 256
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
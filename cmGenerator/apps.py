@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class CmgeneratorConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'cmGenerator'
+
+    def ready(self):
+        # Load the reference data files once per process
+        from .utils.catalog import catalog
+        catalog.load()
+
+        from . import signals  # noqa: F401
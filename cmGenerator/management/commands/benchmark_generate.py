@@ -0,0 +1,145 @@
+import json
+import math
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import CookieJar
+from urllib.parse import urlencode, urljoin, urlparse
+from django.core.management.base import BaseCommand, CommandError
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks the /generate/ endpoint of a running server under concurrency "
+        "and reports latency percentiles and throughput. Pair with fake_llm_server "
+        "to measure without the real model."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000/generate/')
+        parser.add_argument('--requests', type=int, default=50, help="Total requests to send")
+        parser.add_argument('--concurrency', type=int, default=8, help="Requests in flight at once")
+        parser.add_argument(
+            '--mode', choices=['json', 'stream', 'async'], default='json',
+            help="Plain JSON response, server-sent events, or queued job",
+        )
+        parser.add_argument(
+            '--refresh', action='store_true',
+            help="Bypass the pool and background cache on every request (needs a staff login)",
+        )
+        parser.add_argument('--username', help="Log in as this user before sending requests")
+        parser.add_argument('--password', default='')
+        parser.add_argument(
+            '--job-timeout', type=float, default=120.0,
+            help="Seconds to wait for a queued job before counting it as timed out",
+        )
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1:
+            raise CommandError("--concurrency must be at least 1")
+        if options['refresh'] and not options['username']:
+            # The server ignores ?refresh from anyone but staff
+            raise CommandError("--refresh needs --username and --password of a staff user")
+
+        cookies = CookieJar()
+        opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(cookies))
+
+        def csrf_token():
+            return next((c.value for c in cookies if c.name == 'csrftoken'), '')
+
+        # /generate/ is CSRF protected, so pick up a token from the home page first
+        try:
+            opener.open(urljoin(options['url'], '/')).read()
+        except urllib.error.URLError as e:
+            raise CommandError(f"Could not reach {options['url']}: {e}")
+
+        if options['username']:
+            login_url = urljoin(options['url'], '/login/')
+            form = urlencode({'username': options['username'], 'password': options['password'],
+                              'csrfmiddlewaretoken': csrf_token()}).encode()
+            request = urllib.request.Request(login_url, data=form, headers={'Referer': login_url})
+            with opener.open(request) as response:
+                # A failed login renders the form again instead of redirecting
+                if urlparse(response.geturl()).path == '/login/':
+                    raise CommandError(f"Could not log in as {options['username']}")
+        token = csrf_token()  # Rotated by the login
+
+        params = {'stream': options['mode'] == 'stream', 'async': options['mode'] == 'async',
+                  'refresh': options['refresh']}
+        query = '&'.join(f"{name}=1" for name, enabled in params.items() if enabled)
+        url = f"{options['url']}?{query}" if query else options['url']
+
+        def send(_):
+            request = urllib.request.Request(url, data=b'', method='POST', headers={
+                'X-CSRFToken': token,
+                'Referer': options['url'],
+            })
+            started = time.perf_counter()
+            try:
+                with opener.open(request) as response:
+                    body = response.read(1)
+                    first_byte = time.perf_counter() - started
+                    body += response.read()
+                    status = response.status
+            except urllib.error.HTTPError as e:
+                return {'status': e.code, 'latency': time.perf_counter() - started, 'ttfb': None}
+            except urllib.error.URLError:
+                return {'status': None, 'latency': time.perf_counter() - started, 'ttfb': None}
+
+            if options['mode'] == 'async' and status == 202:
+                try:
+                    status = poll(urljoin(options['url'], json.loads(body)['status_url']), started)
+                except urllib.error.HTTPError as e:
+                    status = e.code
+                except (urllib.error.URLError, ValueError, KeyError):
+                    status = None
+            return {'status': status, 'latency': time.perf_counter() - started, 'ttfb': first_byte}
+
+        def poll(job_url, started):
+            """Waits for a queued job, returning 200, 500 or 'timeout'."""
+            # Without a worker running the job never finishes
+            deadline = started + options['job_timeout']
+            while time.perf_counter() < deadline:
+                with opener.open(job_url) as response:
+                    job = json.loads(response.read())
+                if job['status'] in ('DONE', 'FAILED'):
+                    return 200 if job['status'] == 'DONE' else 500
+                time.sleep(0.1)
+            return 'timeout'
+
+        self.stdout.write(
+            f"Sending {options['requests']} {options['mode']} requests to {url} "
+            f"with concurrency {options['concurrency']}"
+        )
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            results = list(executor.map(send, range(options['requests'])))
+        elapsed = time.perf_counter() - started
+
+        ok = [r for r in results if r['status'] in (200, 202)]
+        latencies = [r['latency'] for r in ok]
+        ttfbs = [r['ttfb'] for r in ok if r['ttfb'] is not None]
+        statuses = {}
+        for r in results:
+            statuses[r['status']] = statuses.get(r['status'], 0) + 1
+
+        self.stdout.write(f"Completed {len(ok)}/{len(results)} in {elapsed:.2f}s "
+                          f"({len(ok) / elapsed:.2f} req/s)")
+        self.stdout.write(f"Status codes: {statuses}")
+        for label, values in (('latency', latencies), ('first byte', ttfbs)):
+            self.stdout.write(
+                f"{label:>10}: p50 {percentile(values, 50) * 1000:.0f}ms  "
+                f"p95 {percentile(values, 95) * 1000:.0f}ms  "
+                f"p99 {percentile(values, 99) * 1000:.0f}ms  "
+                f"max {max(values, default=0) * 1000:.0f}ms"
+            )
@@ -0,0 +1,152 @@
+import json
+import random
+import re
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from django.core.management.base import BaseCommand
+
+FILLER = (
+    "Founded by railway workers, the club rose through the regional leagues "
+    "and built a fierce rivalry with its neighbours across the river."
+).split()
+
+
+def fake_background(prompt, tokens_per_section):
+    """Builds an HTML answer with one paragraph per <h4> heading in the prompt."""
+    headings = re.findall(r'<h4>(.*?)</h4>', prompt) or ['Club Backstory:']
+    tokens = []
+    for heading in headings:
+        tokens.append(f"<h4>{heading}</h4>\n<p>")
+        tokens.extend(f"{random.choice(FILLER)} " for _ in range(tokens_per_section))
+        tokens.append("</p>\n")
+    return tokens
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs a local OpenAI-compatible chat completions server that stands in "
+        "for LM Studio, for development and benchmarking without the real model."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=1234)
+        parser.add_argument(
+            '--latency', type=float, default=0.5,
+            help="Seconds before the first token (prompt processing time)",
+        )
+        parser.add_argument(
+            '--tokens-per-second', type=float, default=50.0,
+            help="Generation speed once the first token has been sent",
+        )
+        parser.add_argument(
+            '--tokens', type=int, default=120,
+            help="Tokens generated per <h4> section in the prompt",
+        )
+        parser.add_argument(
+            '--failure-rate', type=float, default=0.0,
+            help="Fraction of requests answered with HTTP 500 (0 to 1)",
+        )
+
+    def handle(self, *args, **options):
+        command = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # Keep-alive, like the real server
+
+            def log_message(self, format, *args):
+                if options['verbosity'] > 1:
+                    command.stdout.write(format % args)
+
+            def send_json(self, status, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path.rstrip('/').endswith('/models'):
+                    self.send_json(200, {'object': 'list', 'data': [{'id': 'fake-model', 'object': 'model'}]})
+                else:
+                    self.send_json(404, {'error': {'message': 'Not found'}})
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                request = json.loads(self.rfile.read(length) or b'{}')
+                if not self.path.rstrip('/').endswith('/chat/completions'):
+                    self.send_json(404, {'error': {'message': 'Not found'}})
+                    return
+                if random.random() < options['failure_rate']:
+                    self.send_json(500, {'error': {'message': 'Simulated model failure'}})
+                    return
+
+                prompt = ' '.join(m.get('content', '') for m in request.get('messages', []))
+                tokens = fake_background(prompt, options['tokens'])
+                model = request.get('model', 'fake-model')
+                completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+                delay = 1.0 / options['tokens_per_second'] if options['tokens_per_second'] > 0 else 0
+
+                time.sleep(options['latency'])
+                if request.get('stream'):
+                    self.stream(completion_id, model, tokens, delay)
+                else:
+                    time.sleep(delay * len(tokens))
+                    self.send_json(200, {
+                        'id': completion_id,
+                        'object': 'chat.completion',
+                        'created': int(time.time()),
+                        'model': model,
+                        'choices': [{
+                            'index': 0,
+                            'message': {'role': 'assistant', 'content': ''.join(tokens)},
+                            'finish_reason': 'stop',
+                        }],
+                        'usage': {'prompt_tokens': len(prompt.split()), 'completion_tokens': len(tokens),
+                                  'total_tokens': len(prompt.split()) + len(tokens)},
+                    })
+
+            def stream(self, completion_id, model, tokens, delay):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+
+                def send(data):
+                    payload = f"data: {data}\n\n".encode()
+                    self.wfile.write(f"{len(payload):x}\r\n".encode() + payload + b"\r\n")
+                    self.wfile.flush()
+
+                for index, token in enumerate(tokens + [None]):
+                    chunk = {
+                        'id': completion_id,
+                        'object': 'chat.completion.chunk',
+                        'created': int(time.time()),
+                        'model': model,
+                        'choices': [{
+                            'index': 0,
+                            'delta': {'content': token} if token is not None else {},
+                            'finish_reason': None if token is not None else 'stop',
+                        }],
+                    }
+                    send(json.dumps(chunk))
+                    if token is not None and index:
+                        time.sleep(delay)
+                send('[DONE]')
+                self.wfile.write(b"0\r\n\r\n")
+
+        server = self.server = ThreadingHTTPServer((options['host'], options['port']), Handler)
+        server.daemon_threads = True
+        self.stdout.write(
+            f"Fake LLM listening on http://{options['host']}:{server.server_port}/v1 "
+            f"(latency {options['latency']}s, {options['tokens_per_second']} tok/s, "
+            f"failure rate {options['failure_rate']})"
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
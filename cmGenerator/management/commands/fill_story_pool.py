@@ -0,0 +1,47 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from cmGenerator.utils.story_pool import pool_stats, prune, refill
+
+
+class Command(BaseCommand):
+    help = "Keeps the pool of pre-generated stories topped up for /generate/."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size', type=int, default=None,
+            help="Number of ready stories to keep (default: STORY_POOL_SIZE)",
+        )
+        parser.add_argument(
+            '--interval', type=float, default=5.0,
+            help="Seconds to wait between pool checks",
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help="Fill the pool once and exit instead of running forever",
+        )
+
+    def handle(self, *args, **options):
+        size = options['size'] or settings.STORY_POOL_SIZE
+
+        while True:
+            try:
+                generated = refill(size)
+                pruned = prune()
+            except Exception as e:
+                # Keep the worker alive through LLM or database hiccups
+                self.stderr.write(self.style.ERROR(f"Refill failed: {e}"))
+                generated = pruned = 0
+
+            if generated or pruned or options['once']:
+                stats = pool_stats()
+                self.stdout.write(
+                    f"Generated {generated}, pruned {pruned}. "
+                    f"Depth {stats['depth']}/{size}, "
+                    f"refill {stats['refill_per_minute']}/min, "
+                    f"served {stats['served_per_minute']}/min"
+                )
+
+            if options['once']:
+                return
+            time.sleep(options['interval'])
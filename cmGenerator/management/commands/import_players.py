@@ -0,0 +1,74 @@
+import json
+import os
+import time
+from django.core.management.base import BaseCommand, CommandError
+from cmGenerator.utils.player_import import DEFAULT_SOURCE, import_players
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports a FIFA player CSV into Player, upserting on player_id in chunks. "
+        "Progress is checkpointed after every committed chunk, so an interrupted "
+        "import resumes where it stopped when run again with the same file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="FIFA player CSV, e.g. players_23.csv")
+        parser.add_argument(
+            '--source', default=DEFAULT_SOURCE,
+            help="Stored in Player.import_source, e.g. FIFA23_CSV_IMPORT",
+        )
+        parser.add_argument('--chunk-size', type=int, default=2000, help="Rows per upsert")
+        parser.add_argument(
+            '--restart', action='store_true',
+            help="Ignore any checkpoint and import the whole file",
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f"No such file: {path}")
+
+        # The checkpoint is only trusted for the same file, unchanged
+        checkpoint_path = f"{path}.checkpoint"
+        stat = os.stat(path)
+        fingerprint = {'size': stat.st_size, 'mtime': stat.st_mtime, 'source': options['source']}
+        start_row = 0
+        if not options['restart'] and os.path.exists(checkpoint_path):
+            with open(checkpoint_path) as f:
+                checkpoint = json.load(f)
+            if checkpoint.get('file') == fingerprint:
+                start_row = checkpoint['rows']
+                self.stdout.write(f"Resuming after row {start_row}")
+
+        started = time.monotonic()
+
+        def on_chunk(totals):
+            with open(checkpoint_path, 'w') as f:
+                json.dump({'file': fingerprint, 'rows': totals['rows']}, f)
+            elapsed = time.monotonic() - started
+            done = totals['rows'] - start_row
+            self.stdout.write(
+                f"{totals['rows']} rows, {totals['imported']} imported "
+                f"({done / elapsed if elapsed else 0:.0f} rows/s)"
+            )
+
+        with open(path, 'rb') as stream:
+            totals = import_players(
+                stream, source=options['source'], chunk_size=options['chunk_size'],
+                start_row=start_row, on_chunk=on_chunk,
+            )
+        elapsed = time.monotonic() - started
+        os.remove(checkpoint_path)
+
+        for error in totals['errors']:
+            details = '; '.join(f"{field}: {message}" for field, message in error['errors'].items())
+            self.stderr.write(f"Line {error['line']}: {details}")
+        if totals['error_count'] > len(totals['errors']):
+            self.stderr.write(f"... and {totals['error_count'] - len(totals['errors'])} more errors")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {totals['imported']} players from {totals['rows'] - start_row} rows "
+            f"in {elapsed:.2f}s ({(totals['rows'] - start_row) / elapsed if elapsed else 0:.0f} rows/s, "
+            f"{totals['error_count']} errors)"
+        ))
@@ -0,0 +1,50 @@
+import os
+import time
+from django.core.management.base import BaseCommand, CommandError
+from cmGenerator.models import Season
+from cmGenerator.utils.stats_import import import_player_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports a CSV or JSON file of player stats into a story's season. Rows "
+        "identify players by FIFA player_id and are streamed into PlayerStats "
+        "with COPY, so the file is never loaded into memory."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('story_id', type=int)
+        parser.add_argument('season', help="Season name, e.g. 24/25")
+        parser.add_argument('path', help="CSV or JSON file to import")
+        parser.add_argument(
+            '--format', choices=['csv', 'json'], default=None,
+            help="File format (default: from the file extension)",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            season = Season.objects.select_related('story').get(
+                story_id=options['story_id'], name=options['season']
+            )
+        except Season.DoesNotExist:
+            raise CommandError(f"Story {options['story_id']} has no season {options['season']!r}")
+
+        fmt = options['format'] or ('json' if options['path'].endswith(('.json', '.jsonl', '.ndjson')) else 'csv')
+        if not os.path.exists(options['path']):
+            raise CommandError(f"No such file: {options['path']}")
+
+        started = time.monotonic()
+        with open(options['path'], 'rb') as stream:
+            result = import_player_stats(season.story, season, stream, fmt=fmt)
+        elapsed = time.monotonic() - started
+
+        for error in result['errors']:
+            details = '; '.join(f"{field}: {message}" for field, message in error['errors'].items())
+            self.stderr.write(f"Line {error['line']}: {details}")
+        if result['error_count'] > len(result['errors']):
+            self.stderr.write(f"... and {result['error_count'] - len(result['errors'])} more errors")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result['imported']} of {result['rows']} rows in {elapsed:.2f}s "
+            f"({result['error_count']} errors)"
+        ))
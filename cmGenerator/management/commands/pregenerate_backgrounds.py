@@ -0,0 +1,106 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from cmGenerator.models import Club
+from cmGenerator.utils.background_cache import background_cache
+from cmGenerator.utils.catalog import catalog
+from cmGenerator.utils.story_generator import PROMPT_VERSION, generate_club_background
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates backgrounds for every club and stores them in the background "
+        "cache. Clubs that are already cached are skipped, so an interrupted run "
+        "can simply be started again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--source', choices=['catalog', 'db'], default='catalog',
+            help="Take clubs from fifaClubTeams.txt (catalog) or the Club table (db)",
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=4,
+            help="Maximum number of generations, and so of model requests, in flight at once",
+        )
+        parser.add_argument(
+            '--limit', type=int, default=None,
+            help="Only generate this many clubs",
+        )
+        parser.add_argument(
+            '--refresh', action='store_true',
+            help="Regenerate clubs even if they are already cached",
+        )
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1:
+            raise CommandError("--concurrency must be at least 1")
+
+        if options['source'] == 'db':
+            clubs = list(Club.objects.order_by('name').values_list('name', flat=True).distinct())
+        else:
+            clubs = list(catalog.get('clubs'))
+
+        if not options['refresh']:
+            done = background_cache.cached_clubs(PROMPT_VERSION, settings.LLM_MODEL)
+            skipped = len([club for club in clubs if club in done])
+            clubs = [club for club in clubs if club not in done]
+            if skipped:
+                self.stdout.write(f"Skipping {skipped} clubs that are already cached")
+
+        if options['limit'] is not None:
+            clubs = clubs[:options['limit']]
+
+        if not clubs:
+            self.stdout.write(self.style.SUCCESS("Nothing to generate"))
+            return
+
+        started = time.monotonic()
+        failed = asyncio.run(self.generate(clubs, options['concurrency'], options['refresh']))
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {len(clubs) - len(failed)}/{len(clubs)} backgrounds in {elapsed:.1f}s"
+        ))
+        if failed:
+            self.stdout.write(self.style.WARNING(
+                f"{len(failed)} failed, run the command again to retry: {', '.join(failed)}"
+            ))
+
+    async def generate(self, clubs, concurrency, refresh):
+        """Runs generations with at most `concurrency` in flight, returning failed clubs."""
+        semaphore = asyncio.Semaphore(concurrency)
+        loop = asyncio.get_running_loop()
+        failed = []
+        finished = 0
+
+        def work(club):
+            # The ORM and LLM client are synchronous, so each generation runs
+            # in a worker thread with its own database connection. Sections
+            # are not fanned out, so --concurrency bounds the model requests.
+            try:
+                generate_club_background(club, refresh=refresh, sections=False)
+            finally:
+                connection.close()
+
+        async def run(club):
+            nonlocal finished
+            async with semaphore:
+                started = time.monotonic()
+                try:
+                    await loop.run_in_executor(executor, work, club)
+                    status = self.style.SUCCESS("ok")
+                except Exception as e:
+                    failed.append(club)
+                    status = self.style.ERROR(f"failed: {e}")
+                finished += 1
+                self.stdout.write(
+                    f"[{finished}/{len(clubs)}] {club} {status} ({time.monotonic() - started:.1f}s)"
+                )
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            await asyncio.gather(*(run(club) for club in clubs))
+        return failed
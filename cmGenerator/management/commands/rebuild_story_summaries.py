@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from cmGenerator.utils.story_summary import rebuild_summaries
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes StorySummary totals from stats, transfers, trophies and awards "
+        "and repairs any summaries that are missing or have drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--story', type=int, action='append', dest='stories',
+            help="Only rebuild this story (repeatable; default: every story)",
+        )
+
+    def handle(self, *args, **options):
+        created, repaired = rebuild_summaries(options['stories'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {created} and repaired {repaired} story summaries"
+        ))
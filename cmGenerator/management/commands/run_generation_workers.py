@@ -0,0 +1,65 @@
+import threading
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection
+from cmGenerator.utils.job_queue import claim_job, prune, requeue_stale, run_job
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs a bounded pool of worker threads that process queued story "
+        "generations from the GenerationJob table."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=2,
+            help="Number of jobs processed at once",
+        )
+        parser.add_argument(
+            '--interval', type=float, default=1.0,
+            help="Seconds an idle worker waits before checking the queue again",
+        )
+
+    def handle(self, *args, **options):
+        self.maintain()
+
+        threads = [
+            threading.Thread(target=self.work, args=(options['interval'],), daemon=True)
+            for _ in range(options['workers'])
+        ]
+        for thread in threads:
+            thread.start()
+        self.stdout.write(f"Started {len(threads)} generation workers")
+
+        try:
+            while True:
+                time.sleep(60)
+                self.maintain()
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping")
+
+    def maintain(self):
+        """Requeues jobs whose worker died and prunes old ones, surviving database errors."""
+        try:
+            requeued = requeue_stale()
+            if requeued:
+                self.stdout.write(f"Requeued {requeued} stale jobs")
+            prune()
+        except Exception as e:
+            self.stderr.write(self.style.ERROR(f"Maintenance error: {e}"))
+            connection.close()  # Reconnect on the next attempt
+
+    def work(self, interval):
+        while True:
+            try:
+                job = claim_job()
+                if job is None:
+                    time.sleep(interval)
+                    continue
+                run_job(job)
+                self.stdout.write(f"{job.id} {job.club} {job.status}")
+            except Exception as e:
+                self.stderr.write(self.style.ERROR(f"Worker error: {e}"))
+                connection.close()  # Reconnect on the next attempt
+                time.sleep(interval)
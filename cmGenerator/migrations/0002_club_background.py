@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cmGenerator', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClubBackground',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('club_name', models.CharField(max_length=255)),
+                ('prompt_version', models.CharField(max_length=20)),
+                ('model_name', models.CharField(max_length=100)),
+                ('background', models.TextField()),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Club Background',
+                'verbose_name_plural': 'Club Backgrounds',
+                'indexes': [models.Index(fields=['last_used_at'], name='cmGenerator_last_us_92e092_idx')],
+                'constraints': [models.UniqueConstraint(fields=('club_name', 'prompt_version', 'model_name'), name='unique_club_background')],
+            },
+        ),
+    ]
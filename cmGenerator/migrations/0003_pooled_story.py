@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cmGenerator', '0002_club_background'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PooledStory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('club', models.CharField(max_length=255)),
+                ('formation', models.CharField(max_length=20)),
+                ('challenge', models.TextField()),
+                ('background', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('served_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Pooled Story',
+                'verbose_name_plural': 'Pooled Stories',
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['served_at', 'created_at'], name='cmGenerator_served__f37b46_idx')],
+            },
+        ),
+    ]
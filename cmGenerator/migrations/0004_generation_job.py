@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:39
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cmGenerator', '0003_pooled_story'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GenerationJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('RUNNING', 'Running'), ('DONE', 'Done'), ('FAILED', 'Failed')], default='PENDING', max_length=10)),
+                ('refresh', models.BooleanField(default=False)),
+                ('club', models.CharField(max_length=255)),
+                ('formation', models.CharField(max_length=20)),
+                ('challenge', models.TextField()),
+                ('background', models.TextField(blank=True)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Generation Job',
+                'verbose_name_plural': 'Generation Jobs',
+                'indexes': [models.Index(fields=['status', 'created_at'], name='cmGenerator_status_3656e3_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cmGenerator', '0004_generation_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='playerstats',
+            name='version',
+            field=models.PositiveIntegerField(default=1, help_text='Incremented on every edit to detect stale writes'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cmGenerator', '0005_playerstats_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='story',
+            name='data_version',
+            field=models.PositiveIntegerField(default=1, help_text="Incremented whenever the story's data changes"),
+        ),
+    ]
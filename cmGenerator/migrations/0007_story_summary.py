@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cmGenerator', '0006_story_data_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StorySummary',
+            fields=[
+                ('story', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='cmGenerator.story')),
+                ('total_goals', models.IntegerField(default=0)),
+                ('total_assists', models.IntegerField(default=0)),
+                ('total_appearances', models.IntegerField(default=0)),
+                ('trophies', models.IntegerField(default=0)),
+                ('awards', models.IntegerField(default=0)),
+                ('transfer_spend', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('transfer_income', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Story Summary',
+                'verbose_name_plural': 'Story Summaries',
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cmGenerator', '0007_story_summary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='playerstats',
+            index=models.Index(fields=['story', 'player'], include=('appearances', 'goals', 'assists', 'clean_sheets', 'average_rating'), name='playerstats_career_idx'),
+        ),
+    ]
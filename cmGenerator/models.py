@@ -1,9 +1,11 @@
+import uuid
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils.text import slugify
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.contrib.postgres.fields import ArrayField
 from django.urls import reverse
+from django.db.models.functions import Coalesce
 
 
 class Competition (models.Model):
@@ -457,6 +459,42 @@ class Player (models.Model):
         )
 
 
+class StoryQuerySet (models.QuerySet):
+    """
+    QuerySet for Story with helpers for list pages.
+
+    Methods:
+        with_statistics(): Annotates each story with the counts and current
+        season returned by Story.get_statistics(), so listing stories with
+        their statistics costs one query instead of four per story.
+    """
+
+    def with_statistics (self):
+        """
+        Annotates season_count, trophy_count, transfer_count,
+        current_season_id and current_season_name using correlated
+        subqueries, which avoid the row multiplication of joining three
+        related tables at once.
+        """
+
+        def count (model):
+            rows = model.objects.filter (story = models.OuterRef ('pk')).order_by ().values ('story')
+            return Coalesce (
+                models.Subquery (rows.annotate (n = models.Count ('*')).values ('n')), 0
+            )
+
+        # Same season get_current_season() picks if several are marked current
+        current = Season.objects.filter (story = models.OuterRef ('pk'), is_current = True)\
+            .order_by ('season_number', 'name')
+        return self.annotate (
+            season_count = count (Season),
+            trophy_count = count (CompetitionWinner),
+            transfer_count = count (Transfer),
+            current_season_id = models.Subquery (current.values ('id')[:1]),
+            current_season_name = models.Subquery (current.values ('name')[:1]),
+        )
+
+
 class Story (models.Model):
     """
     Represents a user's career mode story with enhanced tracking and
@@ -484,12 +522,15 @@ class Story (models.Model):
             updated_at (datetime): Last update timestamp
             is_public (bool): Story visibility setting
             view_count (int): Number of story views
+            data_version (int): Incremented on every write to the story's
+            seasons, stats, transfers, trophies or awards. Used for ETags.
             
     Methods:
         save(): Handles slug generation and timestamps
         get_absolute_url(): Returns story detail URL
         get_current_season(): Returns active season
-        get_statistics(): Returns story statistics
+        get_statistics(): Returns story statistics, from the annotations
+        of StoryQuerySet.with_statistics() when present
     """
 
     # Status choices
@@ -576,6 +617,12 @@ class Story (models.Model):
         help_text = "Make story visible to other users"
     )
     view_count = models.PositiveIntegerField (default = 0)
+    data_version = models.PositiveIntegerField (
+        default = 1,
+        help_text = "Incremented whenever the story's data changes"
+    )
+
+    objects = StoryQuerySet.as_manager ()
 
     class Meta:
         verbose_name = "Story"
@@ -600,6 +647,15 @@ class Story (models.Model):
 
     def get_current_season (self):
         """Returns the current active season for this story"""
+        if hasattr (self, 'current_season_id'):
+            if self.current_season_id is None:
+                return None
+            # A deferred instance, like .only() would give; other fields
+            # load on access
+            return Season.from_db (
+                self._state.db, ['id', 'story_id', 'name', 'is_current'],
+                [self.current_season_id, self.id, self.current_season_name, True]
+            )
         return self.seasons.filter (is_current = True).first ()
 
     def get_statistics (self):
@@ -610,6 +666,13 @@ class Story (models.Model):
         - Top scorers
         - etc.
         """
+        if hasattr (self, 'season_count'):
+            return {
+                'total_seasons': self.season_count,
+                'trophies': self.trophy_count,
+                'transfers': self.transfer_count,
+                'current_season': self.get_current_season (),
+            }
         return {
             'total_seasons': self.seasons.count (),
             'trophies': self.competition_winners.count (),
@@ -806,6 +869,8 @@ class PlayerStats (models.Model):
         10. DecimalField with a maximum of 4 digits and 2 decimal places,
         default value of 0.00, validated to be between 0 and 10, and indexed
         for sorting.
+        version (int): Row version for optimistic concurrency, incremented on
+        every edit. PositiveIntegerField with a default value of 1.
 
     Methods:
         aggregate_competition_stats(): Aggregates and returns the player's
@@ -874,6 +939,10 @@ class PlayerStats (models.Model):
         db_index = True,  # Add index for sorting
         help_text = "Average match rating out of 10"
     )
+    version = models.PositiveIntegerField (
+        default = 1,
+        help_text = "Incremented on every edit to detect stale writes"
+    )
 
     class Meta:
         unique_together = ['season', 'player']
@@ -881,36 +950,39 @@ class PlayerStats (models.Model):
             models.Index (fields = ['-goals']),
             models.Index (fields = ['-average_rating']),
             models.Index (fields = ['-assists']),
+            # Covers the per-player career totals behind the story leaderboards
+            models.Index (
+                fields = ['story', 'player'],
+                include = ['appearances', 'goals', 'assists', 'clean_sheets', 'average_rating'],
+                name = 'playerstats_career_idx'
+            ),
         ]
 
     def aggregate_competition_stats (self):
-        """Aggregate stats from CompetitionPlayerStats"""
-        competition_stats = self.competition_player_stats.all ()
-        total_appearances = sum (stat.appearances for stat in competition_stats)
-        total_goals = sum (stat.goals for stat in competition_stats)
-        total_assists = sum (stat.assists for stat in competition_stats)
-        total_clean_sheets = sum (
-            stat.clean_sheets for stat in competition_stats
-            )
-        total_red_cards = sum (stat.red_cards for stat in competition_stats)
-        total_yellow_cards = sum (
-            stat.yellow_cards for stat in competition_stats
-            )
-        average_rating = sum (
-            stat.average_rating for stat in competition_stats
-            ) / len (
-            competition_stats
-        ) if competition_stats else 0
-
-        return {
-            'total_appearances': total_appearances,
-            'total_goals': total_goals,
-            'total_assists': total_assists,
-            'total_clean_sheets': total_clean_sheets,
-            'total_red_cards': total_red_cards,
-            'total_yellow_cards': total_yellow_cards,
-            'average_rating': average_rating,
-        }
+        """Aggregate stats from CompetitionPlayerStats in a single query"""
+        totals = CompetitionPlayerStats.objects.filter (
+            season_id = self.season_id, player_id = self.player_id
+        ).aggregate (
+            total_appearances = models.Sum ('appearances'),
+            total_goals = models.Sum ('goals'),
+            total_assists = models.Sum ('assists'),
+            total_clean_sheets = models.Sum ('clean_sheets'),
+            total_red_cards = models.Sum ('red_cards'),
+            total_yellow_cards = models.Sum ('yellow_cards'),
+            rating_weight = models.Sum (
+                models.F ('average_rating') * models.F ('appearances'),
+                output_field = models.DecimalField ()
+            ),
+        )
+        # Sum gives None when there are no competition rows
+        totals = {key: value or 0 for key, value in totals.items ()}
+        # Ratings are weighted by appearances, as in the SQL roll-up that
+        # rollup_player runs on every competition write
+        rating_weight = totals.pop ('rating_weight')
+        totals['average_rating'] = (
+            rating_weight / totals['total_appearances']
+            ) if totals['total_appearances'] > 0 else 0
+        return totals
 
     @property
     def goals_per_game (self):
@@ -930,8 +1002,10 @@ class PlayerStats (models.Model):
         """Update aggregate stats from competition stats"""
         stats = self.aggregate_competition_stats ()
         for key, value in stats.items ():
-            if hasattr (self, key):
-                setattr (self, key, value)
+            field = key.replace ('total_', '', 1)
+            if hasattr (self, field):
+                setattr (self, field, value)
+        self.average_rating = round (self.average_rating, 2)
         self.save ()
 
 
@@ -1135,3 +1209,211 @@ class AwardWinner (models.Model):
                 name='unique_season_award'
             )
         ]
+
+
+class ClubBackground (models.Model):
+    """
+    Represents a cached LLM-generated background for a club.
+
+    Attributes:
+        club_name (str): The club the background was generated for, as it
+        appears in the reference data. CharField with max_length=255.
+        prompt_version (str): Version of the prompt used to generate the
+        background. Bumping the version invalidates older entries.
+        model_name (str): Name of the model that generated the background.
+        background (str): The cleaned HTML background. TextField.
+        hits (int): Number of times this entry has been served from the
+        cache. PositiveIntegerField, default 0.
+        created_at (datetime): When the background was generated.
+        last_used_at (datetime): When the background was last served, used
+        for size-based eviction.
+
+    Meta:
+        constraints (list):
+            - unique_club_background: One entry per club, prompt version
+            and model.
+        indexes (list): Optimized queries for eviction by last use.
+    """
+    club_name = models.CharField (max_length = 255)
+    prompt_version = models.CharField (max_length = 20)
+    model_name = models.CharField (max_length = 100)
+    background = models.TextField ()
+    hits = models.PositiveIntegerField (default = 0)
+    created_at = models.DateTimeField (auto_now_add = True)
+    last_used_at = models.DateTimeField (auto_now_add = True)
+
+    class Meta:
+        verbose_name = "Club Background"
+        verbose_name_plural = "Club Backgrounds"
+        indexes = [
+            models.Index (fields = ['last_used_at']),
+        ]
+        constraints = [
+            models.UniqueConstraint (
+                fields = ['club_name', 'prompt_version', 'model_name'],
+                name = 'unique_club_background'
+            )
+        ]
+
+    def __str__ (self):
+        return f"{self.club_name} ({self.prompt_version}, {self.model_name})"
+
+
+class PooledStory (models.Model):
+    """
+    Represents a pre-generated story waiting to be served by /generate/.
+
+    Attributes:
+        club (str): The randomly picked club. CharField with max_length=255.
+        formation (str): The randomly picked formation. CharField with
+        max_length=20.
+        challenge (str): The randomly picked challenge. TextField.
+        background (str): The generated club background. TextField.
+        created_at (datetime): When the story was generated.
+        served_at (datetime): When the story was handed to a user, or null
+        while it is still in the pool.
+
+    Meta:
+        indexes (list): Optimized queries for:
+            - served_at and created_at: popping the oldest unserved story
+            and measuring refill and serve rates
+    """
+    club = models.CharField (max_length = 255)
+    formation = models.CharField (max_length = 20)
+    challenge = models.TextField ()
+    background = models.TextField ()
+    created_at = models.DateTimeField (auto_now_add = True)
+    served_at = models.DateTimeField (null = True, blank = True)
+
+    class Meta:
+        verbose_name = "Pooled Story"
+        verbose_name_plural = "Pooled Stories"
+        ordering = ['created_at']
+        indexes = [
+            models.Index (fields = ['served_at', 'created_at']),
+        ]
+
+    def __str__ (self):
+        return f"{self.club} ({'served' if self.served_at else 'ready'})"
+
+
+class GenerationJob (models.Model):
+    """
+    Represents a queued story generation for the asynchronous /generate/ API.
+
+    Attributes:
+        id (uuid): Public job identifier returned to the client.
+        status (str): One of PENDING, RUNNING, DONE or FAILED.
+        refresh (bool): Regenerate the background even if it is cached.
+        club (str): The randomly picked club, set when the job is queued.
+        formation (str): The randomly picked formation.
+        challenge (str): The randomly picked challenge.
+        background (str): The generated background once the job is DONE.
+        error (str): The failure message once the job is FAILED.
+        created_at (datetime): When the job was queued.
+        started_at (datetime): When a worker claimed the job.
+        finished_at (datetime): When the job reached DONE or FAILED.
+
+    Meta:
+        indexes (list): Optimized queries for:
+            - status and created_at: claiming the oldest pending job and
+            measuring queue depth
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('RUNNING', 'Running'),
+        ('DONE', 'Done'),
+        ('FAILED', 'Failed'),
+    ]
+
+    id = models.UUIDField (primary_key = True, default = uuid.uuid4, editable = False)
+    status = models.CharField (
+        max_length = 10,
+        choices = STATUS_CHOICES,
+        default = 'PENDING'
+    )
+    refresh = models.BooleanField (default = False)
+    club = models.CharField (max_length = 255)
+    formation = models.CharField (max_length = 20)
+    challenge = models.TextField ()
+    background = models.TextField (blank = True)
+    error = models.TextField (blank = True)
+    created_at = models.DateTimeField (auto_now_add = True)
+    started_at = models.DateTimeField (null = True, blank = True)
+    finished_at = models.DateTimeField (null = True, blank = True)
+
+    class Meta:
+        verbose_name = "Generation Job"
+        verbose_name_plural = "Generation Jobs"
+        indexes = [
+            models.Index (fields = ['status', 'created_at']),
+        ]
+
+    def __str__ (self):
+        return f"{self.club} ({self.status})"
+
+    def as_dict (self):
+        """Returns the job as the JSON payload served to the client"""
+        data = {
+            'job_id': str (self.id),
+            'status': self.status,
+            'club': self.club,
+            'formation': self.formation,
+            'challenge': self.challenge,
+        }
+        if self.status == 'DONE':
+            data['background'] = self.background
+        elif self.status == 'FAILED':
+            data['error'] = self.error
+        return data
+
+
+class StorySummary (models.Model):
+    """
+    Represents denormalized story-level totals for dashboards.
+
+    Kept up to date incrementally as the story's stats, transfers, trophies
+    and awards are written, so reading them is a primary key lookup.
+    `manage.py rebuild_story_summaries` recomputes them from scratch.
+
+    Attributes:
+        story (Story): The story summarized. OneToOneField to Story with
+        CASCADE delete, used as the primary key.
+        total_goals (int): Sum of PlayerStats goals across all seasons.
+        total_assists (int): Sum of PlayerStats assists across all seasons.
+        total_appearances (int): Sum of PlayerStats appearances across all
+        seasons.
+        trophies (int): Competitions won by the story's club.
+        awards (int): Individual awards won by players in the story.
+        transfer_spend (decimal): Fees paid for transfers into the story's
+        club. DecimalField(14,2).
+        transfer_income (decimal): Fees received for transfers out of the
+        story's club. DecimalField(14,2).
+        updated_at (datetime): When the totals last changed.
+
+    Methods:
+        net_spend(): Property returning transfer_spend minus transfer_income.
+    """
+    story = models.OneToOneField (
+        Story, on_delete = models.CASCADE, primary_key = True, related_name = 'summary'
+    )
+    total_goals = models.IntegerField (default = 0)
+    total_assists = models.IntegerField (default = 0)
+    total_appearances = models.IntegerField (default = 0)
+    trophies = models.IntegerField (default = 0)
+    awards = models.IntegerField (default = 0)
+    transfer_spend = models.DecimalField (max_digits = 14, decimal_places = 2, default = 0)
+    transfer_income = models.DecimalField (max_digits = 14, decimal_places = 2, default = 0)
+    updated_at = models.DateTimeField (auto_now = True)
+
+    class Meta:
+        verbose_name = "Story Summary"
+        verbose_name_plural = "Story Summaries"
+
+    def __str__ (self):
+        return f"Summary of {self.story_id}"
+
+    @property
+    def net_spend (self):
+        """Transfer fees paid minus fees received"""
+        return self.transfer_spend - self.transfer_income
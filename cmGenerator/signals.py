@@ -0,0 +1,47 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_save
+from .models import AwardWinner, CompetitionPlayerStats, CompetitionWinner, PlayerStats, Season, Story, Transfer
+from .utils.season_stats import competition_row_deleted, competition_row_saved, competition_row_saving
+from .utils.story_summary import row_deleted, row_saved, row_saving, season_deleted
+from .utils.story_version import in_story_bulk_write, touch_story
+
+# Models whose rows belong to a story and show up in its read endpoints
+STORY_DATA_MODELS = [Season, PlayerStats, CompetitionPlayerStats, Transfer, CompetitionWinner, AwardWinner]
+# Models that feed StorySummary totals
+SUMMARY_MODELS = [PlayerStats, Transfer, CompetitionWinner, AwardWinner]
+
+
+def story_data_changed(sender, instance, origin=None, **kwargs):
+    """
+    Bumps the story's data_version when one of its rows is saved or deleted.
+
+    A delete that reaches many rows (a queryset delete or a cascade) bumps
+    each story once rather than once per row.
+    """
+    if in_story_bulk_write():
+        return
+    if origin is None:  # A save
+        touch_story(instance.story_id)
+        return
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if origin_model is Story:
+        return  # The story itself is going
+    touched = origin.__dict__.setdefault('_touched_stories', set())
+    if instance.story_id not in touched:
+        touched.add(instance.story_id)
+        touch_story(instance.story_id)
+
+
+for model in STORY_DATA_MODELS:
+    post_save.connect(story_data_changed, sender=model)
+    post_delete.connect(story_data_changed, sender=model)
+
+for model in SUMMARY_MODELS:
+    pre_save.connect(row_saving, sender=model)
+    post_save.connect(row_saved, sender=model)
+    post_delete.connect(row_deleted, sender=model)
+post_delete.connect(season_deleted, sender=Season)
+
+pre_save.connect(competition_row_saving, sender=CompetitionPlayerStats)
+post_save.connect(competition_row_saved, sender=CompetitionPlayerStats)
+post_delete.connect(competition_row_deleted, sender=CompetitionPlayerStats)
@@ -1,6 +1,38 @@
-from django.test import TestCase
+import csv
+import datetime
+import json
+import os
+import tempfile
+import threading
+import time
+import zipfile
+from io import BytesIO, StringIO
+from unittest import mock
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command, CommandError
+from django.db import OperationalError, connection, connections
+from django.test import LiveServerTestCase, TestCase, SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.core.exceptions import ValidationError
-from .models import Competition
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.utils import timezone
+from .models import (
+    Competition, Club, Player, Story, Season, PlayerStats, Transfer, ClubBackground, PooledStory,
+    GenerationJob, CompetitionWinner, CompetitionPlayerStats, StorySummary
+)
+from .management.commands import fake_llm_server, pregenerate_backgrounds, run_generation_workers
+from .utils import job_queue, llm_client, story_generator, story_pool
+from .utils.background_cache import BackgroundCache
+from .utils.catalog import ReferenceCatalog
+from .utils.player_import import import_players
+from .utils.coalesce import SingleFlight, advisory_lock, lock_id
+from .utils.leaderboards import leaderboard_cache
+from .utils.llm_client import CircuitBreaker, LLMUnavailable
+from .utils.season_stats import (
+    apply_stat_changes, recompute_season_stats, save_player_stats, StatsConflict, StatsValidationError
+)
+from .utils.story_generator import BackgroundStreamCleaner, clean_background, PROMPT_VERSION
 
 
 class CompetitionModelTest (TestCase):
@@ -36,3 +68,1173 @@ class CompetitionModelTest (TestCase):
             tier = 1,
             min_wage_budget = 1000000.00
         )
+
+
+class BackgroundStreamCleanerTest (SimpleTestCase):
+
+    def stream (self, chunks):
+        cleaner = BackgroundStreamCleaner ()
+        out = ''.join (cleaner.feed (chunk) for chunk in chunks)
+        return out + cleaner.finish ()
+
+    def test_matches_non_streaming_cleanup (self):
+        raw = "<think>plan <h4>x</h4></think>\n```html\n<h4>Club Backstory:</h4><p>Founded</p>\n```\ntrailing"
+        chunks = [raw[i:i + 3] for i in range (0, len (raw), 3)]
+        self.assertEqual (self.stream (chunks), clean_background (raw))
+
+    def test_emits_before_stream_ends (self):
+        cleaner = BackgroundStreamCleaner ()
+        self.assertEqual (cleaner.feed ("Sure! "), "")
+        self.assertEqual (cleaner.feed ("<h4>Club"), "<h4>Club")
+        self.assertEqual (cleaner.feed (" Backstory`"), " Backstory")
+
+    def test_falls_back_without_heading (self):
+        self.assertEqual (self.stream (["plain ", "text"]), "plain text")
+
+
+class ReferenceCatalogTest (SimpleTestCase):
+
+    def setUp (self):
+        self.tmp = tempfile.TemporaryDirectory ()
+        self.addCleanup (self.tmp.cleanup)
+        self.path = os.path.join (self.tmp.name, 'clubs.txt')
+        self.write ("Arsenal\nChelsea\n\n")
+        self.catalog = ReferenceCatalog (
+            data_dir = self.tmp.name, files = {'clubs': 'clubs.txt'},
+            check_interval = 0
+        )
+        self.catalog.load ()
+
+    def write (self, text, mtime = None):
+        with open (self.path, 'w') as f:
+            f.write (text)
+        if mtime is not None:
+            os.utime (self.path, (mtime, mtime))
+
+    def test_entries_are_stripped_tuple (self):
+        self.assertEqual (self.catalog.get ('clubs'), ('Arsenal', 'Chelsea'))
+        self.assertIn (self.catalog.choice ('clubs'), ('Arsenal', 'Chelsea'))
+
+    def test_reloads_when_file_changes (self):
+        self.write ("Ajax\n", mtime = os.stat (self.path).st_mtime + 10)
+        self.assertEqual (self.catalog.get ('clubs'), ('Ajax',))
+
+
+class BackgroundCacheTest (TestCase):
+
+    def setUp (self):
+        self.cache = BackgroundCache ()
+
+    def test_database_tier_survives_memory_eviction (self):
+        self.cache.set ("Arsenal", "1", "model", "<h4>Arsenal</h4>")
+        self.cache.memory.clear ()
+        self.assertEqual (self.cache.get ("Arsenal", "1", "model"), "<h4>Arsenal</h4>")
+        self.assertEqual (ClubBackground.objects.get ().hits, 1)
+
+    def test_memory_copy_expires_with_the_row (self):
+        self.cache.set ("Arsenal", "1", "model", "<h4>Arsenal</h4>")
+        self.cache.memory.clear ()
+        ClubBackground.objects.update (
+            created_at = timezone.now () - datetime.timedelta (seconds = self.cache.ttl - 1)
+        )
+        self.assertEqual (self.cache.get ("Arsenal", "1", "model"), "<h4>Arsenal</h4>")
+
+        # A second later the row has expired, and so has the memory copy
+        with mock.patch.object (time, 'monotonic', return_value = time.monotonic () + 2):
+            self.assertIsNone (self.cache.memory.get (("Arsenal", "1", "model")))
+
+    def test_key_includes_prompt_version_and_model (self):
+        self.cache.set ("Arsenal", "1", "model", "<h4>Arsenal</h4>")
+        self.assertIsNone (self.cache.get ("Arsenal", "2", "model"))
+        self.assertIsNone (self.cache.get ("Arsenal", "1", "other-model"))
+
+    @override_settings (BACKGROUND_CACHE_MAX_ROWS = 2)
+    def test_trims_least_recently_used_rows (self):
+        for club in ("Ajax", "Benfica", "Celtic"):
+            self.cache.set (club, "1", "model", club)
+        self.assertEqual (
+            set (ClubBackground.objects.values_list ('club_name', flat = True)),
+            {"Benfica", "Celtic"}
+        )
+
+
+class StoryPoolTest (TestCase):
+
+    def fake_story (self):
+        return {'club': "Ajax", 'formation': "4-3-3", 'challenge': "Youth only",
+                'background': "<h4>Ajax</h4>"}
+
+    def test_refill_tops_up_to_target_and_pop_drains (self):
+        with mock.patch.object (story_pool, 'generate_all', self.fake_story):
+            self.assertEqual (story_pool.refill (3), 3)
+            self.assertEqual (story_pool.refill (3), 0)
+
+        self.assertEqual (story_pool.pop_story (), self.fake_story ())
+        self.assertEqual (story_pool.pool_depth (), 2)
+        self.assertEqual (story_pool.pool_stats ()['depth'], 2)
+
+    def test_pop_from_empty_pool (self):
+        self.assertIsNone (story_pool.pop_story ())
+        self.assertFalse (PooledStory.objects.exists ())
+
+    def test_only_staff_can_skip_the_pool (self):
+        with mock.patch.object (story_pool, 'generate_all', self.fake_story):
+            story_pool.refill (2)
+
+        with mock.patch ('cmGenerator.views.generate_all') as generate_all:
+            response = self.client.post ('/generate/?refresh=1')
+            self.assertEqual (response.json ()['club'], "Ajax")
+            self.assertEqual (story_pool.pool_depth (), 1)
+
+            staff = User.objects.create_user (username = "admin", password = "secret", is_staff = True)
+            self.client.force_login (staff)
+            generate_all.return_value = self.fake_story ()
+            self.client.post ('/generate/?refresh=1')
+            generate_all.assert_called_once_with (refresh = True)
+            self.assertEqual (story_pool.pool_depth (), 1)
+
+
+class CircuitBreakerTest (SimpleTestCase):
+
+    def test_opens_after_threshold_and_recovers (self):
+        breaker = CircuitBreaker (failure_threshold = 2, reset_timeout = 0.05)
+        for _ in range (2):
+            breaker.before_call ()
+            breaker.record_failure ()
+        self.assertEqual (breaker.state, 'open')
+        with self.assertRaises (LLMUnavailable):
+            breaker.before_call ()
+
+        time.sleep (0.06)
+        breaker.before_call ()  # Single trial call is allowed through
+        with self.assertRaises (LLMUnavailable):
+            breaker.before_call ()
+        breaker.record_success ()
+        self.assertEqual (breaker.state, 'closed')
+
+
+class PregenerateBackgroundsCommandTest (TestCase):
+
+    def test_skips_cached_clubs (self):
+        BackgroundCache ().set ("Arsenal", PROMPT_VERSION, settings.LLM_MODEL, "cached")
+        generated = []
+        with mock.patch.object (pregenerate_backgrounds.catalog, 'get', return_value = ("Arsenal", "Chelsea")), \
+                mock.patch.object (pregenerate_backgrounds, 'generate_club_background',
+                                   side_effect = lambda club, refresh, sections: generated.append ((club, sections))), \
+                mock.patch.object (pregenerate_backgrounds.connection, 'close'):
+            call_command ('pregenerate_backgrounds', concurrency = 2, stdout = StringIO ())
+        # One model request per generation, so --concurrency is the request limit
+        self.assertEqual (generated, [("Chelsea", False)])
+
+    def test_concurrency_must_be_positive (self):
+        for concurrency in (0, -1):
+            with self.assertRaisesMessage (CommandError, "--concurrency must be at least 1"):
+                call_command ('pregenerate_backgrounds', concurrency = concurrency, stdout = StringIO ())
+
+
+class BenchmarkGenerateTest (LiveServerTestCase):
+    """Runs the benchmark against this test server backed by the fake model server"""
+
+    def setUp (self):
+        self.fake_llm = fake_llm_server.Command (stdout = StringIO ())
+        thread = threading.Thread (target = call_command, args = (self.fake_llm,), daemon = True,
+                                   kwargs = {'port': 0, 'latency': 0, 'tokens_per_second': 0, 'tokens': 5})
+        thread.start ()
+        for _ in range (100):
+            if hasattr (self.fake_llm, 'server'):
+                break
+            time.sleep (0.01)
+        self.addCleanup (thread.join)
+        self.addCleanup (self.fake_llm.server.shutdown)
+
+        # The client and breaker are process-wide, so point them at the fake server
+        self.enterContext (override_settings (
+            LLM_BASE_URL = f"http://127.0.0.1:{self.fake_llm.server.server_port}/v1", LLM_MAX_RETRIES = 0
+        ))
+        self.enterContext (mock.patch.object (llm_client, '_client', None))
+        self.enterContext (mock.patch.object (llm_client, 'breaker', CircuitBreaker ()))
+
+    def benchmark (self, mode, **options):
+        out = StringIO ()
+        call_command ('benchmark_generate', url = f"{self.live_server_url}/generate/", mode = mode,
+                      requests = 2, concurrency = 2, stdout = out, **options)
+        return out.getvalue ()
+
+    # One test method, as every live server test pays for flushing the database
+    def test_json_requests_complete_and_queued_jobs_time_out (self):
+        output = self.benchmark ('json')
+        self.assertIn ("Completed 2/2", output)
+        self.assertIn ("Status codes: {200: 2}", output)
+
+        # No worker is running, so the jobs stay pending
+        started = time.monotonic ()
+        output = self.benchmark ('async', job_timeout = 0.3)
+        self.assertLess (time.monotonic () - started, 5)
+        self.assertIn ("Completed 0/2", output)
+        self.assertIn ("'timeout': 2", output)
+
+        # ?refresh is only honoured for staff, so the benchmark logs in first
+        User.objects.create_user (username = "admin", password = "secret", is_staff = True)
+        with mock.patch ('cmGenerator.views.generate_all', wraps = story_generator.generate_all) as generate_all:
+            output = self.benchmark ('json', refresh = True, username = "admin", password = "secret")
+        self.assertIn ("Completed 2/2", output)
+        generate_all.assert_called_with (refresh = True)
+        with self.assertRaisesMessage (CommandError, "Could not log in as admin"):
+            self.benchmark ('json', username = "admin", password = "wrong")
+
+
+
+class BenchmarkGenerateOptionsTest (SimpleTestCase):
+
+    def test_options_are_checked_before_any_request (self):
+        for options, message in (({'concurrency': 0}, "--concurrency must be at least 1"),
+                                 ({'refresh': True}, "--refresh needs --username")):
+            with self.assertRaisesMessage (CommandError, message):
+                call_command ('benchmark_generate', url = "http://127.0.0.1:9/generate/",
+                              stdout = StringIO (), **options)
+
+
+class SingleFlightTest (SimpleTestCase):
+
+    def test_concurrent_calls_share_one_execution (self):
+        flight = SingleFlight ()
+        release = threading.Event ()
+        calls = []
+        results = []
+
+        def slow ():
+            calls.append (1)
+            release.wait (1)
+            return "background"
+
+        threads = [threading.Thread (target = lambda: results.append (flight.do ("Ajax", slow)))
+                   for _ in range (5)]
+        for thread in threads:
+            thread.start ()
+        time.sleep (0.05)
+        release.set ()
+        for thread in threads:
+            thread.join ()
+
+        self.assertEqual (len (calls), 1)
+        self.assertEqual (results, ["background"] * 5)
+
+    def test_stream_readers_share_chunks (self):
+        flight = SingleFlight ()
+        release = threading.Event ()
+
+        def chunks ():
+            yield "<h4>"
+            release.wait (1)
+            yield "Ajax</h4>"
+
+        first = flight.stream ("Ajax", chunks)
+        self.assertEqual (next (first), "<h4>")
+        second = flight.stream ("Ajax", lambda: iter (["never used"]))
+        release.set ()
+        self.assertEqual (list (first), ["Ajax</h4>"])
+        self.assertEqual (list (second), ["<h4>", "Ajax</h4>"])
+
+
+class AdvisoryLockTest (TestCase):
+
+    def test_gives_up_instead_of_blocking_behind_another_worker (self):
+        other = connections.create_connection ('default')
+        try:
+            with other.cursor () as cursor:
+                cursor.execute ("SELECT pg_advisory_lock(%s)", [lock_id ("club-background:Ajax")])
+            started = time.monotonic ()
+            with advisory_lock ("club-background:Ajax", wait = 0.3) as acquired:
+                self.assertFalse (acquired)
+            self.assertLess (time.monotonic () - started, 2)
+            with other.cursor () as cursor:
+                cursor.execute ("SELECT pg_advisory_unlock(%s)", [lock_id ("club-background:Ajax")])
+        finally:
+            other.close ()
+
+        with advisory_lock ("club-background:Ajax", wait = 0) as acquired:
+            self.assertTrue (acquired)
+
+    @override_settings (BACKGROUND_LOCK_ACROSS_WORKERS = False)
+    def test_can_be_turned_off_for_transaction_poolers (self):
+        with CaptureQueriesContext (connection) as queries:
+            with advisory_lock ("club-background:Ajax") as acquired:
+                self.assertFalse (acquired)
+        self.assertEqual (len (queries), 0)
+
+
+class GenerationJobQueueTest (TestCase):
+
+    def test_maintenance_survives_database_errors (self):
+        errors = StringIO ()
+        command = run_generation_workers.Command (stdout = StringIO (), stderr = errors)
+        with mock.patch.object (run_generation_workers, 'requeue_stale', side_effect = OperationalError ("gone")), \
+                mock.patch.object (run_generation_workers, 'prune') as prune, \
+                mock.patch.object (run_generation_workers.connection, 'close') as close:
+            command.maintain ()
+        self.assertIn ("Maintenance error: gone", errors.getvalue ())
+        prune.assert_not_called ()
+        close.assert_called_once_with ()
+
+    def test_worker_claims_and_completes_job (self):
+        job = job_queue.enqueue ()
+        self.assertEqual (job.status, 'PENDING')
+
+        claimed = job_queue.claim_job ()
+        self.assertEqual (claimed.id, job.id)
+        self.assertIsNone (job_queue.claim_job ())
+        with mock.patch.object (job_queue, 'generate_club_background', return_value = "<h4>Done</h4>"):
+            job_queue.run_job (claimed)
+
+        response = self.client.get (f'/generate/jobs/{job.id}/')
+        self.assertEqual (response.json ()['status'], 'DONE')
+        self.assertEqual (response.json ()['background'], "<h4>Done</h4>")
+
+    @override_settings (GENERATION_STREAM_SECONDS = 0)
+    def test_status_stream_closes_while_the_job_is_pending (self):
+        job = job_queue.enqueue ()
+        response = self.client.get (f'/generate/jobs/{job.id}/', {'stream': 1})
+        body = b''.join (response.streaming_content).decode ()
+        self.assertTrue (body.startswith ("retry: "))
+        self.assertIn ('"status": "PENDING"', body)
+        self.assertNotIn ("event: done", body)
+
+    @override_settings (GENERATION_QUEUE_MAX = 1)
+    def test_full_queue_rejects_with_retry_after (self):
+        self.assertEqual (self.client.post ('/generate/?async=1').status_code, 202)
+        response = self.client.post ('/generate/?async=1')
+        self.assertEqual (response.status_code, 429)
+        self.assertIn ('Retry-After', response)
+        self.assertEqual (GenerationJob.objects.count (), 1)
+
+
+class SectionGenerationTest (SimpleTestCase):
+
+    def completion (self, messages, stream = False):
+        title = messages[0]['content'].split ('<h4>')[1].split ('</h4>')[0]
+        time.sleep (0.05 if title.startswith ("Club Backstory") else 0)
+        message = mock.Mock (content = f"<think>hm</think><h4>{title}</h4><p>text</p>")
+        return mock.Mock (choices = [mock.Mock (message = message)])
+
+    def test_one_prompt_per_section (self):
+        prompts = story_generator.generate_section_prompts ("Ajax")
+        self.assertEqual (len (prompts), 4)
+        for prompt in prompts:
+            self.assertEqual (prompt.count ('<h4>'), 1)
+            self.assertIn ("Ajax", prompt)
+
+    @override_settings (LLM_SECTION_CONCURRENCY = 4)
+    def test_sections_are_joined_in_prompt_order (self):
+        with mock.patch.object (story_generator, 'create_completion', self.completion):
+            background = story_generator._generate_sections ("Ajax")
+        headings = [part.split ('</h4>')[0] for part in background.split ('<h4>')[1:]]
+        self.assertEqual (headings, ["Club Backstory:", "League History:", "Club Philosophy:",
+                                     "Club Influence and Achievements:"])
+
+    @override_settings (LLM_SECTION_CONCURRENCY = 2)
+    def test_failed_section_does_not_wait_for_the_others (self):
+        def completion (messages, stream = False):
+            if "Club Backstory" in messages[0]['content'].split ('<h4>')[1]:
+                raise LLMUnavailable ("down")
+            time.sleep (0.5)
+            return self.completion (messages)
+
+        started = time.monotonic ()
+        with mock.patch.object (story_generator, 'create_completion', completion):
+            with self.assertRaises (LLMUnavailable):
+                story_generator._generate_sections ("Ajax")
+        self.assertLess (time.monotonic () - started, 0.4)
+
+    @override_settings (LLM_SECTION_CONCURRENCY = 4)
+    def test_half_open_breaker_sends_one_trial_request (self):
+        breaker = CircuitBreaker (failure_threshold = 1, reset_timeout = 0)
+        breaker.record_failure ()
+        self.assertEqual (breaker.state, 'half-open')
+        with mock.patch.object (story_generator, 'breaker', breaker):
+            self.assertFalse (story_generator.use_parallel_sections ())
+            breaker.record_success ()
+            self.assertTrue (story_generator.use_parallel_sections ())
+
+
+class StoryFixtureMixin:
+    """Creates a user with one story, one season and a handful of players"""
+
+    def setUp (self):
+        super ().setUp ()
+        self.user = User.objects.create_user ("manager", password = "pass")
+        self.league = Competition.objects.create (
+            name = "Premier League", country = "England", league_rep = 5, tier = 1,
+            min_wage_budget = 1000000
+        )
+        self.club = Club.objects.create (
+            league = self.league, name = "Arsenal", overall = 80, att_rating = 80,
+            mid_rating = 80, def_rating = 80, country = "England", scout_region = "Europe",
+            dom_prestige = 8, intl_prestige = 8, league_rep = 8, youth_scouting_region = "Europe"
+        )
+        self.story = Story.objects.create (
+            user = self.user, club = self.club, name = "Invincibles", formation = "4-4-2",
+            challenge = "Win the league"
+        )
+        self.season = Season.objects.create (story = self.story, name = "24/25", season_number = 1)
+        self.players = [self.make_player (n) for n in range (1, 6)]
+        self.client.force_login (self.user)
+
+    def make_player (self, n, club = None):
+        return Player.objects.create (
+            player_id = n, name = f"Player {n}", nationality = "England",
+            birth_date = datetime.date (2000, 1, 1), age = 24, club = club or self.club,
+            wage_eur = 1000, wage_usd = 1000, wage_gbp = 1000,
+            contract_start = datetime.date (2024, 7, 1), contract_end = datetime.date (2027, 6, 30),
+            overall = 70, potential = 80
+        )
+
+
+class SaveSeasonStatsTest (StoryFixtureMixin, TestCase):
+
+    def row (self, player, **stats):
+        return {'season': "24/25", 'player': player.id, 'goals': 1, **stats}
+
+    def test_squad_is_saved_in_constant_queries (self):
+        rows = [self.row (player) for player in self.players]
+        with CaptureQueriesContext (connection) as queries:
+            ids = save_player_stats (self.story, rows)
+        self.assertEqual (PlayerStats.objects.count (), 5)
+        self.assertTrue (all (ids))
+        small = len (queries)
+
+        rows = [{'id': stat_id, 'goals': 3} for stat_id in ids] + [self.row (self.make_player (9))]
+        with CaptureQueriesContext (connection) as queries:
+            save_player_stats (self.story, rows)
+        self.assertLessEqual (len (queries), small + 2)
+        self.assertEqual (PlayerStats.objects.filter (goals = 3).count (), 5)
+
+    def test_invalid_row_rejects_whole_payload (self):
+        rows = [self.row (self.players[0]), self.row (self.players[1], goals = -1),
+                self.row (self.players[2], average_rating = "x")]
+        with self.assertRaises (StatsValidationError) as raised:
+            save_player_stats (self.story, rows)
+        self.assertEqual ([e['row'] for e in raised.exception.errors], [1, 2])
+        self.assertFalse (PlayerStats.objects.exists ())
+
+    def test_duplicate_player_and_season_is_rejected (self):
+        stat_id = save_player_stats (self.story, [self.row (self.players[0])])[0]
+        rows = [self.row (self.players[1]), {'id': stat_id, 'goals': 4}, self.row (self.players[0])]
+        with self.assertRaises (StatsValidationError) as raised:
+            save_player_stats (self.story, rows)
+        self.assertEqual ([e['row'] for e in raised.exception.errors], [1, 2])
+        self.assertIn ("rows 1, 2", raised.exception.errors[0]['errors']['player'])
+        self.assertEqual (PlayerStats.objects.count (), 1)
+
+    def test_saving_over_an_existing_row_bumps_its_version (self):
+        stat_id = save_player_stats (self.story, [self.row (self.players[0])])[0]
+        self.assertEqual (PlayerStats.objects.get (id = stat_id).version, 1)
+
+        # No id, so the row is matched by season and player
+        self.assertEqual (save_player_stats (self.story, [self.row (self.players[0], goals = 5)]), [stat_id])
+        self.assertEqual (PlayerStats.objects.get (id = stat_id).version, 2)
+
+        with self.assertRaises (StatsConflict):
+            apply_stat_changes (self.story, [{'id': stat_id, 'version': 1, 'fields': {'goals': 9}}])
+        self.assertEqual (PlayerStats.objects.get (id = stat_id).goals, 5)
+
+    def test_view_returns_ids (self):
+        response = self.client.post (
+            f'/story/{self.story.id}/stats/save/',
+            data = json.dumps ({'stats': [self.row (self.players[0])]}),
+            content_type = 'application/json'
+        )
+        stat = PlayerStats.objects.get ()
+        self.assertEqual (response.json (), {'success': True, 'ids': [stat.id], 'new_player_id': stat.id})
+
+
+class PatchSeasonStatsTest (StoryFixtureMixin, TestCase):
+
+    def setUp (self):
+        super ().setUp ()
+        self.stat = PlayerStats.objects.create (story = self.story, season = self.season,
+                                                player = self.players[0])
+
+    def patch (self, version, **fields):
+        return self.client.patch (
+            f'/story/{self.story.id}/stats/patch/',
+            data = json.dumps ({'changes': [{'id': self.stat.id, 'version': version, 'fields': fields}]}),
+            content_type = 'application/json'
+        )
+
+    def test_single_cell_edit_bumps_version (self):
+        with CaptureQueriesContext (connection) as queries:
+            response = self.patch (1, goals = 7)
+        self.assertEqual (response.json ()['versions'], {str (self.stat.id): 2})
+        self.stat.refresh_from_db ()
+        self.assertEqual ((self.stat.goals, self.stat.version), (7, 2))
+        self.assertEqual (len ([q for q in queries if q['sql'].startswith ('UPDATE "cmGenerator_playerstats"')]), 1)
+
+    def test_stale_version_is_rejected (self):
+        self.patch (1, goals = 7)
+        response = self.patch (1, assists = 2)
+        self.assertEqual (response.status_code, 409)
+        self.assertEqual (response.json ()['conflicts'][0]['goals'], 7)
+        self.stat.refresh_from_db ()
+        self.assertEqual (self.stat.assists, 0)
+
+    def test_page_saves_edits_with_the_row_versions_it_loaded (self):
+        page = self.client.get (f'/season-stats/{self.story.id}/', {'season': "24/25"})
+        self.assertContains (page, f'/story/{self.story.id}/stats/patch/')
+        payload = self.client.get (f'/story/{self.story.id}/stats/payload/').json ()
+        self.assertEqual (payload['player_stats'][0]['version'], 1)
+        self.assertEqual (self.patch (payload['player_stats'][0]['version'], goals = 3).status_code, 200)
+
+    def test_adding_a_player_by_fifa_id_leaves_existing_rows_alone (self):
+        self.patch (1, goals = 7)
+        upload = json.dumps ([{'player_id': player.player_id} for player in self.players[:2]]).encode ()
+        response = self.client.post (f'/story/{self.story.id}/stats/import/', {
+            'season': "24/25", 'format': 'json', 'file': SimpleUploadedFile ("player.json", upload)
+        })
+        self.assertEqual (response.json ()['imported'], 1)
+        self.stat.refresh_from_db ()
+        self.assertEqual ((self.stat.goals, self.stat.version), (7, 2))
+        self.assertEqual (PlayerStats.objects.get (player = self.players[1]).goals, 0)
+
+
+class BatchTransfersTest (StoryFixtureMixin, TestCase):
+
+    def setUp (self):
+        super ().setUp ()
+        self.rival = Club.objects.create (
+            league = self.league, name = "Chelsea", overall = 80, att_rating = 80,
+            mid_rating = 80, def_rating = 80, country = "England", scout_region = "Europe",
+            dom_prestige = 8, intl_prestige = 8, league_rep = 8, youth_scouting_region = "Europe"
+        )
+
+    def create_op (self, player):
+        return {'op': 'create', 'transfer': {
+            'season': "24/25", 'player': player.id, 'from_club': self.rival.id,
+            'to_club': self.club.id, 'fee': "€5,000,000", 'transfer_date': "2024-08-01"
+        }}
+
+    def post (self, operations):
+        return self.client.post (
+            f'/story/{self.story.id}/transfers/batch/',
+            data = json.dumps ({'operations': operations}), content_type = 'application/json'
+        )
+
+    def test_page_edits_are_sent_as_one_batch (self):
+        self.post ([self.create_op (player) for player in self.players[:2]])
+        kept, removed = Transfer.objects.order_by ('id')
+        page = self.client.get (f'/season-stats/{self.story.id}/', {'season': "24/25"})
+        self.assertContains (page, f'/story/{self.story.id}/transfers/batch/')
+        self.assertNotContains (page, f'/story/{self.story.id}/delete-transfer/')
+
+        # The fee as the payload shows it, edited, plus a deletion
+        payload = self.client.get (f'/story/{self.story.id}/stats/payload/').json ()
+        self.assertEqual (payload['transfers_in'][0]['fee'], "5000000.00")
+        response = self.post ([{'op': 'update', 'transfer': {'id': kept.id, 'fee': "4500000.00"}},
+                               {'op': 'delete', 'id': removed.id}])
+        self.assertEqual (response.json ()['transfer_ids'], [kept.id, removed.id])
+        self.assertEqual (list (Transfer.objects.values_list ('fee', flat = True)), [4500000])
+
+    def test_window_is_applied_in_constant_queries (self):
+        self.post ([self.create_op (self.players[0])])
+        existing = Transfer.objects.get ()
+        operations = [self.create_op (player) for player in self.players[1:]]
+        operations += [{'op': 'update', 'transfer': {'id': existing.id, 'fee': "1000"}}]
+
+        with CaptureQueriesContext (connection) as queries:
+            response = self.post (operations)
+        self.assertTrue (response.json ()['success'])
+        self.assertEqual (Transfer.objects.count (), 5)
+        self.assertEqual (Transfer.objects.get (id = existing.id).fee, 1000)
+        self.assertLess (len (queries), 15)
+
+        response = self.post ([{'op': 'delete', 'id': existing.id}])
+        self.assertEqual (Transfer.objects.count (), 4)
+
+    def test_deletes_skip_the_per_row_summary_deltas (self):
+        players = [self.make_player (n) for n in range (10, 40)]
+        self.post ([self.create_op (player) for player in players])
+        self.assertEqual (StorySummary.objects.get (story = self.story).transfer_spend, 30 * 5000000)
+
+        with CaptureQueriesContext (connection) as queries:
+            response = self.post ([{'op': 'delete', 'id': t.id} for t in Transfer.objects.all ()])
+        self.assertTrue (response.json ()['success'])
+        self.assertLess (len (queries), 15)
+        self.assertEqual (StorySummary.objects.get (story = self.story).transfer_spend, 0)
+
+    def test_fee_too_large_for_the_column_is_reported (self):
+        op = self.create_op (self.players[0])
+        op['transfer']['fee'] = "1" * 13
+        response = self.post ([self.create_op (self.players[1]), op])
+        self.assertEqual (response.status_code, 400)
+        self.assertEqual (response.json ()['errors'][0]['operation'], 1)
+        self.assertIn ('fee', response.json ()['errors'][0]['errors'])
+        self.assertFalse (Transfer.objects.exists ())
+
+    def test_invalid_operation_writes_nothing (self):
+        bad = self.create_op (self.players[1])
+        bad['transfer']['season'] = "99/00"
+        response = self.post ([self.create_op (self.players[0]), bad])
+        self.assertEqual (response.status_code, 400)
+        self.assertEqual (response.json ()['errors'][0]['operation'], 1)
+        self.assertFalse (Transfer.objects.exists ())
+
+
+class ImportSeasonStatsTest (StoryFixtureMixin, TestCase):
+
+    CSV = (
+        "player_id,overall_rating,appearances,goals,assists,clean_sheets,red_cards,yellow_cards,average_rating\n"
+        "1,75,30,12,4,0,0,2,7.25\n"
+        "2,75,abc,0,0,0,0,0,6.5\n"
+        "999,70,10,1,1,0,0,0,6.8\n"
+        "3,71,20,2,3,0,1,4,6.9\n"
+    )
+
+    def upload (self, content, name = "stats.csv"):
+        return self.client.post (f'/story/{self.story.id}/stats/import/', {
+            'season': "24/25", 'file': SimpleUploadedFile (name, content.encode ()),
+        })
+
+    def test_csv_import_skips_bad_rows (self):
+        response = self.upload (self.CSV)
+        result = response.json ()
+        self.assertTrue (result['success'])
+        self.assertEqual ((result['rows'], result['imported'], result['error_count']), (4, 2, 2))
+        self.assertEqual ([error['line'] for error in result['errors']], [3, 4])
+        stats = PlayerStats.objects.get (season = self.season, player = self.players[0])
+        self.assertEqual ((stats.goals, str (stats.average_rating)), (12, "7.25"))
+
+        # Importing again updates the existing rows and bumps their version
+        self.upload (self.CSV)
+        stats.refresh_from_db ()
+        self.assertEqual ((PlayerStats.objects.count (), stats.version), (2, 2))
+
+    def test_json_lines_import (self):
+        rows = [{'player_id': 4, 'goals': 9, 'average_rating': "7.1"}, {'player_id': 5, 'appearances': 3}]
+        response = self.upload ('\n'.join (json.dumps (row) for row in rows), name = "stats.ndjson")
+        self.assertEqual (response.json ()['imported'], 2)
+        self.assertEqual (PlayerStats.objects.get (player = self.players[3]).goals, 9)
+
+    def test_partial_import_keeps_the_other_columns (self):
+        self.upload (self.CSV)
+        self.upload ("player_id,goals\n1,20\n")
+        stats = PlayerStats.objects.get (season = self.season, player = self.players[0])
+        self.assertEqual ((stats.goals, stats.appearances, str (stats.average_rating)), (20, 30, "7.25"))
+        self.assertEqual (stats.version, 2)
+
+    def test_json_rows_must_be_objects (self):
+        response = self.upload ('{"player_id": 1, "goals": 3}\n5\n"text"\n', name = "stats.ndjson")
+        result = response.json ()
+        self.assertEqual ((result['imported'], result['error_count']), (1, 2))
+        self.assertEqual ([error['line'] for error in result['errors']], [2, 3])
+
+
+class ImportPlayersTest (StoryFixtureMixin, TestCase):
+
+    CSV = (
+        "sofifa_id,short_name,long_name,player_positions,overall,potential,wage_eur,age,dob,"
+        "club_name,league_name,club_loaned_from,club_joined,club_contract_valid_until,nationality_name\n"
+        "1,B. Saka,Bukayo Saka,\"RW, LW\",86,91,150000,21,2001-09-05,Arsenal,Premier League,,2018-07-01,2027.0,England\n"
+        "100,M. Odegaard,Martin Odegaard,CAM,87,88,170000,24,1998-12-17,Arsenal,Premier League,,2021-08-20,2025,Norway\n"
+        "101,A. Nobody,A Nobody,ST,60,70,1000,20,2003-01-01,Nowhere FC,Nowhere League,,2022-07-01,2024,Spain\n"
+    )
+
+    def run_import (self, **kwargs):
+        return import_players (BytesIO (self.CSV.encode ()), source = "FIFA23_CSV_IMPORT", **kwargs)
+
+    def test_upserts_on_player_id (self):
+        totals = self.run_import (chunk_size = 1)
+        self.assertEqual ((totals['rows'], totals['imported'], totals['error_count']), (3, 2, 1))
+        self.assertEqual (totals['errors'][0]['errors'], {'club': "Unknown club 'Nowhere FC'"})
+
+        saka = Player.objects.get (player_id = 1)
+        self.assertEqual ((saka.name, saka.positions, saka.overall), ("Bukayo Saka", ['RW', 'LW'], 86))
+        self.assertEqual ((saka.import_source, saka.birth_year), ("FIFA23_CSV_IMPORT", 2001))
+        self.assertEqual (saka.contract_end, datetime.date (2027, 6, 30))
+
+        # Running the same file again changes nothing
+        self.run_import ()
+        self.assertEqual (Player.objects.count (), 6)
+
+    def test_resumes_after_start_row (self):
+        totals = self.run_import (start_row = 1)
+        self.assertEqual (totals['imported'], 1)
+        self.assertEqual (Player.objects.get (player_id = 1).name, "Player 1")
+        self.assertTrue (Player.objects.filter (player_id = 100).exists ())
+
+
+class ExportStoryTest (StoryFixtureMixin, TestCase):
+
+    def setUp (self):
+        super ().setUp ()
+        save_player_stats (self.story, [
+            {'season': "24/25", 'player': player.id, 'goals': n} for n, player in enumerate (self.players)
+        ])
+        Transfer.objects.create (
+            story = self.story, season = self.season, player = self.players[0], from_club = self.club,
+            to_club = self.club, fee = 1000, transfer_date = datetime.date (2024, 8, 1)
+        )
+
+    def export (self, fmt):
+        response = self.client.get (f'/story/{self.story.id}/export/', {'format': fmt})
+        self.assertEqual (response.status_code, 200)
+        return b''.join (response.streaming_content)
+
+    def test_ndjson_and_json_hold_the_same_records (self):
+        lines = [json.loads (line) for line in self.export ('ndjson').splitlines ()]
+        self.assertEqual (lines[0]['type'], 'story')
+        self.assertEqual (sum (line['type'] == 'player_stats' for line in lines), 5)
+
+        document = json.loads (self.export ('json'))
+        self.assertEqual (document['story']['name'], "Invincibles")
+        self.assertEqual ([row['goals'] for row in document['player_stats']], [0, 1, 2, 3, 4])
+        self.assertEqual (document['transfers'][0]['fifa_player_id'], 1)
+        self.assertEqual (document['award_winners'], [])
+
+    def test_zip_has_a_csv_per_section (self):
+        with zipfile.ZipFile (BytesIO (self.export ('zip'))) as archive:
+            self.assertIn ('seasons.csv', archive.namelist ())
+            rows = list (csv.DictReader (StringIO (archive.read ('player_stats.csv').decode ())))
+        self.assertEqual (len (rows), 5)
+        self.assertEqual (rows[0]['player_name'], "Player 1")
+
+    def restore (self, content, name = "story.ndjson"):
+        return self.client.post ('/story/import/', {'file': SimpleUploadedFile (name, content)})
+
+    def test_restore_round_trips_with_new_ids (self):
+        # The format comes from the content, whatever the file is called
+        for fmt in ('ndjson', 'json', 'zip'):
+            response = self.restore (self.export (fmt), name = "story.export")
+            result = response.json ()
+            self.assertTrue (result['success'], result)
+            self.assertEqual (result['counts'], {'story': 1, 'seasons': 1, 'player_stats': 5, 'transfers': 1})
+
+            restored = Story.objects.get (id = result['story_id'])
+            self.assertNotEqual (restored.slug, self.story.slug)
+            self.assertEqual (
+                sorted (restored.player_stats.values_list ('goals', flat = True)), [0, 1, 2, 3, 4]
+            )
+            self.assertEqual (restored.transfers.get ().season.story, restored)
+
+    def test_restore_with_unknown_player_writes_nothing (self):
+        content = self.export ('ndjson').replace (b'"fifa_player_id": 5', b'"fifa_player_id": 999')
+        response = self.restore (content)
+        self.assertEqual (response.status_code, 400)
+        self.assertEqual (response.json ()['errors'][0]['errors'], {'player': "Unknown player"})
+        self.assertEqual (response.json ()['error_count'], 1)
+        self.assertEqual (Story.objects.count (), 1)
+
+    def test_restore_with_duplicate_rows_reports_their_lines (self):
+        for fmt in ('ndjson', 'zip'):
+            if fmt == 'ndjson':
+                lines = self.export (fmt).splitlines (keepends = True)
+                content = b''.join (lines + [lines[2]])
+                duplicate = len (lines) + 1
+            else:
+                archive = BytesIO ()
+                with zipfile.ZipFile (BytesIO (self.export (fmt))) as source, \
+                        zipfile.ZipFile (archive, 'w') as target:
+                    for name in source.namelist ():
+                        data = source.read (name)
+                        if name == 'player_stats.csv':
+                            data += data.splitlines (keepends = True)[1]
+                        target.writestr (name, data)
+                content = archive.getvalue ()
+                duplicate = 7  # After the header and the five exported rows
+
+            response = self.restore (content, name = f"story.{fmt}")
+            self.assertEqual (response.status_code, 400)
+            error = response.json ()['errors'][0]
+            self.assertEqual (error['section'], 'player_stats')
+            self.assertEqual (error['errors'], {'row': "Duplicates another row of this section"})
+            self.assertEqual (error['line'], duplicate)
+            self.assertEqual (Story.objects.count (), 1)
+
+
+class SeasonStatsPayloadTest (StoryFixtureMixin, TestCase):
+
+    def test_payload_uses_a_fixed_number_of_queries (self):
+        rival = Club.objects.create (
+            league = self.league, name = "Chelsea", overall = 80, att_rating = 80,
+            mid_rating = 80, def_rating = 80, country = "England", scout_region = "Europe",
+            dom_prestige = 8, intl_prestige = 8, league_rep = 8, youth_scouting_region = "Europe"
+        )
+        save_player_stats (self.story, [
+            {'season': "24/25", 'player': player.id, 'goals': 1} for player in self.players
+        ])
+        for player, (source, target) in zip (self.players, [(rival, self.club), (self.club, rival)]):
+            Transfer.objects.create (
+                story = self.story, season = self.season, player = player, from_club = source,
+                to_club = target, fee = 100, transfer_date = datetime.date (2024, 8, 1)
+            )
+
+        url = f'/story/{self.story.id}/stats/payload/'
+        self.client.get (url)  # Warm the session
+        with CaptureQueriesContext (connection) as queries:
+            payload = self.client.get (url).json ()
+        self.assertEqual (payload['selected_season'], "24/25")
+        self.assertEqual (len (payload['player_stats']), 5)
+        self.assertEqual (payload['transfers_in'][0]['club'], "Chelsea")
+        self.assertEqual (payload['transfers_out'][0]['player_name'], "Player 2")
+        # Session, user, ETag check, story, seasons and four prefetches
+        self.assertLessEqual (len (queries), 9)
+
+        self.assertEqual (self.client.get (url, {'season': "99/00"}).status_code, 404)
+
+    def test_page_renders_a_shell_for_the_payload (self):
+        response = self.client.get (f'/season-stats/{self.story.id}/', {'season': "24/25"})
+        self.assertEqual (response.status_code, 200)
+        self.assertContains (response, f'/story/{self.story.id}/stats/payload/')
+        self.assertContains (response, '<option value="24/25" selected>')
+
+    def test_award_fields_match_the_payload_winners (self):
+        CompetitionWinner.objects.create (story = self.story, season = self.season,
+                                          competition = self.league, winner = self.club)
+        payload = self.client.get (f'/story/{self.story.id}/stats/payload/').json ()
+        self.assertEqual (payload['competition_winners'][0]['winner'], "Arsenal")
+
+        # Without ?season= the page waits for the payload to pick one
+        response = self.client.get (f'/season-stats/{self.story.id}/')
+        self.assertContains (response, f'data-competition="{payload["competition_winners"][0]["competition"]}"')
+        self.assertNotContains (response, '<option value="" selected>')
+
+    def test_cascade_delete_bumps_the_story_once (self):
+        save_player_stats (self.story, [
+            {'season': "24/25", 'player': player.id, 'goals': 1} for player in self.players
+        ])
+        version = Story.objects.get (id = self.story.id).data_version
+        with CaptureQueriesContext (connection) as queries:
+            Season.objects.get (id = self.season.id).delete ()
+        touches = [q for q in queries if q['sql'].startswith ('UPDATE "cmGenerator_story"')]
+        self.assertEqual (len (touches), 1)
+        self.assertEqual (Story.objects.get (id = self.story.id).data_version, version + 1)
+
+    def test_transfers_need_a_login (self):
+        self.client.logout ()
+        self.assertEqual (self.client.get (f'/story/{self.story.id}/get-transfers/').status_code, 302)
+
+    def test_unchanged_story_answers_not_modified (self):
+        url = f'/story/{self.story.id}/stats/payload/'
+        etag = self.client.get (url)['ETag']
+
+        with CaptureQueriesContext (connection) as queries:
+            response = self.client.get (url, HTTP_IF_NONE_MATCH = etag)
+        self.assertEqual (response.status_code, 304)
+        self.assertFalse (any ('playerstats' in q['sql'].lower () for q in queries.captured_queries))
+
+        # Bulk saves and single-row saves both invalidate the ETag
+        save_player_stats (self.story, [{'season': "24/25", 'player': self.players[0].id}])
+        response = self.client.get (url, HTTP_IF_NONE_MATCH = etag)
+        self.assertEqual (response.status_code, 200)
+
+        etag = response['ETag']
+        Season.objects.create (story = self.story, name = "25/26", season_number = 2)
+        self.assertEqual (self.client.get (url, HTTP_IF_NONE_MATCH = etag).status_code, 200)
+        self.assertEqual (
+            self.client.get (f'/story/{self.story.id}/get-seasons/').json ()['seasons'], ["24/25", "25/26"]
+        )
+
+
+@override_settings (MY_STORIES_PAGE_SIZE = 2)
+class MyStoriesPaginationTest (StoryFixtureMixin, TestCase):
+
+    def setUp (self):
+        super ().setUp ()
+        for n in range (4):
+            Story.objects.create (
+                user = self.user, club = self.club, name = f"Story {n}", formation = "4-3-3",
+                challenge = "Win", background = "<p>Long background</p>"
+            )
+
+    def test_pages_walk_every_story_once (self):
+        seen = []
+        cursor = ''
+        while True:
+            with CaptureQueriesContext (connection) as queries:
+                page = self.client.get ('/my-stories/', {'format': 'json', 'cursor': cursor}).json ()
+            self.assertFalse (any ('"background"' in q['sql'] for q in queries.captured_queries))
+            seen += [story['id'] for story in page['stories']]
+            cursor = page['next_cursor']
+            if not cursor:
+                break
+        expected = list (Story.objects.filter (user = self.user).order_by ('-created_at', '-id')
+                                      .values_list ('id', flat = True))
+        self.assertEqual (seen, expected)
+
+        response = self.client.get (f'/story/{seen[0]}/background/')
+        self.assertEqual (response.json ()['background'], "<p>Long background</p>")
+
+    def test_html_page_links_to_the_next_page (self):
+        with CaptureQueriesContext (connection) as queries:
+            response = self.client.get ('/my-stories/')
+        self.assertEqual (len (response.context['stories']), 2)
+        self.assertContains (response, 'id="load-more-stories"')
+        self.assertContains (response, '<h1 class="my-4 text-center">My Saved Stories</h1>', count = 1)
+        self.assertContains (response, 'class="story-container"', count = 2)
+        for story in response.context['stories']:
+            self.assertContains (response, f'id="background-{story.id}"', count = 1)
+        self.assertFalse (any ('"background"' in q['sql'] for q in queries.captured_queries))
+        self.assertEqual (self.client.get ('/my-stories/', {'cursor': 'nope'}).status_code, 400)
+
+
+class StoryStatisticsTest (StoryFixtureMixin, TestCase):
+
+    def test_annotated_statistics_match_per_story_queries (self):
+        self.season.is_current = True
+        self.season.save ()
+        Season.objects.create (story = self.story, name = "25/26", season_number = 2)
+        Transfer.objects.create (
+            story = self.story, season = self.season, player = self.players[0], from_club = self.club,
+            to_club = self.club, fee = 1, transfer_date = datetime.date (2024, 8, 1)
+        )
+        for n in range (49):
+            Story.objects.create (user = self.user, club = self.club, name = f"Extra {n}",
+                                  formation = "4-4-2", challenge = "Win")
+
+        with self.assertNumQueries (1):
+            stories = list (Story.objects.filter (user = self.user).with_statistics ())
+            annotated = {story.id: story.get_statistics () for story in stories}
+        self.assertEqual (len (annotated), 50)
+
+        expected = self.story.get_statistics ()
+        self.assertEqual (annotated[self.story.id]['current_season'], expected['current_season'])
+        self.assertEqual (
+            {key: annotated[self.story.id][key] for key in ('total_seasons', 'trophies', 'transfers')},
+            {'total_seasons': 2, 'trophies': 0, 'transfers': 1}
+        )
+
+
+class StorySummaryTest (StoryFixtureMixin, TestCase):
+
+    def setUp (self):
+        super ().setUp ()
+        self.rival = Club.objects.create (
+            league = self.league, name = "Chelsea", overall = 80, att_rating = 80,
+            mid_rating = 80, def_rating = 80, country = "England", scout_region = "Europe",
+            dom_prestige = 8, intl_prestige = 8, league_rep = 8, youth_scouting_region = "Europe"
+        )
+
+    def totals (self):
+        return self.client.get (f'/story/{self.story.id}/summary/').json ()
+
+    def test_totals_follow_row_and_bulk_writes (self):
+        save_player_stats (self.story, [
+            {'season': "24/25", 'player': player.id, 'goals': 2, 'appearances': 10} for player in self.players
+        ])
+        stat = PlayerStats.objects.get (player = self.players[0])
+        stat.goals = 12
+        stat.save ()
+        signing = Transfer.objects.create (
+            story = self.story, season = self.season, player = self.players[0], from_club = self.rival,
+            to_club = self.club, fee = 5000, transfer_date = datetime.date (2024, 8, 1)
+        )
+        Transfer.objects.create (
+            story = self.story, season = self.season, player = self.players[1], from_club = self.club,
+            to_club = self.rival, fee = 2000, transfer_date = datetime.date (2024, 8, 2)
+        )
+        CompetitionWinner.objects.create (
+            story = self.story, season = self.season, competition = self.league, winner = self.club
+        )
+
+        totals = self.totals ()
+        self.assertEqual ((totals['total_goals'], totals['total_appearances'], totals['trophies']), (20, 50, 1))
+        self.assertEqual ((totals['transfer_spend'], totals['net_spend']), ("5000.00", "3000.00"))
+
+        signing.delete ()
+        self.assertEqual (self.totals ()['transfer_spend'], "0.00")
+
+    def test_rebuild_repairs_drift (self):
+        save_player_stats (self.story, [{'season': "24/25", 'player': self.players[0].id, 'goals': 3}])
+        StorySummary.objects.filter (story = self.story).update (total_goals = 99)
+
+        out = StringIO ()
+        call_command ('rebuild_story_summaries', stdout = out)
+        self.assertIn ("repaired 1", out.getvalue ())
+        self.assertEqual (StorySummary.objects.get (story = self.story).total_goals, 3)
+
+        # Deleting the story takes its summary with it
+        self.story.delete ()
+        self.assertFalse (StorySummary.objects.exists ())
+
+
+class RecomputeSeasonStatsTest (StoryFixtureMixin, TestCase):
+
+    def setUp (self):
+        super ().setUp ()
+        self.cup = Competition.objects.create (
+            name = "FA Cup", competition_type = 'CUP', country = "England", league_rep = 5, tier = 1,
+            min_wage_budget = 0
+        )
+        # bulk_create skips the signals that roll each row up as it is saved
+        CompetitionPlayerStats.objects.bulk_create ([
+            CompetitionPlayerStats (
+                story = self.story, season = self.season, competition = competition, player = player,
+                appearances = 5, goals = goals, average_rating = rating
+            )
+            for competition, goals, rating in ((self.league, 10, "7.00"), (self.cup, 3, "8.00"))
+            for player in self.players
+        ])
+
+    def test_squad_is_recomputed_in_one_statement (self):
+        save_player_stats (self.story, [{'season': "24/25", 'player': self.players[0].id, 'goals': 99}])
+
+        with CaptureQueriesContext (connection) as queries:
+            written = recompute_season_stats (self.season)
+        self.assertEqual (written, 5)
+        # The upsert itself and the summary refresh that reads it back
+        self.assertEqual (len ([q for q in queries if 'cmGenerator_playerstats' in q['sql']]), 2)
+
+        stats = PlayerStats.objects.get (player = self.players[0])
+        self.assertEqual ((stats.goals, stats.appearances, str (stats.average_rating)), (13, 10, "7.50"))
+        self.assertEqual (stats.version, 2)
+        self.assertEqual (StorySummary.objects.get (story = self.story).total_goals, 65)
+
+        # Nothing changed, so nothing is rewritten
+        self.assertEqual (recompute_season_stats (self.season), 0)
+
+    def test_single_row_update_from_competitions (self):
+        stats = PlayerStats.objects.create (story = self.story, season = self.season, player = self.players[1])
+        stats.update_from_competitions ()
+        stats.refresh_from_db ()
+        self.assertEqual ((stats.goals, stats.appearances, str (stats.average_rating)), (13, 10, "7.50"))
+
+
+class CompetitionStatsDeltaTest (StoryFixtureMixin, TestCase):
+
+    def setUp (self):
+        super ().setUp ()
+        self.player = self.players[0]
+        self.competitions = [self.league] + [
+            Competition.objects.create (
+                name = f"Cup {n}", competition_type = 'CUP', country = "England", league_rep = 5,
+                tier = 1, min_wage_budget = 0
+            )
+            for n in range (4)
+        ]
+
+    def entry (self, competition, **stats):
+        return CompetitionPlayerStats.objects.create (
+            story = self.story, season = self.season, competition = competition, player = self.player,
+            **stats
+        )
+
+    def stats (self):
+        return PlayerStats.objects.get (season = self.season, player = self.player)
+
+    def test_first_entry_creates_the_season_row (self):
+        self.entry (self.league, appearances = 2, goals = 1, average_rating = "7.00")
+        stats = self.stats ()
+        self.assertEqual ((stats.appearances, stats.goals, str (stats.average_rating)), (2, 1, "7.00"))
+        self.assertEqual (StorySummary.objects.get (story = self.story).total_goals, 1)
+
+    def test_match_entry_costs_the_same_for_every_competition_count (self):
+        rows = [self.entry (competition, appearances = 1, goals = 1, average_rating = "6.00")
+                for competition in self.competitions]
+
+        counts = []
+        for row in (rows[0], rows[-1]):
+            row.appearances += 1
+            row.goals += 2
+            row.average_rating = "7.00"
+            with CaptureQueriesContext (connection) as queries:
+                row.save ()
+            counts.append (len (queries))
+        self.assertEqual (counts[0], counts[1])
+
+        stats = self.stats ()
+        self.assertEqual ((stats.appearances, stats.goals), (7, 9))
+        # Weighted by appearances: (3 × 6.00 + 2 × 2 × 7.00) / 7
+        self.assertEqual (str (stats.average_rating), "6.57")
+        self.assertEqual (StorySummary.objects.get (story = self.story).total_goals, 9)
+
+        stats.update_from_competitions ()
+        self.assertEqual (str (self.stats ().average_rating), "6.57")
+
+    def test_deleting_an_entry_takes_it_back_out (self):
+        self.entry (self.league, appearances = 3, goals = 2, average_rating = "8.00")
+        cup = self.entry (self.competitions[1], appearances = 1, goals = 1, average_rating = "4.00")
+        self.assertEqual (str (self.stats ().average_rating), "7.00")
+
+        cup.delete ()
+        stats = self.stats ()
+        self.assertEqual ((stats.appearances, stats.goals, str (stats.average_rating)), (3, 2, "8.00"))
+        self.assertEqual (StorySummary.objects.get (story = self.story).total_goals, 2)
+
+    def test_repeated_edits_match_a_full_recompute (self):
+        rows = [self.entry (competition, appearances = 1, average_rating = "6.00")
+                for competition in self.competitions[:3]]
+        for n in range (20):
+            row = rows[n % 3]
+            row.appearances += 1
+            row.average_rating = f"{6 + (n % 7) * 0.37:.2f}"
+            row.save ()
+        self.assertEqual (recompute_season_stats (self.season), 0)
+
+    def test_competition_rows_own_the_rolled_up_columns (self):
+        save_player_stats (self.story, [{'season': "24/25", 'player': self.player.id, 'goals': 50,
+                                          'overall_rating': 80}])
+        cup = self.entry (self.league, appearances = 2, goals = 1, average_rating = "7.00")
+        stats = self.stats ()
+        self.assertEqual ((stats.goals, stats.appearances, stats.overall_rating), (1, 2, 80))
+
+        cup.delete ()
+        self.assertEqual ((self.stats ().goals, str (self.stats ().average_rating)), (0, "0.00"))
+
+    def test_deleting_the_season_leaves_the_summary_consistent (self):
+        self.entry (self.league, appearances = 3, goals = 2, average_rating = "8.00")
+        self.season.delete ()
+        self.assertEqual (StorySummary.objects.get (story = self.story).total_goals, 0)
+
+
+class StoryLeaderboardsTest (StoryFixtureMixin, TestCase):
+
+    def setUp (self):
+        super ().setUp ()
+        leaderboard_cache.clear ()
+        self.url = f"/story/{self.story.id}/leaderboards/"
+        seasons = [self.season] + [
+            Season.objects.create (story = self.story, name = f"{24 + n}/{25 + n}", season_number = n + 1)
+            for n in range (1, 3)
+        ]
+        # Player n scores n goals a season; player 1 plays too little to be rated
+        PlayerStats.objects.bulk_create ([
+            PlayerStats (
+                story = self.story, season = season, player = player, goals = n, assists = 6 - n,
+                appearances = 1 if n == 1 else 10, average_rating = f"{5 + n}.00"
+            )
+            for season in seasons
+            for n, player in enumerate (self.players, 1)
+        ])
+
+    def test_career_totals_are_ranked_in_one_query (self):
+        with CaptureQueriesContext (connection) as queries:
+            response = self.client.get (self.url, {'limit': 3})
+        boards = response.json ()['leaderboards']
+        # The story version lookup and the leaderboards themselves
+        self.assertEqual (len ([q for q in queries if 'cmGenerator_story"' in q['sql'] or 'RANK()' in q['sql']]), 2)
+
+        self.assertEqual ([(e['name'], e['value'], e['rank']) for e in boards['goals']],
+                          [("Player 5", 15, 1), ("Player 4", 12, 2), ("Player 3", 9, 3)])
+        self.assertEqual (boards['assists'][0]['name'], "Player 1")
+        self.assertEqual (boards['goals'][0]['seasons'], 3)
+        # Tied on 30 appearances, so all four share first place
+        self.assertEqual ([e['rank'] for e in boards['appearances']], [1, 1, 1, 1])
+        self.assertEqual (boards['clean_sheets'], [])
+        self.assertEqual ([e['name'] for e in boards['average_rating']], ["Player 5", "Player 4", "Player 3"])
+        self.assertNotIn ("Player 1", [e['name'] for e in boards['average_rating']])
+
+    def test_cached_until_the_story_changes (self):
+        self.client.get (self.url)
+        with CaptureQueriesContext (connection) as queries:
+            self.client.get (self.url)
+        self.assertFalse ([q for q in queries if 'RANK()' in q['sql']])
+
+        stats = PlayerStats.objects.get (season = self.season, player = self.players[0])
+        stats.goals = 50
+        stats.save ()
+        boards = self.client.get (self.url).json ()['leaderboards']
+        self.assertEqual ((boards['goals'][0]['name'], boards['goals'][0]['value']), ("Player 1", 52))
+
+    def test_rejects_bad_limits_and_other_users (self):
+        self.assertEqual (self.client.get (self.url, {'limit': 0}).status_code, 400)
+        self.assertEqual (self.client.get (self.url, {'limit': "ten"}).status_code, 400)
+        self.client.force_login (User.objects.create_user ("rival", password = "pass"))
+        self.assertEqual (self.client.get (self.url).status_code, 404)
@@ -9,16 +9,27 @@ urlpatterns = [
     path('logout/', views.custom_logout, name='logout'),
     path('register/', views.register, name='register'),
     path('generate/', views.generate_story, name='generate'),
+    path('generate/pool/', views.story_pool_status, name='story_pool_status'),
+    path('generate/jobs/<uuid:job_id>/', views.generation_job, name='generation_job'),
     path('my-stories/', views.my_stories, name='my_stories'),
+    path('story/<int:story_id>/background/', views.story_background, name='story_background'),
+    path('story/<int:story_id>/summary/', views.story_summary, name='story_summary'),
+    path('story/<int:story_id>/leaderboards/', views.story_leaderboards, name='story_leaderboards'),
     path('save-story/', views.save_story, name='save_story'),
     path('add-season-stats/', views.save_season_stats, name='add_season_stats'),
     path('season-stats/<int:story_id>/', views.season_stats, name='season_stats'),
     path('save-season-stats/<int:story_id>/', views.save_season_stats, name='save_season_stats'),
     path('story/<int:story_id>/stats/save/', views.save_season_stats, name='save_season_stats'),
+    path('story/<int:story_id>/stats/patch/', views.patch_season_stats, name='patch_season_stats'),
+    path('story/<int:story_id>/stats/import/', views.import_season_stats, name='import_season_stats'),
+    path('story/<int:story_id>/stats/payload/', views.season_stats_payload, name='season_stats_payload'),
     path('story/<int:story_id>/add-season/', views.add_season, name='add_season'),
     path('save-season-awards/<int:story_id>/', views.save_season_awards, name='save_season_awards'),
     path('story/<int:story_id>/save-transfer/', views.save_transfer, name='save_transfer'),
     path('story/<int:story_id>/delete-transfer/', views.delete_transfer, name='delete_transfer'),
+    path('story/<int:story_id>/transfers/batch/', views.batch_transfers, name='batch_transfers'),
     path('story/<int:story_id>/get-transfers/', views.get_transfers, name='get_transfers'),
     path('story/<int:story_id>/get-seasons/', views.get_seasons, name='get_seasons'),
+    path('story/<int:story_id>/export/', views.export_story_view, name='export_story'),
+    path('story/import/', views.import_story, name='import_story'),
 ]
\ No newline at end of file
@@ -0,0 +1,157 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import F
+from django.utils import timezone
+from ..models import ClubBackground
+
+
+class LRUCache:
+    """
+    Small thread-safe LRU cache with a per-entry time to live.
+    """
+
+    def __init__(self, maxsize=256, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, stored_at = item
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, stored_at=None):
+        """
+        Stores a value. `stored_at` is the time.monotonic() time the value
+        was made, for values that were already some way through their TTL.
+        """
+        with self._lock:
+            self._data[key] = (value, time.monotonic() if stored_at is None else stored_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class BackgroundCache:
+    """
+    Two-tier cache of generated club backgrounds.
+
+    Lookups go to a per-process LRU first and then to the ClubBackground
+    table, which is shared by every worker. Entries are keyed by club,
+    prompt version and model name and expire after BACKGROUND_CACHE_TTL
+    seconds. The table is trimmed to BACKGROUND_CACHE_MAX_ROWS entries,
+    dropping the least recently used first.
+    """
+
+    def __init__(self):
+        self.memory = LRUCache(
+            maxsize=getattr(settings, 'BACKGROUND_CACHE_MEMORY_SIZE', 256),
+            ttl=self.ttl,
+        )
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'BACKGROUND_CACHE_TTL', 60 * 60 * 24 * 30)
+
+    @property
+    def max_rows(self):
+        return getattr(settings, 'BACKGROUND_CACHE_MAX_ROWS', 5000)
+
+    def get(self, club, prompt_version, model_name):
+        """Returns the cached background or None on a miss."""
+        key = (club, prompt_version, model_name)
+        background = self.memory.get(key)
+        if background is not None:
+            return background
+
+        cutoff = timezone.now() - timedelta(seconds=self.ttl)
+        entry = ClubBackground.objects.filter(
+            club_name=club,
+            prompt_version=prompt_version,
+            model_name=model_name,
+            created_at__gte=cutoff,
+        ).only('id', 'background', 'created_at').first()
+        if entry is None:
+            return None
+
+        now = timezone.now()
+        ClubBackground.objects.filter(pk=entry.pk).update(
+            hits=F('hits') + 1, last_used_at=now
+        )
+        # The memory copy expires when the row does, not a full TTL later
+        age = (now - entry.created_at).total_seconds()
+        self.memory.set(key, entry.background, stored_at=time.monotonic() - age)
+        return entry.background
+
+    def cached_clubs(self, prompt_version, model_name):
+        """Returns the set of clubs with an unexpired background in the database."""
+        cutoff = timezone.now() - timedelta(seconds=self.ttl)
+        return set(ClubBackground.objects.filter(
+            prompt_version=prompt_version,
+            model_name=model_name,
+            created_at__gte=cutoff,
+        ).values_list('club_name', flat=True))
+
+    def set(self, club, prompt_version, model_name, background):
+        """Stores a background in both tiers, replacing any older entry."""
+        self.memory.set((club, prompt_version, model_name), background)
+        now = timezone.now()
+        try:
+            ClubBackground.objects.update_or_create(
+                club_name=club,
+                prompt_version=prompt_version,
+                model_name=model_name,
+                defaults={
+                    'background': background,
+                    'created_at': now,
+                    'last_used_at': now,
+                    'hits': 0,
+                },
+            )
+        except IntegrityError:
+            return  # Another worker stored the same key first
+        self.evict()
+
+    def delete(self, club, prompt_version, model_name):
+        """Drops a background from both tiers."""
+        self.memory.delete((club, prompt_version, model_name))
+        ClubBackground.objects.filter(
+            club_name=club, prompt_version=prompt_version, model_name=model_name
+        ).delete()
+
+    def evict(self):
+        """Deletes expired rows and trims the table down to max_rows."""
+        cutoff = timezone.now() - timedelta(seconds=self.ttl)
+        ClubBackground.objects.filter(created_at__lt=cutoff).delete()
+
+        stale = ClubBackground.objects.order_by('-last_used_at')\
+                    .values_list('id', flat=True)[self.max_rows:]
+        stale_ids = list(stale)
+        if stale_ids:
+            ClubBackground.objects.filter(id__in=stale_ids).delete()
+
+
+background_cache = BackgroundCache()
@@ -0,0 +1,78 @@
+import os
+import random
+import threading
+import time
+from django.conf import settings
+
+CATALOG_FILES = {
+    'clubs': 'fifaClubTeams.txt',
+    'formations': 'fifaFormations.txt',
+    'challenges': 'fifaChallenges.txt',
+    'national_teams': 'fifaNationalTeams.txt',
+}
+
+
+class ReferenceCatalog:
+    """
+    Process-wide, read-only copy of the reference data files.
+
+    Each file is read once into a tuple so picking a random entry is an O(1)
+    index with no file I/O. Files are re-checked at most every
+    `check_interval` seconds and reloaded when their mtime changes, so edits
+    to the data directory are picked up without restarting the server.
+    """
+
+    def __init__(self, data_dir=None, files=CATALOG_FILES, check_interval=5.0):
+        self.data_dir = data_dir
+        self.files = dict(files)
+        self.check_interval = check_interval
+        self._entries = {}
+        self._mtimes = {}
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def path(self, name):
+        data_dir = self.data_dir or os.path.join(settings.BASE_DIR, 'cmGenerator/data')
+        return os.path.join(data_dir, self.files[name])
+
+    def _read(self, name):
+        path = self.path(name)
+        mtime = os.stat(path).st_mtime
+        with open(path, 'r') as f:
+            entries = tuple(line.strip() for line in f if line.strip())
+        self._entries[name] = entries
+        self._mtimes[name] = mtime
+
+    def load(self):
+        """Reads every catalog file into memory."""
+        with self._lock:
+            for name in self.files:
+                self._read(name)
+            self._last_check = time.monotonic()
+
+    def reload_if_changed(self):
+        """Re-reads any file whose mtime has changed since it was loaded."""
+        now = time.monotonic()
+        if self._entries and now - self._last_check < self.check_interval:
+            return
+        with self._lock:
+            self._last_check = now
+            for name in self.files:
+                try:
+                    mtime = os.stat(self.path(name)).st_mtime
+                except OSError:
+                    continue  # Keep serving the last good copy
+                if name not in self._entries or mtime != self._mtimes.get(name):
+                    self._read(name)
+
+    def get(self, name):
+        """Returns the entries for a catalog file as a tuple."""
+        self.reload_if_changed()
+        return self._entries[name]
+
+    def choice(self, name):
+        """Returns a random entry from a catalog file."""
+        return random.choice(self.get(name))
+
+
+catalog = ReferenceCatalog()
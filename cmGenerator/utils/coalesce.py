@@ -0,0 +1,159 @@
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+from django.conf import settings
+from django.db import connection
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class Broadcast:
+    """Chunks from one producer, replayed to any number of readers."""
+
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.cond = threading.Condition()
+
+    def publish(self, chunk):
+        with self.cond:
+            self.chunks.append(chunk)
+            self.cond.notify_all()
+
+    def close(self, error=None):
+        with self.cond:
+            self.done = True
+            self.error = error
+            self.cond.notify_all()
+
+    def subscribe(self):
+        position = 0
+        while True:
+            with self.cond:
+                while position >= len(self.chunks) and not self.done:
+                    self.cond.wait()
+                new = self.chunks[position:]
+                position = len(self.chunks)
+                done, error = self.done, self.error
+            yield from new
+            if done:
+                if error is not None:
+                    raise error
+                return
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into a single call.
+
+    While a call for a key is in flight, later callers wait for it and get
+    the same result (or exception) instead of starting their own.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._streams = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """Runs fn() once per key at a time and returns its result to every caller."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    def stream(self, key, fn):
+        """
+        Returns an iterator over the chunks produced by fn() for this key.
+
+        fn() runs once in a background thread, so the generation carries on
+        even if the first reader disconnects. Readers that join late get
+        every chunk produced so far and then follow along live.
+        """
+        with self._lock:
+            flight = self._streams.get(key)
+            if flight is None:
+                flight = self._streams[key] = Broadcast()
+                threading.Thread(
+                    target=self._pump, args=(key, flight, fn), daemon=True
+                ).start()
+        return flight.subscribe()
+
+    def _pump(self, key, flight, fn):
+        error = None
+        try:
+            for chunk in fn():
+                flight.publish(chunk)
+        except Exception as e:
+            error = e
+        finally:
+            with self._lock:
+                del self._streams[key]
+            flight.close(error)
+            connection.close()  # This thread's own database connection
+
+
+def lock_id(name):
+    """Maps a lock name to the 64-bit key Postgres advisory locks take."""
+    return int.from_bytes(hashlib.sha1(name.encode()).digest()[:8], 'big', signed=True)
+
+
+@contextmanager
+def advisory_lock(name, wait=None):
+    """
+    Tries to hold a Postgres session advisory lock for `name` across all
+    workers, polling pg_try_advisory_lock for up to `wait` seconds
+    (BACKGROUND_LOCK_WAIT by default) rather than queueing on it.
+
+    Yields True if the lock is held and False if it was not free in time,
+    in which case the caller carries on uncoalesced instead of blocking
+    behind a slow holder. Always yields False on other databases and when
+    BACKGROUND_LOCK_ACROSS_WORKERS is off, which it must be behind a
+    transaction-mode pooler where session locks do not stick to a backend.
+    """
+    if connection.vendor != 'postgresql' or not getattr(settings, 'BACKGROUND_LOCK_ACROSS_WORKERS', True):
+        yield False
+        return
+
+    key = lock_id(name)
+    if wait is None:
+        wait = getattr(settings, 'BACKGROUND_LOCK_WAIT', 30)
+    deadline = time.monotonic() + wait
+    with connection.cursor() as cursor:
+        while True:
+            cursor.execute("SELECT pg_try_advisory_lock(%s)", [key])
+            acquired = cursor.fetchone()[0]
+            if acquired or time.monotonic() >= deadline:
+                break
+            time.sleep(0.25)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_unlock(%s)", [key])
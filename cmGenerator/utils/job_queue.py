@@ -0,0 +1,99 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from ..models import GenerationJob
+from .coalesce import lock_id
+from .story_generator import generate_club_background, pick_story_elements
+
+
+class QueueFull(Exception):
+    """Raised when the generation queue is at GENERATION_QUEUE_MAX pending jobs."""
+
+
+def queue_depth():
+    """Returns the number of jobs waiting for a worker."""
+    return GenerationJob.objects.filter(status='PENDING').count()
+
+
+def enqueue(refresh=False, story=None):
+    """
+    Queues a story generation and returns the job.
+
+    Args:
+        refresh (bool): Regenerate the background even if it is cached.
+        story (dict): A finished story (e.g. from the pool). The job is
+            created already DONE instead of being queued.
+
+    Raises:
+        QueueFull: If the queue already holds GENERATION_QUEUE_MAX pending jobs.
+    """
+    if story is not None:
+        return GenerationJob.objects.create(
+            status='DONE', finished_at=timezone.now(), **story
+        )
+
+    with transaction.atomic():
+        # Serializes the depth check with the insert, so concurrent requests
+        # cannot all see room for one more job. Released at commit.
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_xact_lock(%s)", [lock_id('generation-queue')])
+        if queue_depth() >= settings.GENERATION_QUEUE_MAX:
+            raise QueueFull("Too many stories are being generated, please try again shortly.")
+        return GenerationJob.objects.create(refresh=refresh, **pick_story_elements())
+
+
+def claim_job():
+    """
+    Marks the oldest pending job as RUNNING and returns it, or None.
+
+    SKIP LOCKED lets any number of workers claim jobs without blocking or
+    double-claiming.
+    """
+    with transaction.atomic():
+        job = GenerationJob.objects.select_for_update(skip_locked=True)\
+                  .filter(status='PENDING')\
+                  .order_by('created_at')\
+                  .first()
+        if job is None:
+            return None
+        job.status = 'RUNNING'
+        job.started_at = timezone.now()
+        job.save(update_fields=['status', 'started_at'])
+    return job
+
+
+def run_job(job):
+    """Generates the background for a claimed job and records the outcome."""
+    try:
+        job.background = generate_club_background(job.club, refresh=job.refresh)
+        job.status = 'DONE'
+    except Exception as e:
+        job.error = str(e)
+        job.status = 'FAILED'
+    job.finished_at = timezone.now()
+    job.save(update_fields=['background', 'error', 'status', 'finished_at'])
+
+
+def requeue_stale(max_runtime=None):
+    """
+    Puts RUNNING jobs whose worker died back in the queue.
+
+    Returns:
+        int: The number of jobs requeued.
+    """
+    if max_runtime is None:
+        max_runtime = timedelta(seconds=settings.LLM_TIMEOUT * (settings.LLM_MAX_RETRIES + 1) * 2)
+    cutoff = timezone.now() - max_runtime
+    return GenerationJob.objects.filter(status='RUNNING', started_at__lt=cutoff)\
+               .update(status='PENDING', started_at=None)
+
+
+def prune(max_age=timedelta(days=1)):
+    """Deletes finished jobs older than max_age, returning the count."""
+    cutoff = timezone.now() - max_age
+    deleted, _ = GenerationJob.objects.filter(
+        status__in=['DONE', 'FAILED'], finished_at__lt=cutoff
+    ).delete()
+    return deleted
@@ -0,0 +1,98 @@
+from django.conf import settings
+from django.db import connection
+from ..models import Player, PlayerStats
+from .background_cache import LRUCache
+
+# Leaderboard name: the career total it ranks by, summed over every season
+LEADERBOARD_TOTALS = {
+    'goals': "SUM(goals)",
+    'assists': "SUM(assists)",
+    'appearances': "SUM(appearances)",
+    'clean_sheets': "SUM(clean_sheets)",
+    # Weighted by appearances, like the season roll-up from competitions
+    'average_rating': "ROUND(SUM(average_rating * appearances) / NULLIF(SUM(appearances), 0), 2)",
+}
+LEADERBOARDS = list(LEADERBOARD_TOTALS)
+
+# Keyed by (story id, data_version, size); a write to the story bumps its
+# data_version, so stale entries are never read again and age out of the LRU
+leaderboard_cache = LRUCache(maxsize=getattr(settings, 'LEADERBOARD_CACHE_SIZE', 256))
+
+
+def compute_leaderboards(story_id, size):
+    """
+    Ranks a story's players by their career totals across every season.
+
+    One query sums each player's PlayerStats (an index-only scan of
+    playerstats_career_idx), ranks the totals with a RANK() window per
+    leaderboard and keeps the players who make the top `size` of any of
+    them. Players need LEADERBOARD_MIN_APPEARANCES career appearances to
+    be ranked by average rating, and nobody is ranked on a zero total.
+
+    Returns:
+        dict: {leaderboard: [{'rank', 'player', 'fifa_player_id', 'name',
+        'seasons', 'value'}, ...]} in rank order. Tied players share a rank,
+        so a board can run past `size` on a tie for the last place.
+    """
+    qn = connection.ops.quote_name
+    min_appearances = getattr(settings, 'LEADERBOARD_MIN_APPEARANCES', 10)
+    qualifies = {name: f"{name} > 0" for name in LEADERBOARDS}
+    qualifies['average_rating'] = "appearances >= %s AND average_rating IS NOT NULL"
+
+    # A player outside a board sorts below everyone on it, so the board's
+    # rank is counted among qualifying players only
+    ranks = ', '.join(
+        f"RANK() OVER (ORDER BY ({qualifies[name]}) DESC, {name} DESC) AS {name}_rank"
+        for name in LEADERBOARDS
+    )
+    params = [story_id, min_appearances, size]
+    sql = (
+        f"WITH totals AS ("
+        f"SELECT player_id, COUNT(*) AS seasons, "
+        + ', '.join(f"{total} AS {name}" for name, total in LEADERBOARD_TOTALS.items())
+        + f" FROM {qn(PlayerStats._meta.db_table)} WHERE story_id = %s GROUP BY player_id"
+        f"), ranked AS (SELECT totals.*, {ranks} FROM totals) "
+        f"SELECT ranked.*, p.player_id AS fifa_player_id, p.name "
+        f"FROM ranked JOIN {qn(Player._meta.db_table)} p ON p.id = ranked.player_id "
+        f"WHERE LEAST({', '.join(f'{name}_rank' for name in LEADERBOARDS)}) <= %s"
+    )
+
+    boards = {name: [] for name in LEADERBOARDS}
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        columns = [column.name for column in cursor.description]
+        for row in cursor:
+            row = dict(zip(columns, row))
+            for name in LEADERBOARDS:
+                if name == 'average_rating':
+                    qualified = row['average_rating'] is not None and row['appearances'] >= min_appearances
+                else:
+                    qualified = row[name] > 0
+                if qualified and row[f'{name}_rank'] <= size:
+                    boards[name].append({
+                        'rank': row[f'{name}_rank'],
+                        'player': row['player_id'],
+                        'fifa_player_id': row['fifa_player_id'],
+                        'name': row['name'],
+                        'seasons': row['seasons'],
+                        'value': row[name],
+                    })
+    for board in boards.values():
+        board.sort(key=lambda entry: (entry['rank'], entry['name']))
+    return boards
+
+
+def get_leaderboards(story_id, data_version, size=None):
+    """
+    Returns compute_leaderboards() for a story, cached per data_version.
+
+    Callers pass the data_version they have already read (the ETag check
+    loads it), so a cache hit costs no queries at all.
+    """
+    size = size or getattr(settings, 'LEADERBOARD_SIZE', 10)
+    key = (story_id, data_version, size)
+    boards = leaderboard_cache.get(key)
+    if boards is None:
+        boards = compute_leaderboards(story_id, size)
+        leaderboard_cache.set(key, boards)
+    return boards
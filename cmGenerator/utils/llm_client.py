@@ -0,0 +1,147 @@
+import threading
+import time
+import openai
+from openai import OpenAI
+from django.conf import settings
+
+
+class LLMUnavailable(Exception):
+    """Raised when the circuit breaker is open and calls are being refused."""
+
+
+class CircuitBreaker:
+    """
+    Stops calling the model server after repeated failures.
+
+    After `failure_threshold` consecutive failures the breaker opens and
+    every call fails immediately with LLMUnavailable. Once `reset_timeout`
+    seconds have passed a single trial call is let through; success closes
+    the breaker again, failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold=3, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def before_call(self):
+        with self._lock:
+            state = self.state
+            if state == 'open' or (state == 'half-open' and self._trial_running):
+                raise LLMUnavailable("The story model is unavailable, please try again shortly.")
+            if state == 'half-open':
+                self._trial_running = True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+def is_server_failure(error):
+    """True for errors that mean the model server is down or overloaded."""
+    if isinstance(error, openai.APIConnectionError):  # includes timeouts
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+
+_client = None
+_client_lock = threading.Lock()
+
+breaker = CircuitBreaker(
+    failure_threshold=getattr(settings, 'LLM_BREAKER_THRESHOLD', 3),
+    reset_timeout=getattr(settings, 'LLM_BREAKER_RESET', 30.0),
+)
+
+
+def get_client():
+    """
+    Returns the process-wide OpenAI client.
+
+    The client owns a pooled HTTP connection, so reusing it keeps
+    connections to the model server alive between requests. Retries with
+    exponential backoff are handled by the client itself.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = OpenAI(
+                    base_url=settings.LLM_BASE_URL,
+                    api_key=settings.LLM_API_KEY,
+                    timeout=openai.Timeout(settings.LLM_TIMEOUT, connect=settings.LLM_CONNECT_TIMEOUT),
+                    max_retries=settings.LLM_MAX_RETRIES,
+                )
+    return _client
+
+
+def create_completion(messages, stream=False):
+    """
+    Sends a chat completion request through the circuit breaker.
+
+    Args:
+        messages (list): Chat messages for the model.
+        stream (bool): Return an iterator of chunks instead of a response.
+
+    Returns:
+        The completion response, or an iterator of chunks when streaming.
+
+    Raises:
+        LLMUnavailable: If the breaker is open.
+    """
+    breaker.before_call()
+    try:
+        response = get_client().chat.completions.create(
+            model=settings.LLM_MODEL,
+            messages=messages,
+            stream=stream,
+        )
+    except Exception as e:
+        if is_server_failure(e):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        raise
+
+    if not stream:
+        breaker.record_success()
+        return response
+    return _track_stream(response)
+
+
+def _track_stream(response):
+    # A stream can still fail after the first byte, so only count it as a
+    # success once it has been read to the end.
+    try:
+        for chunk in response:
+            yield chunk
+    except GeneratorExit:
+        # The reader went away mid-stream; the server was still answering
+        breaker.record_success()
+        raise
+    except Exception as e:
+        if is_server_failure(e):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        raise
+    breaker.record_success()
@@ -0,0 +1,220 @@
+import csv
+import datetime
+import io
+from decimal import Decimal, InvalidOperation
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+from ..models import Club, Player
+
+DEFAULT_SOURCE = 'FIFA_CSV_IMPORT'
+VALID_POSITIONS = {code for code, _ in Player.POSITION_CHOICES}
+
+# Player columns overwritten when a player_id is already in the database
+UPDATE_FIELDS = [
+    'name', 'slug', 'positions', 'nationality', 'birth_date', 'birth_year', 'age',
+    'face_pic_url', 'club', 'wage_eur', 'wage_usd', 'wage_gbp', 'contract_start',
+    'contract_end', 'contract_loan', 'overall', 'potential', 'last_import_date',
+    'import_source',
+]
+
+
+class PlayerRowError(ValueError):
+    """Raised with a per-field message when a CSV row cannot become a Player."""
+
+    def __init__(self, field, message):
+        super().__init__(message)
+        self.field = field
+
+
+def column(row, *names):
+    """Returns the first non-empty value among the given columns, since the
+    headers differ between FIFA dataset versions (e.g. sofifa_id/player_id)."""
+    for name in names:
+        value = (row.get(name) or '').strip()
+        if value:
+            return value
+    return ''
+
+
+def club_lookup():
+    """
+    Maps clubs for CSV rows in one query.
+
+    Returns:
+        tuple: ({(club name, league name): club id}, {club name: club id}),
+        where the second map only holds names that belong to a single club.
+    """
+    by_league, by_name, ambiguous = {}, {}, set()
+    for club_id, name, league in Club.objects.values_list('id', 'name', 'league__name'):
+        by_league[(name.lower(), league.lower())] = club_id
+        if name.lower() in by_name:
+            ambiguous.add(name.lower())
+        by_name[name.lower()] = club_id
+    for name in ambiguous:
+        del by_name[name]
+    return by_league, by_name
+
+
+def _integer(row, field, *names, low=None, high=None):
+    try:
+        value = int(float(column(row, *names)))
+    except ValueError:
+        raise PlayerRowError(field, f"{field} must be a number")
+    if (low is not None and value < low) or (high is not None and value > high):
+        raise PlayerRowError(field, f"{field} must be between {low} and {high}")
+    return value
+
+
+def _date(row, field, *names):
+    try:
+        return datetime.date.fromisoformat(column(row, *names)[:10])
+    except ValueError:
+        raise PlayerRowError(field, f"{field} must be YYYY-MM-DD")
+
+
+def _wage(row, field, names, converted_from=None, rate=None):
+    value = column(row, *names)
+    try:
+        if value:
+            wage = Decimal(value)
+        elif converted_from is not None:
+            wage = (converted_from * rate).quantize(Decimal('0.01'))
+        else:
+            raise PlayerRowError(field, f"{field} is required")
+    except InvalidOperation:
+        raise PlayerRowError(field, f"{field} must be a number")
+    if wage <= 0:
+        raise PlayerRowError(field, f"{field} must be positive")
+    return wage
+
+
+def build_player(row, clubs, source, now):
+    """
+    Turns one FIFA CSV row into an unsaved Player.
+
+    Fields that Player.save() would normally derive (slug, birth_year) are
+    filled in here because bulk_create does not call save().
+
+    Raises:
+        PlayerRowError: If the row is missing a value or breaks a Player constraint.
+    """
+    player_id = _integer(row, 'player_id', 'player_id', 'sofifa_id')
+    name = column(row, 'long_name', 'short_name', 'name')[:100]
+    if not name:
+        raise PlayerRowError('name', "name is required")
+
+    by_league, by_name = clubs
+    club_name = column(row, 'club_name').lower()
+    club_id = by_league.get((club_name, column(row, 'league_name').lower())) or by_name.get(club_name)
+    if club_id is None:
+        raise PlayerRowError('club', f"Unknown club {column(row, 'club_name')!r}")
+
+    overall = _integer(row, 'overall', 'overall', low=1, high=99)
+    potential = _integer(row, 'potential', 'potential', low=1, high=99)
+    if potential < overall:
+        raise PlayerRowError('potential', "potential must be at least overall")
+
+    birth_date = _date(row, 'birth_date', 'dob', 'birth_date')
+    contract_end_year = _integer(
+        row, 'contract_end', 'club_contract_valid_until_year', 'club_contract_valid_until'
+    )
+    contract_end = datetime.date(contract_end_year, 6, 30)
+    if column(row, 'club_joined_date', 'club_joined'):
+        contract_start = _date(row, 'contract_start', 'club_joined_date', 'club_joined')
+    else:
+        contract_start = datetime.date(contract_end_year - 1, 7, 1)
+    if contract_end <= contract_start:
+        raise PlayerRowError('contract_end', "contract_end must be after contract_start")
+
+    wage_eur = _wage(row, 'wage_eur', ['wage_eur'])
+    positions = [p.strip() for p in column(row, 'player_positions', 'positions').split(',')]
+
+    return Player(
+        player_id=player_id,
+        name=name,
+        slug=slugify(f"{name}-{player_id}")[:150],
+        positions=[p for p in positions if p in VALID_POSITIONS][:3] or None,
+        nationality=column(row, 'nationality_name', 'nationality')[:100],
+        birth_date=birth_date,
+        birth_year=birth_date.year,
+        age=_integer(row, 'age', 'age'),
+        face_pic_url=column(row, 'player_face_url', 'face_pic_url') or None,
+        club_id=club_id,
+        wage_eur=wage_eur,
+        wage_usd=_wage(row, 'wage_usd', ['wage_usd'], wage_eur, Decimal(settings.PLAYER_IMPORT_USD_RATE)),
+        wage_gbp=_wage(row, 'wage_gbp', ['wage_gbp'], wage_eur, Decimal(settings.PLAYER_IMPORT_GBP_RATE)),
+        contract_start=contract_start,
+        contract_end=contract_end,
+        contract_loan=bool(column(row, 'club_loaned_from')),
+        overall=overall,
+        potential=potential,
+        last_import_date=now,
+        import_source=source,
+    )
+
+
+def import_players(stream, source=DEFAULT_SOURCE, chunk_size=2000, start_row=0, on_chunk=None):
+    """
+    Streams a FIFA player CSV into Player, upserting on player_id.
+
+    Clubs are resolved from in-memory maps built with one query, and each
+    chunk of rows is written with a single INSERT ... ON CONFLICT (player_id)
+    DO UPDATE in its own transaction. Re-importing the same file is
+    idempotent, and an interrupted import can resume from the last committed
+    chunk by passing its row count as `start_row`.
+
+    Args:
+        stream: A binary file object.
+        source (str): Stored in Player.import_source, e.g. "FIFA23_CSV_IMPORT".
+        chunk_size (int): Rows written per query and transaction.
+        start_row (int): Data rows to skip, as reported by an earlier run.
+        on_chunk (callable): Called with the running totals after each
+            committed chunk, so callers can checkpoint and report progress.
+
+    Returns:
+        dict: Rows read (including skipped ones), rows imported, the number
+        of invalid rows and up to 1000 of their errors as
+        {'line': ..., 'errors': {...}}.
+    """
+    clubs = club_lookup()
+    now = timezone.now()
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    totals = {'rows': 0, 'imported': 0, 'error_count': 0, 'errors': []}
+    chunk = {}
+
+    def flush():
+        with transaction.atomic():
+            Player.objects.bulk_create(
+                list(chunk.values()),
+                update_conflicts=True,
+                unique_fields=['player_id'],
+                update_fields=UPDATE_FIELDS,
+            )
+        totals['imported'] += len(chunk)
+        chunk.clear()
+        if on_chunk:
+            on_chunk(totals)
+
+    for row in reader:
+        totals['rows'] += 1
+        if totals['rows'] <= start_row:
+            continue
+        try:
+            player = build_player(row, clubs, source, now)
+        except PlayerRowError as e:
+            totals['error_count'] += 1
+            if len(totals['errors']) < 1000:
+                totals['errors'].append({'line': reader.line_num, 'errors': {e.field: str(e)}})
+            continue
+        # A player repeated within a chunk would fail ON CONFLICT, so the last row wins
+        chunk[player.player_id] = player
+        if len(chunk) >= chunk_size:
+            flush()
+
+    if chunk:
+        flush()
+    elif on_chunk:
+        on_chunk(totals)
+    return totals
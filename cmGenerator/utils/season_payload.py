@@ -0,0 +1,97 @@
+from django.db.models import Prefetch, prefetch_related_objects
+from ..models import PlayerStats, Transfer, CompetitionWinner, AwardWinner
+from .season_stats import STAT_FIELDS
+
+
+def split_transfers(story, transfers):
+    """
+    Splits transfers into those into and out of the story's club.
+
+    Returns:
+        tuple: (transfers_in, transfers_out) as lists of dicts, where `club`
+        is the other club in the deal.
+    """
+    split = ([], [])
+    for transfer in transfers:
+        incoming = transfer.to_club_id == story.club_id
+        other = transfer.from_club if incoming else transfer.to_club
+        split[0 if incoming else 1].append({
+            'id': transfer.id,
+            'player': transfer.player_id,
+            'player_name': transfer.player.name,
+            'club': other.name,
+            'club_id': other.id,
+            'fee': transfer.fee,
+            'fee_currency': transfer.fee_currency,
+            'transfer_date': transfer.transfer_date,
+        })
+    return split
+
+
+def season_payload(story, season_name=None):
+    """
+    Builds everything the season stats page shows for one season.
+
+    The story's seasons are read in one query and the selected season's
+    player stats, transfers, competition winners and award winners are
+    prefetched with their players, clubs, competitions and awards joined in,
+    so the payload always costs five queries however big the squad is.
+
+    Args:
+        story (Story): The story, fetched with its club.
+        season_name (str): The season to show. Defaults to the current
+            season, or the latest one if none is marked current.
+
+    Returns:
+        dict: The seasons, the selected season and its stats, transfers in
+        and out (relative to the story's club), trophies and awards.
+    """
+    seasons = list(story.seasons.order_by('season_number'))
+    selected = next((s for s in seasons if s.name == season_name), None)
+    if selected is None and not season_name and seasons:
+        selected = next((s for s in seasons if s.is_current), seasons[-1])
+
+    payload = {
+        'story': {'id': story.id, 'name': story.name, 'club': story.club.name},
+        'seasons': [{'id': s.id, 'name': s.name, 'season_number': s.season_number,
+                     'is_current': s.is_current} for s in seasons],
+        'selected_season': selected.name if selected else None,
+        'player_stats': [],
+        'transfers_in': [],
+        'transfers_out': [],
+        'competition_winners': [],
+        'award_winners': [],
+    }
+    if selected is None:
+        return payload
+
+    prefetch_related_objects(
+        [selected],
+        Prefetch('player_stats', queryset=PlayerStats.objects.select_related('player')
+                                                             .order_by('-overall_rating', 'player__name')),
+        Prefetch('transfers', queryset=Transfer.objects.select_related('player', 'from_club', 'to_club')
+                                                        .order_by('transfer_date', 'id')),
+        Prefetch('competition_winners', queryset=CompetitionWinner.objects.select_related('competition', 'winner')),
+        Prefetch('award_winners', queryset=AwardWinner.objects.select_related('award', 'player')),
+    )
+
+    for stat in selected.player_stats.all():
+        payload['player_stats'].append({
+            'id': stat.id,
+            'version': stat.version,
+            'player': {'id': stat.player_id, 'player_id': stat.player.player_id,
+                       'name': stat.player.name, 'positions': stat.player.positions or []},
+            **{field: getattr(stat, field) for field in STAT_FIELDS},
+        })
+
+    payload['transfers_in'], payload['transfers_out'] = split_transfers(story, selected.transfers.all())
+
+    payload['competition_winners'] = [
+        {'id': w.id, 'competition': w.competition.name, 'winner': w.winner.name}
+        for w in selected.competition_winners.all()
+    ]
+    payload['award_winners'] = [
+        {'id': w.id, 'award': w.award.name, 'player': w.player_id, 'player_name': w.player.name}
+        for w in selected.award_winners.all()
+    ]
+    return payload
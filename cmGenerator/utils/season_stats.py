@@ -0,0 +1,390 @@
+from decimal import Decimal, InvalidOperation
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import F, QuerySet
+from ..models import CompetitionPlayerStats, PlayerStats, Player, Season, Story
+from .story_summary import refresh_summary
+from .story_version import in_story_bulk_write, touch_story
+
+# Editable PlayerStats columns and the type each is parsed as
+STAT_FIELDS = {
+    'overall_rating': int,
+    'appearances': int,
+    'goals': int,
+    'assists': int,
+    'clean_sheets': int,
+    'red_cards': int,
+    'yellow_cards': int,
+    'average_rating': Decimal,
+}
+
+
+def parse_stat_value(field, value):
+    """Converts a submitted cell to the column's type, raising ValueError if it can't."""
+    if value in (None, ''):
+        value = 0
+    try:
+        return STAT_FIELDS[field](str(value).strip())
+    except (ValueError, InvalidOperation):
+        raise ValueError(f"{field} must be a number")
+
+
+def as_id(value):
+    """Returns a positive integer primary key from a submitted value, or None."""
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return None
+    return value if value > 0 else None
+
+
+class StatsValidationError(Exception):
+    """Raised with per-row errors when a stats payload fails validation."""
+
+    def __init__(self, errors):
+        super().__init__("Invalid stats")
+        self.errors = errors
+
+
+class StatsConflict(Exception):
+    """Raised when a change was made against an out-of-date row version."""
+
+    def __init__(self, conflicts):
+        super().__init__("Stats were changed by someone else")
+        self.conflicts = conflicts
+
+
+def build_player_stats(story, rows):
+    """
+    Validates a stats payload and turns it into PlayerStats instances.
+
+    Every row is checked before anything is written. Rows may carry an `id`
+    of an existing PlayerStats row in this story; rows without one must name
+    a `season` (Season name) and a `player` (Player primary key).
+
+    Returns:
+        tuple: (existing, new) lists of unsaved PlayerStats instances, with
+        `existing` holding rows to update and `new` rows to insert. Each
+        instance has a `row_index` attribute pointing back into `rows`.
+
+    Raises:
+        StatsValidationError: If any row is invalid, or if two rows are
+            for the same player in the same season.
+    """
+    seasons = {season.name: season for season in story.seasons.all()}
+    existing_ids = {as_id(row.get('id')) for row in rows} - {None}
+    existing = {stat.id: stat for stat in PlayerStats.objects.filter(story=story, id__in=existing_ids)}
+    player_ids = {as_id(row.get('player')) for row in rows} - {None}
+    players = set(Player.objects.filter(id__in=player_ids).values_list('id', flat=True))
+
+    errors = []
+    to_update, to_create = [], []
+    for index, row in enumerate(rows):
+        row_errors = {}
+        stat_id = as_id(row.get('id'))
+        if not stat_id and row.get('player') in (None, ''):
+            continue  # Blank row the user never filled in
+
+        if stat_id:
+            instance = existing.get(stat_id)
+            if instance is None:
+                row_errors['id'] = f"Stats row {stat_id} does not exist in this story"
+                instance = PlayerStats(story=story)
+        else:
+            instance = PlayerStats(story=story)
+
+        if row.get('season') is not None or instance.pk is None:
+            season = seasons.get(row.get('season'))
+            if season is None:
+                row_errors['season'] = f"Unknown season {row.get('season')!r}"
+            else:
+                instance.season = season
+
+        if row.get('player') is not None or instance.pk is None:
+            player_id = as_id(row.get('player'))
+            if player_id not in players:
+                row_errors['player'] = f"Unknown player {row.get('player')!r}"
+            else:
+                instance.player_id = player_id
+
+        for field in STAT_FIELDS:
+            if field in row or instance.pk is None:
+                try:
+                    setattr(instance, field, parse_stat_value(field, row.get(field)))
+                except ValueError as e:
+                    row_errors[field] = str(e)
+
+        if not row_errors:
+            try:
+                # Range checks from the model validators; the foreign keys
+                # were already resolved above without extra queries.
+                instance.clean_fields(exclude=['story', 'season', 'player'])
+            except ValidationError as e:
+                row_errors.update({field: ' '.join(messages) for field, messages in e.message_dict.items()})
+
+        if row_errors:
+            errors.append({'row': index, 'errors': row_errors})
+            continue
+
+        instance.row_index = index
+        (to_update if instance.pk else to_create).append(instance)
+
+    # Postgres refuses an upsert that touches the same (season, player) twice
+    rows_by_key = {}
+    for instance in to_update + to_create:
+        rows_by_key.setdefault((instance.season_id, instance.player_id), []).append(instance.row_index)
+    for indexes in rows_by_key.values():
+        if len(indexes) > 1:
+            for index in indexes:
+                errors.append({'row': index, 'errors': {
+                    'player': f"The same player and season are given in rows {', '.join(map(str, sorted(indexes)))}"
+                }})
+
+    if errors:
+        errors.sort(key=lambda error: error['row'])
+        raise StatsValidationError(errors)
+    return to_update, to_create
+
+
+def save_player_stats(story, rows):
+    """
+    Validates and writes a stats payload in one transaction.
+
+    Rows without an id whose player already has stats for the season are
+    matched to the existing row with one query. Existing rows are then
+    written with a single bulk UPDATE that also bumps their version, so a
+    client holding an older version cannot overwrite them with
+    apply_stat_changes, and new rows with a single INSERT. The number of
+    queries does not grow with squad size.
+
+    Returns:
+        list: The PlayerStats id for each row, in payload order.
+
+    Raises:
+        StatsValidationError: If any row is invalid. Nothing is written.
+    """
+    to_update, to_create = build_player_stats(story, rows)
+    fields = ['season', 'player', *STAT_FIELDS]
+
+    with transaction.atomic():
+        if to_create:
+            existing = {
+                (season_id, player_id): stat_id
+                for season_id, player_id, stat_id in PlayerStats.objects.filter(
+                    story=story,
+                    season_id__in={instance.season_id for instance in to_create},
+                    player_id__in={instance.player_id for instance in to_create},
+                ).values_list('season_id', 'player_id', 'id')
+            }
+            for instance in to_create:
+                instance.pk = existing.get((instance.season_id, instance.player_id))
+            to_update += [instance for instance in to_create if instance.pk]
+            to_create = [instance for instance in to_create if not instance.pk]
+
+        for instance in to_update:
+            instance.version = F('version') + 1
+        if to_update:
+            PlayerStats.objects.bulk_update(to_update, fields + ['version'])
+        if to_create:
+            PlayerStats.objects.bulk_create(to_create)
+        if to_update or to_create:
+            touch_story(story.id)
+            refresh_summary(story.id, ['stats'])
+
+    ids = [None] * len(rows)
+    for instance in to_update + to_create:
+        ids[instance.row_index] = instance.id
+    return ids
+
+
+def apply_stat_changes(story, changes):
+    """
+    Applies changed cells to PlayerStats rows with optimistic concurrency.
+
+    Each change is {"id": ..., "version": ..., "fields": {column: value}}.
+    A row is only updated if its version still matches, and its version is
+    bumped in the same UPDATE, so every changed row costs a single query.
+    If any row is stale the whole batch is rolled back.
+
+    Returns:
+        dict: The new version of each changed row, keyed by id.
+
+    Raises:
+        StatsValidationError: If a change names an unknown column or an
+            invalid value. Nothing is written.
+        StatsConflict: If any row's version no longer matches. Carries the
+            current server values of the stale rows. Nothing is written.
+    """
+    errors = []
+    updates = []
+    for index, change in enumerate(changes):
+        row_errors = {}
+        stat_id = as_id(change.get('id'))
+        version = as_id(change.get('version'))
+        if stat_id is None:
+            row_errors['id'] = "A stats row id is required"
+        if version is None:
+            row_errors['version'] = "The row version is required"
+
+        values = {}
+        for field, value in (change.get('fields') or {}).items():
+            if field not in STAT_FIELDS:
+                row_errors[field] = f"{field} cannot be edited"
+                continue
+            try:
+                values[field] = parse_stat_value(field, value)
+                PlayerStats._meta.get_field(field).run_validators(values[field])
+            except ValueError as e:
+                row_errors[field] = str(e)
+            except ValidationError as e:
+                row_errors[field] = ' '.join(e.messages)
+        if not values and not row_errors:
+            row_errors['fields'] = "No changes given"
+
+        if row_errors:
+            errors.append({'row': index, 'errors': row_errors})
+        else:
+            updates.append((stat_id, version, values))
+
+    if errors:
+        raise StatsValidationError(errors)
+
+    versions = {}
+    stale = []
+    with transaction.atomic():
+        for stat_id, version, values in updates:
+            updated = PlayerStats.objects.filter(id=stat_id, story=story, version=version)\
+                          .update(version=F('version') + 1, **values)
+            if updated:
+                versions[stat_id] = version + 1
+            else:
+                stale.append(stat_id)
+
+        if stale:
+            # Raising inside the atomic block rolls back the rows that did apply
+            current = {
+                row['id']: {**row, 'average_rating': str(row['average_rating'])}
+                for row in PlayerStats.objects.filter(id__in=stale, story=story)
+                                              .values('id', 'version', *STAT_FIELDS)
+            }
+            raise StatsConflict([
+                current.get(stat_id, {'id': stat_id, 'deleted': True}) for stat_id in stale
+            ])
+        touch_story(story.id)
+        refresh_summary(story.id, ['stats'])
+
+    return versions
+
+
+# PlayerStats columns rolled up from CompetitionPlayerStats; overall_rating
+# is set per season by hand, so it is left alone. Once a player has
+# competition stats for a season, these columns (and average_rating) belong
+# to the roll-up: every competition write recomputes them, replacing values
+# entered by hand or imported for that season.
+ROLLUP_SUMS = ['appearances', 'goals', 'assists', 'clean_sheets', 'red_cards', 'yellow_cards']
+
+
+def recompute_season_stats(season, player_id=None):
+    """
+    Rebuilds a season's PlayerStats totals from its CompetitionPlayerStats.
+
+    The per-player sums and the appearance-weighted average rating are
+    computed in SQL and written with one INSERT ... SELECT ... GROUP BY ...
+    ON CONFLICT DO UPDATE, which also creates rows for players who only have
+    competition stats so far. Changed rows get their version bumped. The
+    whole squad costs one query however many players it has.
+
+    Args:
+        season (Season): The season to rebuild.
+        player_id (int): Only rebuild this player's row.
+
+    Returns:
+        int: The number of PlayerStats rows written.
+    """
+    with transaction.atomic():
+        written = _rollup(season.story_id, season.id, player_id)
+        if written:
+            touch_story(season.story_id)
+            refresh_summary(season.story_id, ['stats'])
+    return written
+
+
+def _rollup(story_id, season_id, player_id=None):
+    qn = connection.ops.quote_name
+    stats_table = qn(PlayerStats._meta.db_table)
+    competition_table = qn(CompetitionPlayerStats._meta.db_table)
+    columns = ROLLUP_SUMS + ['average_rating']
+    where, params = "season_id = %s", [story_id, season_id]
+    if player_id is not None:
+        where += " AND player_id = %s"
+        params.append(player_id)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {stats_table} (story_id, season_id, player_id, overall_rating, "
+            f"{', '.join(columns)}, version) "
+            f"SELECT %s, season_id, player_id, 0, "
+            + ', '.join(f"SUM({column})" for column in ROLLUP_SUMS)
+            + f", COALESCE(ROUND(SUM(average_rating * appearances) / NULLIF(SUM(appearances), 0), 2), 0), "
+            f"1 FROM {competition_table} "
+            f"WHERE {where} GROUP BY season_id, player_id "
+            f"ON CONFLICT (season_id, player_id) DO UPDATE SET "
+            + ', '.join(f"{column} = EXCLUDED.{column}" for column in columns)
+            + f", version = {stats_table}.version + 1 "
+            f"WHERE ({', '.join(f'{stats_table}.{column}' for column in columns)}) "
+            f"IS DISTINCT FROM ({', '.join(f'EXCLUDED.{column}' for column in columns)})",
+            params,
+        )
+        return cursor.rowcount
+
+
+def rollup_player(story_id, season_id, player_id):
+    """
+    Recomputes one player's season totals after a competition row changes.
+
+    The totals and the weighted average rating are summed exactly from the
+    player's competition rows rather than nudged by deltas, so repeated
+    edits never accumulate rounding error and always match
+    recompute_season_stats. It is a fixed number of queries however many
+    competitions the player has. A player left with no competition rows
+    has the rolled-up columns zeroed.
+    """
+    written = _rollup(story_id, season_id, player_id)
+    if not written and not CompetitionPlayerStats.objects.filter(
+        season_id=season_id, player_id=player_id
+    ).exists():
+        written = PlayerStats.objects.filter(season_id=season_id, player_id=player_id).exclude(
+            **{field: 0 for field in ROLLUP_SUMS}, average_rating=0
+        ).update(version=F('version') + 1, average_rating=0, **{field: 0 for field in ROLLUP_SUMS})
+    if written:
+        refresh_summary(story_id, ['stats'])
+
+
+def competition_row_saving(sender, instance, **kwargs):
+    """pre_save: remembers which PlayerStats row the competition row fed before."""
+    if in_story_bulk_write():
+        return
+    instance._rollup_before = sender.objects.filter(pk=instance.pk).values_list(
+        'story_id', 'season_id', 'player_id'
+    ).first() if instance.pk else None
+
+
+def competition_row_saved(sender, instance, **kwargs):
+    """post_save: recomputes the PlayerStats the row feeds, and the one it left."""
+    if in_story_bulk_write():
+        return
+    key = (instance.story_id, instance.season_id, instance.player_id)
+    before = getattr(instance, '_rollup_before', None)
+    if before and before != key:
+        rollup_player(*before)
+    rollup_player(*key)
+
+
+def competition_row_deleted(sender, instance, origin=None, **kwargs):
+    """post_delete: recomputes the PlayerStats the row fed."""
+    # Deleting the story, season or player deletes the PlayerStats too, and
+    # those deletions already keep the summary right
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if in_story_bulk_write() or origin_model in (Story, Season, Player):
+        return
+    rollup_player(instance.story_id, instance.season_id, instance.player_id)
@@ -0,0 +1,212 @@
+import csv
+import io
+import json
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from ..models import Player, PlayerStats
+from .season_stats import STAT_FIELDS, parse_stat_value
+from .story_summary import refresh_summary
+from .story_version import touch_story
+
+# Errors kept for the response; the total is still counted past this
+MAX_REPORTED_ERRORS = 1000
+
+STAGING_COLUMNS = ['line', 'player_ref', *STAT_FIELDS]
+
+
+def iter_csv(stream):
+    """Yields (line, row) pairs from a CSV file with a header row."""
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    for row in reader:
+        yield reader.line_num, row
+
+
+def iter_json(stream, chunk_size=64 * 1024):
+    """
+    Yields (n, object) pairs from a JSON array of objects or from JSON lines,
+    decoding one object at a time so the file is never held in memory.
+    """
+    decoder = json.JSONDecoder()
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig')
+    buffer = ''
+    count = 0
+    eof = False
+    while True:
+        buffer = buffer.lstrip(' \t\r\n,[]')
+        if not buffer:
+            if eof:
+                return
+            chunk = text.read(chunk_size)
+            eof = not chunk
+            buffer += chunk
+            continue
+        try:
+            obj, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            if eof:
+                raise ValueError(f"Invalid JSON after object {count}")
+            chunk = text.read(chunk_size)
+            eof = not chunk
+            buffer += chunk
+            continue
+        count += 1
+        buffer = buffer[end:]
+        yield count, obj
+
+
+def clean_import_row(row):
+    """
+    Converts one imported row into staging values.
+
+    Rows identify the player by `player_id`, the FIFA id stored on Player.
+
+    Returns:
+        tuple: (values, errors) where values is None if the row is invalid.
+    """
+    errors = {}
+    values = []
+    try:
+        values.append(int(str(row.get('player_id', '')).strip()))
+    except ValueError:
+        errors['player_id'] = "player_id must be a number"
+
+    for field in STAT_FIELDS:
+        try:
+            value = parse_stat_value(field, row.get(field))
+            PlayerStats._meta.get_field(field).run_validators(value)
+            values.append(value)
+        except ValueError as e:
+            errors[field] = str(e)
+        except ValidationError as e:
+            errors[field] = ' '.join(e.messages)
+
+    return (None, errors) if errors else (values, None)
+
+
+class _CopyStream(io.RawIOBase):
+    """File-like view over rows in COPY text format, for psycopg2's copy_expert."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.pending = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while len(self.pending) < len(buffer):
+            row = next(self.rows, None)
+            if row is None:
+                break
+            self.pending += ('\t'.join(str(value) for value in row) + '\n').encode()
+        size = min(len(buffer), len(self.pending))
+        buffer[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+        return size
+
+
+def _copy_rows(cursor, table, rows):
+    sql = f"COPY {table} ({', '.join(STAGING_COLUMNS)}) FROM STDIN"
+    if hasattr(cursor, 'copy'):  # psycopg 3
+        with cursor.copy(sql) as copy:
+            for row in rows:
+                copy.write_row(row)
+    else:  # psycopg2
+        cursor.copy_expert(sql, _CopyStream(iter(rows)))
+
+
+def import_player_stats(story, season, stream, fmt='csv'):
+    """
+    Streams a CSV or JSON file of player stats into PlayerStats for one season.
+
+    Rows are parsed and validated one at a time and loaded with COPY into a
+    temporary staging table, then merged into PlayerStats with a single
+    INSERT ... ON CONFLICT DO UPDATE joined against Player. Memory use does
+    not depend on the size of the file. Invalid rows and rows naming an
+    unknown player are skipped and reported; the rest are imported.
+
+    Existing rows only have the stat columns the file carries overwritten,
+    so a file with just `player_id` and `goals` leaves the other stats
+    alone. New rows get 0 for the missing columns.
+
+    Args:
+        story (Story): The story to import into.
+        season (Season): The season the stats belong to.
+        stream: A binary file object.
+        fmt (str): 'csv' or 'json' (an array of objects or JSON lines).
+
+    Returns:
+        dict: Counts of rows read and imported, the number of errors and
+        the first MAX_REPORTED_ERRORS of them as {'line': ..., 'errors': {...}},
+        where line is the CSV line or the JSON object number.
+    """
+    rows = iter_csv(stream) if fmt == 'csv' else iter_json(stream)
+    errors = []
+    counts = {'rows': 0, 'error_count': 0}
+    present = set()
+
+    def report(line, row_errors):
+        counts['error_count'] += 1
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append({'line': line, 'errors': row_errors})
+
+    def valid_rows():
+        for line, row in rows:
+            counts['rows'] += 1
+            if not isinstance(row, dict):
+                report(line, {'row': "Each row must be an object"})
+                continue
+            present.update(field for field in STAT_FIELDS if field in row)
+            values, row_errors = clean_import_row(row)
+            if row_errors:
+                report(line, row_errors)
+            else:
+                yield [line, *values]
+
+    qn = connection.ops.quote_name
+    stats_table = qn(PlayerStats._meta.db_table)
+    player_table = qn(Player._meta.db_table)
+    stat_columns = [PlayerStats._meta.get_field(field).column for field in STAT_FIELDS]
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Left over if an earlier import ran inside the same outer transaction
+        cursor.execute("DROP TABLE IF EXISTS stats_import_staging")
+        cursor.execute(
+            "CREATE TEMPORARY TABLE stats_import_staging ("
+            "line integer, player_ref integer, "
+            + ', '.join(f"{field} {'numeric(4, 2)' if field == 'average_rating' else 'integer'}"
+                        for field in STAT_FIELDS)
+            + ") ON COMMIT DROP"
+        )
+        _copy_rows(cursor, 'stats_import_staging', valid_rows())
+
+        cursor.execute(
+            f"SELECT s.line, s.player_ref FROM stats_import_staging s "
+            f"WHERE NOT EXISTS (SELECT 1 FROM {player_table} p WHERE p.player_id = s.player_ref) "
+            f"ORDER BY s.line"
+        )
+        for line, player_ref in cursor:
+            report(line, {'player_id': f"Unknown player {player_ref}"})
+
+        # DISTINCT ON keeps the last row per player so a file that repeats
+        # a player updates it once instead of failing the ON CONFLICT.
+        updated_columns = [column for field, column in zip(STAT_FIELDS, stat_columns) if field in present]
+        cursor.execute(
+            f"INSERT INTO {stats_table} (story_id, season_id, player_id, {', '.join(stat_columns)}, version) "
+            f"SELECT DISTINCT ON (p.id) %s, %s, p.id, "
+            f"{', '.join(f's.{field}' for field in STAT_FIELDS)}, 1 "
+            f"FROM stats_import_staging s JOIN {player_table} p ON p.player_id = s.player_ref "
+            f"ORDER BY p.id, s.line DESC "
+            f"ON CONFLICT (season_id, player_id) "
+            + ("DO UPDATE SET " + ', '.join(f"{column} = EXCLUDED.{column}" for column in updated_columns)
+               + f", version = {stats_table}.version + 1" if updated_columns else "DO NOTHING"),
+            [story.id, season.id],
+        )
+        imported = cursor.rowcount
+        if imported:
+            touch_story(story.id)
+            refresh_summary(story.id, ['stats'])
+
+    errors.sort(key=lambda error: error['line'])
+    return {'rows': counts['rows'], 'imported': imported,
+            'error_count': counts['error_count'], 'errors': errors}
@@ -0,0 +1,188 @@
+import csv
+import io
+import json
+import zipfile
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+from ..models import (
+    Story, Season, PlayerStats, CompetitionPlayerStats, Transfer, CompetitionWinner, AwardWinner
+)
+from .season_stats import STAT_FIELDS
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_CHUNK_SIZE = 2000
+# Records joined into one chunk of the response body
+RECORDS_PER_WRITE = 500
+
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'json': ('application/json', 'json'),
+    'zip': ('application/zip', 'zip'),
+}
+
+# Player, Club, Competition and IndividualAward are shared reference data, so
+# they are exported by natural key (FIFA player_id, names) rather than by
+# primary key, while rows that belong to the story keep their own ids.
+SECTIONS = [
+    ('seasons', Season, {
+        'id': F('id'), 'name': F('name'), 'season_number': F('season_number'),
+        'is_current': F('is_current'), 'transfer_budget': F('transfer_budget'),
+        'wage_budget': F('wage_budget'), 'league_position': F('league_position'),
+        'notes': F('notes'),
+    }, ['season_number']),
+    ('player_stats', PlayerStats, {
+        'id': F('id'), 'season': F('season_id'), 'fifa_player_id': F('player__player_id'),
+        'player_name': F('player__name'), **{field: F(field) for field in STAT_FIELDS},
+    }, ['season_id', 'id']),
+    ('competition_player_stats', CompetitionPlayerStats, {
+        'id': F('id'), 'season': F('season_id'), 'competition_name': F('competition__name'),
+        'fifa_player_id': F('player__player_id'), 'player_name': F('player__name'),
+        **{field: F(field) for field in STAT_FIELDS},
+    }, ['season_id', 'id']),
+    ('transfers', Transfer, {
+        'id': F('id'), 'season': F('season_id'), 'fifa_player_id': F('player__player_id'),
+        'player_name': F('player__name'), 'from_club_name': F('from_club__name'),
+        'from_club_country': F('from_club__country'), 'to_club_name': F('to_club__name'),
+        'to_club_country': F('to_club__country'), 'fee': F('fee'),
+        'fee_currency': F('fee_currency'), 'transfer_date': F('transfer_date'),
+    }, ['season_id', 'transfer_date', 'id']),
+    ('competition_winners', CompetitionWinner, {
+        'id': F('id'), 'season': F('season_id'), 'competition_name': F('competition__name'),
+        'winner_name': F('winner__name'), 'winner_country': F('winner__country'),
+    }, ['season_id', 'id']),
+    ('award_winners', AwardWinner, {
+        'id': F('id'), 'season': F('season_id'), 'award_name': F('award__name'),
+        'fifa_player_id': F('player__player_id'), 'player_name': F('player__name'),
+    }, ['season_id', 'id']),
+]
+
+STORY_FIELDS = {
+    'id': F('id'), 'name': F('name'), 'club_name': F('club__name'),
+    'club_country': F('club__country'), 'status': F('status'), 'formation': F('formation'),
+    'difficulty': F('difficulty'), 'currency': F('currency'), 'challenge': F('challenge'),
+    'background': F('background'), 'is_public': F('is_public'), 'created_at': F('created_at'),
+}
+
+
+def _values(queryset, fields):
+    # values() refuses aliases that shadow model fields, so select under a
+    # prefixed alias and strip it back off
+    return queryset.values(**{f'_{name}': expression for name, expression in fields.items()})
+
+
+def story_record(story):
+    """Returns the exported fields of the story itself."""
+    row = _values(Story.objects.filter(id=story.id), STORY_FIELDS).get()
+    return {name: row[f'_{name}'] for name in STORY_FIELDS}
+
+
+def iter_section(story, model, fields, ordering):
+    """
+    Yields one section's records as dicts, streamed from a server-side cursor
+    so only EXPORT_CHUNK_SIZE rows are held at a time.
+    """
+    queryset = _values(model.objects.filter(story=story).order_by(*ordering), fields)
+    for row in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield {name: row[f'_{name}'] for name in fields}
+
+
+def _batched(pieces):
+    batch = []
+    for piece in pieces:
+        batch.append(piece)
+        if len(batch) >= RECORDS_PER_WRITE:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+def _dumps(record):
+    return json.dumps(record, cls=DjangoJSONEncoder)
+
+
+def export_ndjson(story):
+    """Yields the story as JSON lines, each tagged with its section in `type`."""
+    def lines():
+        yield _dumps({'type': 'story', **story_record(story)}) + '\n'
+        for section, model, fields, ordering in SECTIONS:
+            for record in iter_section(story, model, fields, ordering):
+                yield _dumps({'type': section, **record}) + '\n'
+    return _batched(lines())
+
+
+def export_json(story):
+    """Yields the story as a single JSON document with one array per section."""
+    def pieces():
+        yield '{"story": ' + _dumps(story_record(story))
+        for section, model, fields, ordering in SECTIONS:
+            yield f', "{section}": ['
+            separator = ''
+            for record in iter_section(story, model, fields, ordering):
+                yield separator + _dumps(record)
+                separator = ', '
+            yield ']'
+        yield '}\n'
+    return _batched(pieces())
+
+
+class _ZipStream(io.RawIOBase):
+    """Write-only buffer that zipfile writes into and the export drains as it goes."""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.offset = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.buffer += data
+        self.offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.offset
+
+    def drain(self):
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+
+def export_zip(story):
+    """
+    Yields a zip archive with one CSV per section plus story.csv.
+
+    The archive is written without seeking, so each compressed chunk can be
+    sent as soon as it is produced.
+    """
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        files = [('story', STORY_FIELDS, iter([story_record(story)]))]
+        files += [(section, fields, iter_section(story, model, fields, ordering))
+                  for section, model, fields, ordering in SECTIONS]
+        for name, fields, records in files:
+            with archive.open(f'{name}.csv', 'w', force_zip64=True) as entry:
+                text = io.TextIOWrapper(entry, encoding='utf-8', newline='')
+                writer = csv.DictWriter(text, fieldnames=list(fields))
+                writer.writeheader()
+                for count, record in enumerate(records, 1):
+                    writer.writerow(record)
+                    if count % RECORDS_PER_WRITE == 0:
+                        text.flush()
+                        yield stream.drain()
+                text.flush()
+                text.detach()
+            yield stream.drain()
+    yield stream.drain()
+
+
+def export_story(story, fmt):
+    """
+    Streams a whole story in one of EXPORT_FORMATS.
+
+    Returns:
+        iterator: Chunks of the export (str for ndjson and json, bytes for zip).
+    """
+    return {'ndjson': export_ndjson, 'json': export_json, 'zip': export_zip}[fmt](story)
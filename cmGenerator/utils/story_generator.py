@@ -1,12 +1,17 @@
-import os
-import random
-from openai import OpenAI
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
 from django.conf import settings
+from .background_cache import background_cache
+from .catalog import catalog
+from .coalesce import Broadcast, SingleFlight, advisory_lock
+from .llm_client import breaker, create_completion
+
+# Bump when generate_club_history_prompt or generate_section_prompts
+# changes so cached backgrounds from the old prompts are regenerated.
+PROMPT_VERSION = '2'
+
+# Concurrent requests for the same club share one in-flight generation
+generations = SingleFlight()
 
-def get_random_item(file_path):
-    with open(file_path, 'r') as f:
-        return random.choice(f.readlines()).strip()
-    
 def generate_club_history_prompt(randomClub: str) -> str:
     return f"""
     Provide the following information about {randomClub} in immersive and historically detailed HTML format. 
@@ -37,35 +42,227 @@ def generate_club_history_prompt(randomClub: str) -> str:
     Mention club legends, current star players, and their role in shaping the modern game. Discuss their fanbase, media presence, and lasting legacy within football culture. 
     Ensure this reads like a historian’s perspective, rather than a generic summary. </p> 
     """
+
+def generate_section_prompts(randomClub: str) -> list:
+    """
+    Splits the club history prompt into one prompt per <h4> section so the
+    sections can be generated concurrently.
+    """
+    intro, *sections = generate_club_history_prompt(randomClub).split('<h4>')
+    return [
+        f"{intro}\n    Only write the following section, starting with its heading:\n\n    <h4>{section}"
+        for section in sections
+    ]
+
+def use_parallel_sections():
+    # With fewer than two concurrent requests there is nothing to gain.
+    # A half-open breaker lets a single trial call through, so the other
+    # sections would fail; send the whole prompt as that one call instead
+    return getattr(settings, 'LLM_SECTION_CONCURRENCY', 1) > 1 and breaker.state == 'closed'
     
-def generate_club_background(club):
-    client = OpenAI(base_url="http://192.168.0.123:1234/v1", api_key="lm-studio")
-    
-    response = client.chat.completions.create(
-        model='your-model',
-        messages=[{"role": "user", "content": generate_club_history_prompt(club)}],
-        stream=False
-    )
-    final = response.choices[0].message.content
-    
+def clean_background(text):
     # Remove any prefixes before the first <h4> tag
-    if '<h4>' in final:
-        final = final[final.find('<h4>'):]
-    
+    if '<h4>' in text:
+        text = text[text.find('<h4>'):]
+
     # Clean up any other potential markers
-    noThinkResponse = final.split('</think>')[-1].strip()
+    noThinkResponse = text.split('</think>')[-1].strip()
     noHTMLResponse = noThinkResponse.split('```html')[-1].strip()
     cleanResponse = noHTMLResponse.split('```')[0].strip()
-    
+
     return cleanResponse
 
-def generate_all():
-    data_dir = os.path.join(settings.BASE_DIR, 'cmGenerator/data')
-    cmClub  = get_random_item(os.path.join(data_dir, 'fifaClubTeams.txt'))
-    
+
+class BackgroundStreamCleaner:
+    """
+    Incremental version of clean_background for streamed completions.
+
+    Text is held back while the model is still inside a <think> block or
+    before the first <h4> tag, then forwarded as it arrives until a closing
+    code fence is seen.
+    """
+
+    def __init__(self):
+        self.raw = ''
+        self.buffer = ''
+        self.in_body = False
+        self.closed = False
+
+    def feed(self, chunk):
+        """Add a chunk of model output and return the text that is safe to emit."""
+        self.raw += chunk
+        if self.closed:
+            return ''
+        self.buffer += chunk
+
+        if not self.in_body:
+            if '<think>' in self.buffer and '</think>' not in self.buffer:
+                return ''
+            self.buffer = self.buffer.split('</think>')[-1]
+            self.buffer = self.buffer.split('```html')[-1]
+            if '<h4>' not in self.buffer:
+                return ''
+            self.buffer = self.buffer[self.buffer.find('<h4>'):]
+            self.in_body = True
+
+        if '```' in self.buffer:
+            out = self.buffer.split('```')[0]
+            self.buffer = ''
+            self.closed = True
+            return out.rstrip()
+
+        # Hold back trailing whitespace and backticks that may lead into a fence
+        cut = len(self.buffer.rstrip(' \t\r\n`'))
+        out = self.buffer[:cut]
+        self.buffer = self.buffer[cut:]
+        return out
+
+    def finish(self):
+        """Flush whatever is left once the stream has ended."""
+        if not self.in_body:
+            # Never found an <h4>; fall back to the non-streaming cleanup
+            return clean_background(self.raw)
+        out = '' if self.closed else self.buffer.rstrip()
+        self.buffer = ''
+        return out
+
+
+def background_key(club):
+    return f"club-background:{club}:{PROMPT_VERSION}:{settings.LLM_MODEL}"
+
+def generate_club_background(club, refresh=False, sections=True):
+    # Callers that bound their own concurrency pass sections=False so each
+    # generation is a single model request
+    if not refresh:
+        cached = background_cache.get(club, PROMPT_VERSION, settings.LLM_MODEL)
+        if cached is not None:
+            return cached
+
+    return generations.do(background_key(club), lambda: _generate_and_store(club, refresh, sections))
+
+def _generate_and_store(club, refresh, sections=True):
+    # The advisory lock coalesces across worker processes: whoever waited
+    # on it finds the background already cached by the previous holder.
+    # A worker that gives up waiting generates its own copy.
+    with advisory_lock(background_key(club)):
+        if not refresh:
+            cached = background_cache.get(club, PROMPT_VERSION, settings.LLM_MODEL)
+            if cached is not None:
+                return cached
+
+        if sections and use_parallel_sections():
+            background = _generate_sections(club)
+        else:
+            response = create_completion(
+                [{"role": "user", "content": generate_club_history_prompt(club)}]
+            )
+            background = clean_background(response.choices[0].message.content)
+
+        background_cache.set(club, PROMPT_VERSION, settings.LLM_MODEL, background)
+        return background
+
+def stream_club_background(club, refresh=False):
+    """
+    Yields cleaned chunks of the club background as the model produces them.
+    A cached background is yielded as a single chunk.
+    """
+    if not refresh:
+        cached = background_cache.get(club, PROMPT_VERSION, settings.LLM_MODEL)
+        if cached is not None:
+            yield cached
+            return
+
+    yield from generations.stream(background_key(club), lambda: _stream_and_store(club, refresh))
+
+def _stream_and_store(club, refresh):
+    with advisory_lock(background_key(club)):
+        if not refresh:
+            cached = background_cache.get(club, PROMPT_VERSION, settings.LLM_MODEL)
+            if cached is not None:
+                yield cached
+                return
+
+        if use_parallel_sections():
+            chunks = _stream_sections(club)
+        else:
+            chunks = _stream_prompt(generate_club_history_prompt(club))
+
+        background = []
+        for text in chunks:
+            background.append(text)
+            yield text
+
+        background_cache.set(club, PROMPT_VERSION, settings.LLM_MODEL, ''.join(background))
+
+def _stream_prompt(prompt):
+    response = create_completion([{"role": "user", "content": prompt}], stream=True)
+    cleaner = BackgroundStreamCleaner()
+    for chunk in response:
+        if not chunk.choices:
+            continue
+        text = cleaner.feed(chunk.choices[0].delta.content or '')
+        if text:
+            yield text
+    text = cleaner.finish()
+    if text:
+        yield text
+
+def _generate_section(prompt):
+    response = create_completion([{"role": "user", "content": prompt}])
+    return clean_background(response.choices[0].message.content)
+
+def _generate_sections(club):
+    """
+    Generates each section as its own request, at most
+    LLM_SECTION_CONCURRENCY at a time, and joins them in prompt order.
+    The first section to fail fails the whole background at once: sections
+    not yet started are cancelled and running ones are not waited for.
+    """
+    prompts = generate_section_prompts(club)
+    executor = ThreadPoolExecutor(max_workers=settings.LLM_SECTION_CONCURRENCY)
+    try:
+        futures = [executor.submit(_generate_section, prompt) for prompt in prompts]
+        wait(futures, return_when=FIRST_EXCEPTION)
+        return '\n\n'.join(future.result() for future in futures)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def _pump_section(prompt, broadcast):
+    try:
+        for text in _stream_prompt(prompt):
+            broadcast.publish(text)
+    except Exception as e:
+        broadcast.close(e)
+        return
+    broadcast.close()
+
+def _stream_sections(club):
+    """
+    Streams every section concurrently but yields them in prompt order:
+    the first section is forwarded live while later ones are buffered until
+    their turn comes.
+    """
+    prompts = generate_section_prompts(club)
+    broadcasts = [Broadcast() for _ in prompts]
+    executor = ThreadPoolExecutor(max_workers=settings.LLM_SECTION_CONCURRENCY)
+    for prompt, broadcast in zip(prompts, broadcasts):
+        executor.submit(_pump_section, prompt, broadcast)
+    executor.shutdown(wait=False)
+
+    for index, broadcast in enumerate(broadcasts):
+        if index:
+            yield '\n\n'
+        yield from broadcast.subscribe()
+
+def pick_story_elements():
     return {
-        'club': cmClub,
-        'formation': get_random_item(os.path.join(data_dir, 'fifaFormations.txt')),
-        'challenge': get_random_item(os.path.join(data_dir, 'fifaChallenges.txt')),
-        'background': generate_club_background(cmClub)
-    }
\ No newline at end of file
+        'club': catalog.choice('clubs'),
+        'formation': catalog.choice('formations'),
+        'challenge': catalog.choice('challenges'),
+    }
+
+def generate_all(refresh=False):
+    data = pick_story_elements()
+    data['background'] = generate_club_background(data['club'], refresh=refresh)
+
+    return data
@@ -0,0 +1,323 @@
+import csv
+import io
+import json
+import re
+import zipfile
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.utils.text import slugify
+from ..models import (
+    Club, Competition, IndividualAward, Player, Story, Season, PlayerStats,
+    CompetitionPlayerStats, Transfer, CompetitionWinner, AwardWinner
+)
+from .season_stats import STAT_FIELDS
+from .story_export import SECTIONS
+from .story_summary import refresh_summary
+
+# Rows inserted per bulk_create, and the most players looked up per query
+IMPORT_CHUNK_SIZE = 2000
+MAX_REPORTED_ERRORS = 1000
+
+STORY_COPY_FIELDS = ['name', 'status', 'formation', 'difficulty', 'currency', 'challenge',
+                     'background', 'is_public']
+
+# How each exported section becomes model rows: the model, the columns
+# copied as they are, and the references resolved to new primary keys
+RESTORE_SECTIONS = {
+    'seasons': (Season, ['name', 'season_number', 'is_current', 'transfer_budget',
+                         'wage_budget', 'league_position', 'notes'], []),
+    'player_stats': (PlayerStats, list(STAT_FIELDS), ['season', 'player']),
+    'competition_player_stats': (CompetitionPlayerStats, list(STAT_FIELDS),
+                                 ['season', 'competition', 'player']),
+    'transfers': (Transfer, ['fee', 'fee_currency', 'transfer_date'],
+                  ['season', 'player', 'from_club', 'to_club']),
+    'competition_winners': (CompetitionWinner, [], ['season', 'competition', 'winner']),
+    'award_winners': (AwardWinner, [], ['season', 'award', 'player']),
+}
+
+
+class StoryImportError(Exception):
+    """Raised with per-record errors when an export file cannot be restored."""
+
+    def __init__(self, errors, error_count=None):
+        super().__init__("Invalid story export")
+        self.errors = errors
+        # errors stops at MAX_REPORTED_ERRORS; this counts every one
+        self.error_count = len(errors) if error_count is None else error_count
+
+
+def detect_format(stream):
+    """
+    Tells the export formats apart by their first bytes: 'zip', 'json' for
+    a single document (whose first key is a section) or 'ndjson'.
+    """
+    head = stream.read(64)
+    stream.seek(0)
+    if head.startswith(b'PK'):
+        return 'zip'
+    key = re.match(rb'\s*\{\s*"(\w+)"', head)
+    if key and key.group(1).decode() in RESTORE_SECTIONS.keys() | {'story'}:
+        return 'json'
+    return 'ndjson'
+
+
+def iter_ndjson(stream):
+    """Yields (section, record, line) from an NDJSON export, one line at a time."""
+    for number, line in enumerate(io.TextIOWrapper(stream, encoding='utf-8'), 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            raise StoryImportError([
+                {'section': None, 'id': None, 'line': number, 'errors': {'json': f"Invalid JSON on line {number}"}}
+            ])
+        yield record.pop('type', None), record, number
+
+
+def iter_json(stream):
+    """
+    Yields (section, record, None) from a single-document JSON export.
+
+    The document is parsed whole, so unlike the other formats it is held in
+    memory; records have no line numbers.
+    """
+    try:
+        document = json.load(io.TextIOWrapper(stream, encoding='utf-8'))
+    except json.JSONDecodeError as e:
+        raise StoryImportError([
+            {'section': None, 'id': None, 'line': e.lineno, 'errors': {'json': "Invalid JSON document"}}
+        ])
+    if not isinstance(document, dict):
+        raise StoryImportError([
+            {'section': None, 'id': None, 'line': None, 'errors': {'json': "The document must be an object"}}
+        ])
+    if 'story' in document:
+        yield 'story', document['story'], None
+    for section, *_ in SECTIONS:
+        for record in document.get(section) or []:
+            yield section, record, None
+
+
+def iter_zip(stream):
+    """Yields (section, record, line) from a zipped CSV export, a file at a time."""
+    try:
+        archive = zipfile.ZipFile(stream)
+    except zipfile.BadZipFile:
+        raise StoryImportError([
+            {'section': None, 'id': None, 'line': None, 'errors': {'file': "Not a zip archive"}}
+        ])
+    with archive:
+        for section in ['story', *(name for name, *_ in SECTIONS)]:
+            if f'{section}.csv' not in archive.namelist():
+                continue
+            with archive.open(f'{section}.csv') as entry:
+                reader = csv.DictReader(io.TextIOWrapper(entry, encoding='utf-8', newline=''))
+                for row in reader:
+                    yield section, row, reader.line_num
+
+
+def unique_story_slug(name, user):
+    """Returns the slug Story.save() would give, numbered if it is already taken."""
+    base = slugify(f"{name}-{user.username}")
+    taken = set(Story.objects.filter(slug__startswith=base).values_list('slug', flat=True))
+    slug, n = base, 1
+    while slug in taken:
+        n += 1
+        slug = f"{base}-{n}"
+    return slug
+
+
+class StoryRestore:
+    """
+    Rebuilds a story from the records of an export, in export order.
+
+    Records are buffered per section and written with bulk_create every
+    IMPORT_CHUNK_SIZE rows or when the section changes, so memory does not
+    grow with the size of the story. Seasons are inserted before anything
+    that refers to them and their new ids are mapped from the exported ones.
+    Players are resolved by FIFA player_id one chunk at a time; clubs,
+    competitions and awards are small enough to map up front.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.story = None
+        self.section = None
+        self.pending = []
+        self.seasons = {}
+        self.counts = {}
+        self.errors = []
+        self.error_count = 0
+        self.clubs = {(name, country): club_id for club_id, name, country
+                      in Club.objects.values_list('id', 'name', 'country')}
+        self.competitions = dict(Competition.objects.values_list('name', 'id'))
+        self.awards = dict(IndividualAward.objects.values_list('name', 'id'))
+
+    def error(self, section, record, errors, line=None):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'section': section, 'id': record.get('id'), 'line': line,
+                                'errors': errors})
+
+    @staticmethod
+    def value(model, name, value):
+        field = model._meta.get_field(name)
+        if value == '' and (field.null or not field.empty_strings_allowed):
+            # Empty CSV cell
+            return None if field.null else field.get_default()
+        value = field.to_python(value)
+        field.run_validators(value)
+        return value
+
+    def feed(self, section, record, line=None):
+        if section == 'story':
+            self.create_story(record, line)
+        elif section not in RESTORE_SECTIONS:
+            self.error(section, record, {'type': f"Unknown record type {section!r}"}, line)
+        elif self.story is None:
+            self.error(section, record, {'story': "The story record must come first"}, line)
+        else:
+            if section != self.section:
+                self.flush()
+                self.section = section
+            self.pending.append((line, record))
+            if len(self.pending) >= IMPORT_CHUNK_SIZE:
+                self.flush()
+
+    def finish(self):
+        self.flush()
+        if self.story is None and not self.errors:
+            self.error('story', {}, {'story': "The export has no story record"})
+        return self.story
+
+    def create_story(self, record, line=None):
+        if self.story is not None:
+            self.error('story', record, {'story': "The export holds more than one story"}, line)
+            return
+        club_id = self.clubs.get((record.get('club_name'), record.get('club_country')))
+        if club_id is None:
+            self.error('story', record, {'club': f"Unknown club {record.get('club_name')!r}"}, line)
+            return
+        try:
+            values = {name: self.value(Story, name, record[name])
+                      for name in STORY_COPY_FIELDS if name in record}
+        except ValidationError as e:
+            self.error('story', record, {'story': ' '.join(e.messages)}, line)
+            return
+        self.story = Story.objects.create(
+            user=self.user, club_id=club_id,
+            slug=unique_story_slug(values.get('name', ''), self.user), **values
+        )
+        self.counts['story'] = 1
+
+    def resolve(self, reference, record, players):
+        """Returns the new primary key a record refers to, or None."""
+        if reference == 'season':
+            return self.seasons.get(str(record.get('season')))
+        if reference == 'player':
+            return players.get(str(record.get('fifa_player_id')))
+        if reference == 'competition':
+            return self.competitions.get(record.get('competition_name'))
+        if reference == 'award':
+            return self.awards.get(record.get('award_name'))
+        return self.clubs.get((record.get(f'{reference}_name'), record.get(f'{reference}_country')))
+
+    def flush(self):
+        if not self.pending:
+            return
+        model, columns, references = RESTORE_SECTIONS[self.section]
+        records, self.pending = self.pending, []
+
+        players = {}
+        if 'player' in references:
+            ids = {str(record.get('fifa_player_id')) for _, record in records}
+            players = {str(fifa_id): player_id for fifa_id, player_id in Player.objects.filter(
+                player_id__in=[i for i in ids if i.isdigit()]
+            ).values_list('player_id', 'id')}
+        if 'award' in references:
+            # Awards are created on the fly since they are just names
+            missing = {record.get('award_name') for _, record in records} - set(self.awards) - {None, ''}
+            for award in IndividualAward.objects.bulk_create(IndividualAward(name=n) for n in missing):
+                self.awards[award.name] = award.id
+
+        instances = []
+        for line, record in records:
+            errors = {}
+            values = {}
+            for reference in references:
+                values[f'{reference}_id'] = self.resolve(reference, record, players)
+                if values[f'{reference}_id'] is None:
+                    errors[reference] = f"Unknown {reference.replace('_', ' ')}"
+            for name in columns:
+                if name in record:
+                    try:
+                        values[name] = self.value(model, name, record[name])
+                    except ValidationError as e:
+                        errors[name] = ' '.join(e.messages)
+            if errors:
+                self.error(self.section, record, errors, line)
+                continue
+            instances.append((line, record, model(story=self.story, **values)))
+
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create([instance for *_, instance in instances])
+        except IntegrityError:
+            instances = self.insert_each(model, instances)
+        if model is Season:
+            self.seasons.update({str(record.get('id')): instance.id for _, record, instance in instances})
+        self.counts[self.section] = self.counts.get(self.section, 0) + len(instances)
+
+    def insert_each(self, model, instances):
+        """
+        Inserts a chunk that broke a unique constraint one row at a time, so
+        the rows that duplicate another one are reported by line. Returns the
+        rows that were inserted.
+        """
+        inserted = []
+        for line, record, instance in instances:
+            try:
+                with transaction.atomic():
+                    model.objects.bulk_create([instance])
+            except IntegrityError:
+                self.error(self.section, record, {'row': "Duplicates another row of this section"}, line)
+            else:
+                inserted.append((line, record, instance))
+        return inserted
+
+
+def restore_story(user, stream, fmt=None):
+    """
+    Restores a story export as a new story owned by `user`.
+
+    Everything is written in one transaction with bulk inserts in dependency
+    order (story, seasons, then the rows that refer to them), with every
+    primary key remapped. Records must come in the order the export writes
+    them.
+
+    Args:
+        user (User): The owner of the restored story.
+        stream: A binary file object holding an NDJSON, JSON or zip export.
+        fmt (str): 'ndjson', 'json' or 'zip'. Detected from the content of
+            the (seekable) stream when not given.
+
+    Returns:
+        tuple: (story, counts) with the number of rows restored per section.
+
+    Raises:
+        StoryImportError: If any record is invalid, duplicates another one or
+            refers to a player, club or competition that does not exist.
+            Each error gives the record's section and line. Nothing is written.
+    """
+    fmt = fmt or detect_format(stream)
+    records = {'zip': iter_zip, 'json': iter_json}.get(fmt, iter_ndjson)(stream)
+    with transaction.atomic():
+        restore = StoryRestore(user)
+        for section, record, line in records:
+            restore.feed(section, record, line)
+        story = restore.finish()
+        if restore.errors:
+            raise StoryImportError(restore.errors, restore.error_count)
+        refresh_summary(story.id)
+    return story, restore.counts
@@ -0,0 +1,59 @@
+import base64
+import datetime
+from django.db.models import Q
+from ..models import Story
+
+# Columns needed to show a story in a list; background is fetched on demand
+LIST_FIELDS = ['id', 'name', 'club__name', 'formation', 'challenge', 'status', 'created_at']
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+def encode_cursor(story):
+    """Returns an opaque cursor pointing just after `story` in the listing."""
+    raw = f"{story.created_at.isoformat()}|{story.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, story_id = raw.split('|')
+        return datetime.datetime.fromisoformat(created_at), int(story_id)
+    except (ValueError, UnicodeDecodeError):
+        raise InvalidCursor("Invalid cursor")
+
+
+def story_page(user, cursor=None, page_size=20):
+    """
+    Returns one page of a user's stories, newest first.
+
+    Pages are found by keyset on (created_at, id) rather than OFFSET, so
+    every page is a range scan on the (user, created_at) index and costs
+    the same however many stories the user has. List rows leave out the
+    background HTML and carry their statistics as annotations, so the whole
+    page is one query.
+
+    Args:
+        user (User): The owner of the stories.
+        cursor (str): The `next_cursor` of the previous page, if any.
+        page_size (int): Stories per page.
+
+    Returns:
+        tuple: (stories, next_cursor) where next_cursor is None on the last page.
+
+    Raises:
+        InvalidCursor: If the cursor was not produced by encode_cursor.
+    """
+    stories = Story.objects.filter(user=user).select_related('club').only(*LIST_FIELDS)\
+                           .with_statistics().order_by('-created_at', '-id')
+    if cursor:
+        created_at, story_id = decode_cursor(cursor)
+        stories = stories.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=story_id))
+
+    stories = list(stories[:page_size + 1])
+    if len(stories) > page_size:
+        return stories[:page_size], encode_cursor(stories[page_size - 1])
+    return stories, None
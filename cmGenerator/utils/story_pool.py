@@ -0,0 +1,85 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from ..models import PooledStory
+from .story_generator import generate_all
+
+
+def pool_depth():
+    """Returns the number of stories ready to be served."""
+    return PooledStory.objects.filter(served_at__isnull=True).count()
+
+
+def pop_story():
+    """
+    Claims the oldest ready story from the pool.
+
+    Rows are locked with SKIP LOCKED so concurrent requests never receive
+    the same story and never wait on each other.
+
+    Returns:
+        dict: The club, formation, challenge and background, or None if the
+        pool is empty.
+    """
+    with transaction.atomic():
+        story = PooledStory.objects.select_for_update(skip_locked=True)\
+                    .filter(served_at__isnull=True)\
+                    .order_by('created_at')\
+                    .first()
+        if story is None:
+            return None
+        story.served_at = timezone.now()
+        story.save(update_fields=['served_at'])
+
+    return {
+        'club': story.club,
+        'formation': story.formation,
+        'challenge': story.challenge,
+        'background': story.background,
+    }
+
+
+def refill(target=None):
+    """
+    Generates stories until the pool holds `target` ready stories.
+
+    Returns:
+        int: The number of stories generated.
+    """
+    if target is None:
+        target = settings.STORY_POOL_SIZE
+
+    generated = 0
+    while pool_depth() < target:
+        PooledStory.objects.create(**generate_all())
+        generated += 1
+    return generated
+
+
+def prune(max_age=timedelta(days=1)):
+    """Deletes served stories older than max_age, returning the count."""
+    cutoff = timezone.now() - max_age
+    deleted, _ = PooledStory.objects.filter(served_at__lt=cutoff).delete()
+    return deleted
+
+
+def pool_stats(window=timedelta(hours=1)):
+    """
+    Returns pool depth and the refill and serve rates over `window`.
+
+    Rates are in stories per minute so they can be compared directly
+    against peak /generate/ traffic when sizing STORY_POOL_SIZE.
+    """
+    since = timezone.now() - window
+    minutes = window.total_seconds() / 60
+    generated = PooledStory.objects.filter(created_at__gte=since).count()
+    served = PooledStory.objects.filter(served_at__gte=since).count()
+
+    return {
+        'depth': pool_depth(),
+        'target': settings.STORY_POOL_SIZE,
+        'window_minutes': minutes,
+        'refill_per_minute': round(generated / minutes, 2),
+        'served_per_minute': round(served / minutes, 2),
+    }
@@ -0,0 +1,194 @@
+from django.db.models import Count, F, Q, QuerySet, Sum
+from django.utils import timezone
+from ..models import AwardWinner, CompetitionWinner, PlayerStats, Season, Story, StorySummary, Transfer
+from .background_cache import LRUCache
+from .story_version import in_story_bulk_write
+
+# The StorySummary columns maintained from each kind of story data
+PARTS = {
+    'stats': ['total_goals', 'total_assists', 'total_appearances'],
+    'transfers': ['transfer_spend', 'transfer_income'],
+    'trophies': ['trophies'],
+    'awards': ['awards'],
+}
+SUMMARY_FIELDS = [field for fields in PARTS.values() for field in fields]
+
+# A story's club is fixed when it is created, so it is looked up once per
+# story for the transfer and trophy deltas
+story_clubs = LRUCache(maxsize=1024)
+
+
+def compute_summaries(story_ids=None, parts=tuple(PARTS)):
+    """
+    Aggregates summary totals from the source tables, grouped by story.
+
+    Args:
+        story_ids (list): Stories to compute, or None for every story.
+        parts (iterable): Keys of PARTS to compute.
+
+    Returns:
+        dict: {story_id: {field: value}} for every requested story,
+        including stories with nothing to count.
+    """
+    def grouped(queryset, **aggregates):
+        if story_ids is not None:
+            queryset = queryset.filter(story_id__in=story_ids)
+        return queryset.order_by().values('story').annotate(**aggregates)
+
+    ids = story_ids if story_ids is not None else Story.objects.values_list('id', flat=True)
+    fields = [field for part in parts for field in PARTS[part]]
+    totals = {story_id: dict.fromkeys(fields, 0) for story_id in ids}
+
+    def merge(rows):
+        for row in rows:
+            story_id = row.pop('story')
+            if story_id in totals:
+                totals[story_id].update({field: value or 0 for field, value in row.items()})
+
+    if 'stats' in parts:
+        merge(grouped(PlayerStats.objects, total_goals=Sum('goals'), total_assists=Sum('assists'),
+                      total_appearances=Sum('appearances')))
+    if 'transfers' in parts:
+        merge(grouped(Transfer.objects,
+                      transfer_spend=Sum('fee', filter=Q(to_club=F('story__club'))),
+                      transfer_income=Sum('fee', filter=Q(from_club=F('story__club')))))
+    if 'trophies' in parts:
+        merge(grouped(CompetitionWinner.objects.filter(winner=F('story__club')), trophies=Count('id')))
+    if 'awards' in parts:
+        merge(grouped(AwardWinner.objects, awards=Count('id')))
+    return totals
+
+
+def refresh_summary(story_id, parts=tuple(PARTS)):
+    """
+    Recomputes some or all of one story's totals from the source tables.
+
+    Used after bulk writes, which skip the signals that apply deltas. The
+    aggregates only read the story's own rows through their story indexes.
+    """
+    totals = compute_summaries([story_id], parts)[story_id]
+    if StorySummary.objects.filter(story_id=story_id).update(updated_at=timezone.now(), **totals):
+        return
+    # No row yet, so every part is needed to create it
+    if set(parts) != set(PARTS):
+        totals = compute_summaries([story_id])[story_id]
+    StorySummary.objects.bulk_create([StorySummary(story_id=story_id, **totals)], ignore_conflicts=True)
+
+
+def adjust_summary(story_id, deltas):
+    """
+    Adds deltas to a story's totals with a single UPDATE using F()
+    expressions, so concurrent writers never overwrite each other's changes.
+    A story without a summary row yet gets one computed from scratch.
+    """
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    updated = StorySummary.objects.filter(story_id=story_id).update(
+        updated_at=timezone.now(), **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+    if not updated:
+        refresh_summary(story_id)
+
+
+def contribution(instance, club_id):
+    """Returns what one row adds to its story's summary."""
+    if isinstance(instance, PlayerStats):
+        return {'total_goals': instance.goals, 'total_assists': instance.assists,
+                'total_appearances': instance.appearances}
+    if isinstance(instance, Transfer):
+        return {'transfer_spend': instance.fee if instance.to_club_id == club_id else 0,
+                'transfer_income': instance.fee if instance.from_club_id == club_id else 0}
+    if isinstance(instance, CompetitionWinner):
+        return {'trophies': int(instance.winner_id == club_id)}
+    return {'awards': 1}
+
+
+def _club_id(instance):
+    if not isinstance(instance, (Transfer, CompetitionWinner)):
+        return None
+    club_id = story_clubs.get(instance.story_id)
+    if club_id is None:
+        club_id = Story.objects.filter(id=instance.story_id).values_list('club_id', flat=True).first()
+        story_clubs.set(instance.story_id, club_id)
+    return club_id
+
+
+def _origin_model(origin):
+    return origin.model if isinstance(origin, QuerySet) else type(origin)
+
+
+def row_saving(sender, instance, **kwargs):
+    """pre_save: remembers what the row contributed before this save."""
+    if in_story_bulk_write():
+        return
+    previous = sender.objects.filter(pk=instance.pk).first() if instance.pk else None
+    instance._summary_before = (
+        previous.story_id, contribution(previous, _club_id(previous))
+    ) if previous else None
+
+
+def row_saved(sender, instance, **kwargs):
+    """post_save: applies the difference between the row's new and old contribution."""
+    if in_story_bulk_write():
+        return
+    after = contribution(instance, _club_id(instance))
+    before = getattr(instance, '_summary_before', None)
+    if before and before[0] != instance.story_id:
+        adjust_summary(before[0], {field: -value for field, value in before[1].items()})
+        before = None
+    old = before[1] if before else {}
+    adjust_summary(instance.story_id, {field: value - old.get(field, 0) for field, value in after.items()})
+
+
+def row_deleted(sender, instance, origin=None, **kwargs):
+    """post_delete: removes the row's contribution."""
+    # Deleting the story deletes its summary too, and deleting a season
+    # refreshes it once in season_deleted
+    if in_story_bulk_write() or _origin_model(origin) in (Story, Season):
+        return
+    adjust_summary(instance.story_id, {
+        field: -value for field, value in contribution(instance, _club_id(instance)).items()
+    })
+
+
+def season_deleted(sender, instance, origin=None, **kwargs):
+    """
+    post_delete for Season: refreshes the story's totals once after the
+    season's rows are gone. Django deletes rows that point at a season
+    before the season itself, so this runs after the cascade.
+    """
+    if in_story_bulk_write() or _origin_model(origin) is Story:
+        return
+    refreshed = origin.__dict__.setdefault('_refreshed_summaries', set())
+    if instance.story_id not in refreshed:
+        refreshed.add(instance.story_id)
+        refresh_summary(instance.story_id)
+
+
+def rebuild_summaries(story_ids=None):
+    """
+    Recomputes summaries from the source tables in a handful of grouped
+    queries and writes the ones that are missing or have drifted.
+
+    Returns:
+        tuple: (created, repaired) counts.
+    """
+    totals = compute_summaries(story_ids)
+    existing = {
+        row['story']: row for row in StorySummary.objects.filter(story_id__in=list(totals))
+                                                        .values('story', *SUMMARY_FIELDS)
+    }
+    to_create, to_update = [], []
+    for story_id, values in totals.items():
+        summary = StorySummary(story_id=story_id, **values)
+        if story_id not in existing:
+            to_create.append(summary)
+        elif any(existing[story_id][field] != value for field, value in values.items()):
+            to_update.append(summary)
+
+    StorySummary.objects.bulk_create(to_create, batch_size=1000, ignore_conflicts=True)
+    for summary in to_update:
+        summary.updated_at = timezone.now()
+    StorySummary.objects.bulk_update(to_update, SUMMARY_FIELDS + ['updated_at'], batch_size=1000)
+    return len(to_create), len(to_update)
@@ -0,0 +1,77 @@
+import threading
+from contextlib import contextmanager
+from django.db.models import F
+from django.utils import timezone
+from django.views.decorators.http import condition
+from ..models import Story
+
+
+def touch_story(story_id):
+    """
+    Marks a story's data as changed by bumping its data_version and
+    updated_at, which invalidates ETags handed out for it.
+
+    Bulk writes (bulk_create, bulk_update, QuerySet.update) skip the model
+    signals, so code that writes that way calls this itself.
+    """
+    Story.objects.filter(id=story_id).update(
+        data_version=F('data_version') + 1, updated_at=timezone.now()
+    )
+
+
+_bulk_write = threading.local()
+
+
+@contextmanager
+def story_bulk_write():
+    """
+    Silences the per-row signal handlers that keep a story's data_version
+    and summary up to date, for code that writes many rows at once and then
+    calls touch_story and refresh_summary once itself.
+    """
+    depth = getattr(_bulk_write, 'depth', 0)
+    _bulk_write.depth = depth + 1
+    try:
+        yield
+    finally:
+        _bulk_write.depth = depth
+
+
+def in_story_bulk_write():
+    return getattr(_bulk_write, 'depth', 0) > 0
+
+
+def _story_state(request, story_id):
+    # condition() asks for the ETag and Last-Modified separately, so the
+    # lookup is remembered on the request to keep it to one query
+    states = request.__dict__.setdefault('_story_states', {})
+    if story_id not in states:
+        states[story_id] = None
+        if request.user.is_authenticated:
+            states[story_id] = Story.objects.filter(id=story_id, user=request.user)\
+                                            .values('data_version', 'updated_at').first()
+    return states[story_id]
+
+
+def story_data_version(request, story_id):
+    """Returns the data_version read for the ETag check, or None if the
+    story does not exist or belongs to someone else."""
+    state = _story_state(request, story_id)
+    return state['data_version'] if state else None
+
+
+def story_etag(request, story_id, **kwargs):
+    state = _story_state(request, story_id)
+    if state is None:
+        return None
+    return f"story-{story_id}-{state['data_version']}-{int(state['updated_at'].timestamp() * 1000000)}"
+
+
+def story_last_modified(request, story_id, **kwargs):
+    state = _story_state(request, story_id)
+    return state['updated_at'] if state else None
+
+
+# Answers GET requests for a story's data with 304 Not Modified when the
+# client's ETag or Last-Modified still matches, before the view runs
+story_condition = condition(etag_func=story_etag, last_modified_func=story_last_modified)
@@ -0,0 +1,150 @@
+import datetime
+from decimal import Decimal, InvalidOperation
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from ..models import Club, Player, Transfer
+from .season_stats import as_id
+from .story_summary import refresh_summary
+from .story_version import story_bulk_write, touch_story
+
+# Editable Transfer columns that are plain values rather than foreign keys
+VALUE_FIELDS = ['fee', 'fee_currency', 'transfer_date']
+FOREIGN_KEYS = {'player': 'player_id', 'from_club': 'from_club_id', 'to_club': 'to_club_id'}
+
+
+class TransferValidationError(Exception):
+    """Raised with per-operation errors when a transfer batch fails validation."""
+
+    def __init__(self, errors):
+        super().__init__("Invalid transfers")
+        self.errors = errors
+
+
+def parse_transfer_value(field, value):
+    """Converts a submitted transfer value to the column's type, raising ValueError if it can't."""
+    if field == 'fee':
+        try:
+            return Decimal(str(value if value is not None else 0).strip().lstrip('€£$').replace(',', '') or 0)
+        except InvalidOperation:
+            raise ValueError("fee must be a number")
+    if field == 'transfer_date':
+        try:
+            return datetime.date.fromisoformat(str(value))
+        except ValueError:
+            raise ValueError("transfer_date must be YYYY-MM-DD")
+    value = str(value or 'EUR').upper()
+    if len(value) != 3:
+        raise ValueError("fee_currency must be a 3 letter code")
+    return value
+
+
+def apply_transfer_batch(story, operations):
+    """
+    Applies a list of create, update and delete operations to a story's transfers.
+
+    Operations look like {"op": "create", "transfer": {...}},
+    {"op": "update", "transfer": {"id": ..., ...}} or {"op": "delete", "id": ...}.
+    Transfers reference `season` by name and `player`, `from_club` and
+    `to_club` by id. All foreign keys are resolved with one query per table,
+    everything is validated before writing, and the writes are one DELETE,
+    one bulk UPDATE and one bulk INSERT inside a single transaction.
+
+    Returns:
+        list: The transfer id each operation touched, in operation order.
+
+    Raises:
+        TransferValidationError: If any operation is invalid. Nothing is written.
+    """
+    def transfer_of(operation):
+        return operation.get('transfer') or {}
+
+    seasons = {season.name: season.id for season in story.seasons.all()}
+    existing_ids = {as_id(transfer_of(op).get('id') or op.get('id')) for op in operations} - {None}
+    existing = {t.id: t for t in Transfer.objects.filter(story=story, id__in=existing_ids)}
+    players = set(Player.objects.filter(
+        id__in={as_id(transfer_of(op).get('player')) for op in operations} - {None}
+    ).values_list('id', flat=True))
+    clubs = set(Club.objects.filter(
+        id__in={as_id(transfer_of(op).get(key)) for op in operations
+                for key in ('from_club', 'to_club')} - {None}
+    ).values_list('id', flat=True))
+    known = {'player': players, 'from_club': clubs, 'to_club': clubs}
+
+    errors = []
+    to_create, to_update, to_delete = [], [], []
+    results = [None] * len(operations)
+    for index, operation in enumerate(operations):
+        op = operation.get('op')
+        data = transfer_of(operation)
+        op_errors = {}
+
+        if op == 'delete':
+            transfer_id = as_id(operation.get('id') or data.get('id'))
+            if transfer_id not in existing:
+                op_errors['id'] = f"Transfer {transfer_id} does not exist in this story"
+            else:
+                to_delete.append(transfer_id)
+                results[index] = transfer_id
+        elif op in ('create', 'update'):
+            if op == 'update':
+                instance = existing.get(as_id(data.get('id')))
+                if instance is None:
+                    op_errors['id'] = f"Transfer {data.get('id')} does not exist in this story"
+            else:
+                instance = Transfer(story=story, fee_currency='EUR')
+
+            if instance is not None:
+                if 'season' in data or op == 'create':
+                    if data.get('season') not in seasons:
+                        op_errors['season'] = f"Unknown season {data.get('season')!r}"
+                    else:
+                        instance.season_id = seasons[data['season']]
+                for key, attname in FOREIGN_KEYS.items():
+                    if key in data or op == 'create':
+                        if as_id(data.get(key)) not in known[key]:
+                            op_errors[key] = f"Unknown {key.replace('_', ' ')} {data.get(key)!r}"
+                        else:
+                            setattr(instance, attname, as_id(data[key]))
+                for field in VALUE_FIELDS:
+                    if field in data or (op == 'create' and field != 'fee_currency'):
+                        try:
+                            value = parse_transfer_value(field, data.get(field))
+                            # max_digits and decimal_places, which Postgres would reject
+                            Transfer._meta.get_field(field).run_validators(value)
+                            setattr(instance, field, value)
+                        except ValueError as e:
+                            op_errors[field] = str(e)
+                        except ValidationError as e:
+                            op_errors[field] = ' '.join(e.messages)
+
+            if not op_errors:
+                instance.op_index = index
+                (to_create if op == 'create' else to_update).append(instance)
+        else:
+            op_errors['op'] = "op must be create, update or delete"
+
+        if op_errors:
+            errors.append({'operation': index, 'errors': op_errors})
+
+    if set(to_delete) & {t.id for t in to_update}:
+        errors.append({'operation': None, 'errors': {'id': "A transfer cannot be updated and deleted together"}})
+    if errors:
+        raise TransferValidationError(errors)
+
+    # The per-row signal handlers stand aside; the story is touched and its
+    # summary refreshed once below
+    with transaction.atomic(), story_bulk_write():
+        if to_delete:
+            Transfer.objects.filter(story=story, id__in=to_delete).delete()
+        if to_update:
+            Transfer.objects.bulk_update(
+                to_update, ['season', *FOREIGN_KEYS, *VALUE_FIELDS]
+            )
+        if to_create:
+            Transfer.objects.bulk_create(to_create)
+        touch_story(story.id)
+        refresh_summary(story.id, ['transfers'])
+
+    for instance in to_update + to_create:
+        results[instance.op_index] = instance.id
+    return results
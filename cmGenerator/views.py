@@ -1,21 +1,41 @@
 import json
 from django.shortcuts import render, redirect
+from django.template.loader import render_to_string
 from django.contrib.auth.forms import UserCreationForm
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib.auth import authenticate, login
 from django.contrib.auth import logout
 from django.shortcuts import get_object_or_404
-from django.http import HttpRequest
+from django.urls import reverse
+from django.http import HttpRequest, Http404
 import os
-from .models import Season, Story
-from .utils.story_generator import generate_all
+import time
+from .models import Season, Story, StorySummary, GenerationJob
+from .utils.story_generator import generate_all, pick_story_elements, stream_club_background
+from .utils.story_pool import pop_story, pool_stats
+from .utils.llm_client import LLMUnavailable
+from .utils.job_queue import enqueue, QueueFull
+from .utils.transfers import apply_transfer_batch, TransferValidationError
+from .utils.stats_import import import_player_stats
+from .utils.story_export import export_story, EXPORT_FORMATS
+from .utils.story_import import restore_story, StoryImportError
+from .utils.season_payload import season_payload, split_transfers
+from .utils.story_version import story_condition, story_data_version
+from .utils.leaderboards import get_leaderboards
+from .utils.story_listing import story_page, InvalidCursor
+from .utils.story_summary import refresh_summary
+from .utils.season_stats import (
+    save_player_stats, apply_stat_changes, as_id, StatsValidationError, StatsConflict
+)
 from django.views.decorators.http import require_http_methods
 from .models import Transfer
 from django.core.exceptions import ValidationError
+from django.db import DataError, IntegrityError
 import re
 
 def index(request: HttpRequest) -> HttpResponse:
@@ -41,7 +61,26 @@ def generate_story(request: HttpRequest) -> JsonResponse:
         JsonResponse: A JSON response with the generated story data or an error message.
     """
     if request.method == "POST":
-        data = generate_all()  # Generate new story data
+        # ?refresh=1 skips the background cache and regenerates. Anyone can
+        # call this view, so only staff may force the LLM calls
+        refresh = request.user.is_staff and request.GET.get('refresh') in ('1', 'true')
+
+        # Serve a pre-generated story when the pool has one ready
+        data = None if refresh else pop_story()
+
+        if request.GET.get('async') in ('1', 'true'):
+            return enqueue_story_response(data, refresh=refresh)
+
+        if wants_stream(request):
+            return stream_story_response(data or pick_story_elements(), refresh=refresh)
+
+        if data is None:
+            try:
+                data = generate_all(refresh=refresh)  # Generate new story data
+            except LLMUnavailable as e:
+                response = JsonResponse({"error": str(e)}, status=503)
+                response['Retry-After'] = str(settings.LLM_BREAKER_RESET)
+                return response
 
         return JsonResponse({
             "success": True,
@@ -53,6 +92,153 @@ def generate_story(request: HttpRequest) -> JsonResponse:
 
     return JsonResponse({"error": "Invalid request"}, status=400)
 
+def wants_stream(request: HttpRequest) -> bool:
+    """
+    Checks whether the client asked for a streamed (SSE) response.
+    
+    Args:
+        request (HttpRequest): The request object.
+    
+    Returns:
+        bool: True if the request has ?stream=1 or accepts text/event-stream.
+    """
+    if request.GET.get('stream') in ('1', 'true'):
+        return True
+    return 'text/event-stream' in request.headers.get('Accept', '')
+
+def sse_event(event: str, payload: dict) -> str:
+    """
+    Formats a single server-sent event with a JSON payload.
+    """
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+def stream_story_response(data: dict, refresh: bool = False) -> StreamingHttpResponse:
+    """
+    Streams a story as server-sent events.
+    
+    The club, formation and challenge are sent straight away in a 'story'
+    event, followed by 'background' events carrying chunks of HTML as the
+    model produces them, and a final 'done' event with the full background.
+    
+    Args:
+        data (dict): The club, formation and challenge for the story, plus
+            the background if it has already been generated.
+        refresh (bool): Regenerate the background even if it is cached.
+    
+    Returns:
+        StreamingHttpResponse: A text/event-stream response.
+    """
+    def events():
+        story = {key: data[key] for key in ('club', 'formation', 'challenge')}
+        yield sse_event('story', {"success": True, **story})
+        if data.get('background'):
+            # Pre-generated story, nothing left to wait for
+            yield sse_event('background', {"html": data['background']})
+            yield sse_event('done', {"background": data['background']})
+            return
+
+        chunks = []
+        try:
+            for chunk in stream_club_background(data['club'], refresh=refresh):
+                chunks.append(chunk)
+                yield sse_event('background', {"html": chunk})
+        except Exception as e:
+            yield sse_event('error', {"error": str(e)})
+            return
+        yield sse_event('done', {"background": ''.join(chunks)})
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Stop nginx from buffering the stream
+    return response
+
+def enqueue_story_response(data, refresh: bool = False) -> JsonResponse:
+    """
+    Queues a story generation and returns the job id without waiting.
+    
+    Args:
+        data (dict): A finished story from the pool, or None to queue one.
+        refresh (bool): Regenerate the background even if it is cached.
+    
+    Returns:
+        JsonResponse: 202 with the job id and status URL, or 429 with a
+        Retry-After header when the queue is full.
+    """
+    try:
+        job = enqueue(refresh=refresh, story=data)
+    except QueueFull as e:
+        response = JsonResponse({"success": False, "error": str(e)}, status=429)
+        response['Retry-After'] = str(settings.GENERATION_QUEUE_RETRY_AFTER)
+        return response
+
+    return JsonResponse({
+        "success": True,
+        "job_id": str(job.id),
+        "status": job.status,
+        "status_url": reverse('generation_job', args=[job.id]),
+    }, status=202)
+
+@require_http_methods(["GET"])
+def generation_job(request: HttpRequest, job_id) -> HttpResponse:
+    """
+    Returns the state of a queued generation.
+    
+    With ?stream=1 (or Accept: text/event-stream) the response is a stream of
+    'status' events ending with a 'done' or 'error' event once the job finishes.
+    The stream closes after GENERATION_STREAM_SECONDS so it never holds a web
+    worker for a whole generation; EventSource reconnects on its own and
+    picks up the job's current state.
+    
+    Args:
+        request (HttpRequest): The request object.
+        job_id (UUID): The job id returned by /generate/?async=1.
+    
+    Returns:
+        HttpResponse: A JSON response with the job, or an event stream.
+    """
+    job = get_object_or_404(GenerationJob, id=job_id)
+
+    if not wants_stream(request):
+        return JsonResponse({"success": True, **job.as_dict()})
+
+    def events():
+        current = job
+        last_status = None
+        deadline = time.monotonic() + settings.GENERATION_STREAM_SECONDS
+        yield f"retry: {settings.GENERATION_STREAM_RETRY_MS}\n\n"
+        while True:
+            if current.status != last_status:
+                yield sse_event('status', {"status": current.status})
+                last_status = current.status
+            if current.status == 'DONE':
+                yield sse_event('done', current.as_dict())
+                return
+            if current.status == 'FAILED':
+                yield sse_event('error', {"error": current.error})
+                return
+            if time.monotonic() >= deadline:
+                return
+            time.sleep(0.5)
+            current = GenerationJob.objects.get(id=job_id)
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+@staff_member_required
+def story_pool_status(request: HttpRequest) -> JsonResponse:
+    """
+    Reports the depth and refill rate of the pre-generated story pool.
+    
+    Args:
+        request (HttpRequest): The request object.
+    
+    Returns:
+        JsonResponse: Pool depth, target size and per-minute refill and serve rates.
+    """
+    return JsonResponse({'success': True, **pool_stats()})
+
 @login_required
 def save_story(request: HttpRequest) -> JsonResponse:
     """
@@ -91,100 +277,162 @@ def save_story(request: HttpRequest) -> JsonResponse:
 
 @login_required
 def save_season_stats(request, story_id):
+    """
+    Saves the season stats table in a single transaction.
+    
+    The payload is {"stats": [...]} where each row has the stat columns plus
+    either the `id` of an existing PlayerStats row or a `season` name and
+    `player` id for a new one. The whole payload is validated before
+    anything is written.
+    
+    Args:
+        request (HttpRequest): The request object.
+        story_id (int): The story the stats belong to.
+    
+    Returns:
+        JsonResponse: The PlayerStats id of every row in payload order, or
+        per-row validation errors.
+    """
     if request.method == 'POST':
         try:
             data = json.loads(request.body)
             stats = data.get('stats', [])
             story = get_object_or_404(Story, id=story_id, user=request.user)
-            
-            new_player_id = None  # Initialize variable to store new player ID
-            
-            for stat in stats:
-                stat_id = stat.get('id')
-                player_name = stat.get('player_name')
-                season = stat.get('season')
-
-                # Skip if player name is empty
-                if not player_name:
-                    continue
-
-                # Prepare the stat data
-                stat_data = {
-                    'player_name': player_name,
-                    'season': season,
-                    'overall_rating': int(stat.get('overall_rating', 0)),
-                    'appearances': int(stat.get('appearances', 0)),
-                    'goals': int(stat.get('goals', 0)),
-                    'assists': int(stat.get('assists', 0)),
-                    'clean_sheets': int(stat.get('clean_sheets', 0)),
-                    'red_cards': int(stat.get('red_cards', 0)),
-                    'yellow_cards': int(stat.get('yellow_cards', 0)),
-                    'average_rating': float(stat.get('average_rating', 0))
-                }
 
-                if stat_id and int(stat_id) > 0:
-                    # Update existing stat
-                    SeasonPlayerStats.objects.filter(
-                        id=stat_id, 
-                        story=story
-                    ).update(**stat_data)
-                else:
-                    # Create new stat
-                    new_stat = SeasonPlayerStats.objects.create(
-                        story=story,
-                        **stat_data
-                    )
-                    new_player_id = new_stat.id
-
-            # Include the new player ID in the response
-            response_data = {'success': True}
-            if new_player_id:
-                response_data['new_player_id'] = new_player_id
-                
+            ids = save_player_stats(story, stats)
+
+            response_data = {'success': True, 'ids': ids}
+            # Older clients read the id of the row they added from here
+            new_ids = [stat_id for row, stat_id in zip(stats, ids)
+                       if stat_id and not as_id(row.get('id'))]
+            if new_ids:
+                response_data['new_player_id'] = new_ids[-1]
+
             return JsonResponse(response_data)
-            
+
+        except StatsValidationError as e:
+            return JsonResponse({'success': False, 'error': str(e), 'errors': e.errors}, status=400)
         except Exception as e:
             return JsonResponse({'success': False, 'error': str(e)}, status=400)
     
     return JsonResponse({'success': False, 'message': 'Invalid request method'}, status=405)
 
 @login_required
-def season_stats(request, story_id):
+@require_http_methods(["POST", "PATCH"])
+def patch_season_stats(request, story_id):
+    """
+    Saves only the changed cells of the season stats table.
+    
+    The payload is {"changes": [{"id": ..., "version": ..., "fields": {...}}]}
+    where `version` is the row version the client last saw. If any row has
+    been changed since, nothing is written and the current values of the
+    stale rows are returned with a 409 so the client can merge them.
+    
+    Args:
+        request (HttpRequest): The request object.
+        story_id (int): The story the stats belong to.
+    
+    Returns:
+        JsonResponse: The new version of each changed row, per-row
+        validation errors (400), or the conflicting rows (409).
+    """
     story = get_object_or_404(Story, id=story_id, user=request.user)
-    season = request.GET.get('season')
+    try:
+        data = json.loads(request.body)
+        versions = apply_stat_changes(story, data.get('changes', []))
+    except StatsValidationError as e:
+        return JsonResponse({'success': False, 'error': str(e), 'errors': e.errors}, status=400)
+    except StatsConflict as e:
+        return JsonResponse({'success': False, 'error': str(e), 'conflicts': e.conflicts}, status=409)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
 
-    # Always get seasons from Season model
-    seasons = Season.objects.filter(story=story).values('season').distinct()
+    return JsonResponse({'success': True, 'versions': versions})
 
-    # If no season specified, get the most recent one
-    if not season and seasons.exists():
-        season = seasons.order_by('-season').first()['season']
-    elif not season:  # If still no season (no seasons exist at all)
-        season = None
+@login_required
+@require_http_methods(["POST"])
+def import_season_stats(request, story_id):
+    """
+    Imports an uploaded CSV or JSON file of player stats into a season.
+    
+    The upload is a multipart form with `file`, the `season` name and an
+    optional `format` ('csv' or 'json', otherwise taken from the file name).
+    Rows identify players by FIFA player_id. Invalid rows are skipped and
+    reported; the rest are imported.
+    
+    Args:
+        request (HttpRequest): The request object.
+        story_id (int): The story to import into.
+    
+    Returns:
+        JsonResponse: Row, import and error counts plus per-row errors.
+    """
+    story = get_object_or_404(Story, id=story_id, user=request.user)
+    upload = request.FILES.get('file')
+    if upload is None:
+        return JsonResponse({'success': False, 'error': 'No file uploaded'}, status=400)
+    season = Season.objects.filter(story=story, name=request.POST.get('season')).first()
+    if season is None:
+        return JsonResponse({'success': False, 'error': 'Unknown season'}, status=400)
+
+    fmt = request.POST.get('format') or ('json' if upload.name.endswith(('.json', '.jsonl', '.ndjson')) else 'csv')
+    try:
+        # Large uploads are spooled to a temporary file by Django and read
+        # back as a stream, so the file is never held in memory.
+        with upload.open('rb') as stream:
+            result = import_player_stats(story, season, stream, fmt=fmt)
+    except (ValueError, UnicodeDecodeError) as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
 
-    # Rest of the view remains the same...
+    return JsonResponse({'success': True, **result})
 
-    # Get player stats for the selected season
-    season_stats = SeasonPlayerStats.objects.filter(story=story, season=season)
+@login_required
+@require_http_methods(["GET"])
+@story_condition
+def season_stats_payload(request, story_id):
+    """
+    Returns everything the season stats page needs for one season.
     
-    # Get season awards
-    try:
-        season_awards = SeasonAwards.objects.get(story=story, season=season)
-    except SeasonAwards.DoesNotExist:
-        season_awards = None
+    Replaces separate requests for seasons, stats, awards and transfers with
+    a single response built from a fixed number of queries. Answers 304 Not
+    Modified while the story's data_version is unchanged.
     
-    # Get transfers for the selected season
-    transfers_in = Transfer.objects.filter(story=story, season=season, direction='in')
-    transfers_out = Transfer.objects.filter(story=story, season=season, direction='out')
+    Args:
+        request (HttpRequest): The request object. `?season=` picks the
+            season by name; otherwise the current season is used.
+        story_id (int): The story to load.
     
+    Returns:
+        JsonResponse: The seasons, the selected season's player stats,
+        transfers in and out, competition winners and award winners.
+    """
+    story = get_object_or_404(Story.objects.select_related('club'), id=story_id, user=request.user)
+    payload = season_payload(story, request.GET.get('season'))
+    if request.GET.get('season') and payload['selected_season'] is None:
+        return JsonResponse({'success': False, 'error': 'Unknown season'}, status=404)
+    return JsonResponse({'success': True, **payload})
+
+@login_required
+@require_http_methods(["GET"])
+def season_stats(request, story_id):
+    """
+    Renders the season stats page.
+    
+    The page is only a shell: its seasons, player stats, transfers and
+    awards are loaded by the page itself from season_stats_payload.
+    
+    Args:
+        request (HttpRequest): The request object. `?season=` picks the
+            season to show by name.
+        story_id (int): The story to show.
+    
+    Returns:
+        HttpResponse: The rendered season stats page.
+    """
+    story = get_object_or_404(Story.objects.select_related('club'), id=story_id, user=request.user)
     return render(request, 'cmGenerator/season_stats.html', {
         'story': story,
-        'seasons': seasons,
-        'selected_season': season,
-        'season_stats': season_stats,
-        'season_awards': season_awards,
-        'transfers_in': transfers_in,
-        'transfers_out': transfers_out,
+        'selected_season': request.GET.get('season', ''),
     })
 
 def register(request: HttpRequest) -> HttpResponse:
@@ -249,16 +497,131 @@ def custom_logout(request: HttpRequest) -> HttpResponse:
 @login_required
 def my_stories(request: HttpRequest) -> HttpResponse:
     """
-    Displays the stories created by the logged-in user.
+    Displays the stories created by the logged-in user, a page at a time.
+    
+    Args:
+        request (HttpRequest): The request object. `?cursor=` continues from
+            an earlier page and `?format=json` returns the page as JSON for
+            infinite scroll.
+    
+    Returns:
+        HttpResponse: The page displaying the user's stories, or a JSON
+        response with the stories, their rendered cards and the next cursor.
+    """
+    try:
+        stories, next_cursor = story_page(
+            request.user, request.GET.get('cursor'), page_size=settings.MY_STORIES_PAGE_SIZE
+        )
+    except InvalidCursor as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'success': True,
+            'stories': [{
+                'id': story.id,
+                'name': story.name,
+                'club': story.club.name,
+                'formation': story.formation,
+                'challenge': story.challenge,
+                'status': story.status,
+                'created_at': story.created_at,
+                'seasons': story.season_count,
+                'trophies': story.trophy_count,
+                'transfers': story.transfer_count,
+                'current_season': story.current_season_name,
+            } for story in stories],
+            'html': ''.join(
+                render_to_string('cmGenerator/story_card.html', {'story': story}, request=request)
+                for story in stories
+            ),
+            'next_cursor': next_cursor,
+        })
+
+    return render(request, 'cmGenerator/my_stories.html', {'stories': stories, 'next_cursor': next_cursor})
+
+@login_required
+@require_http_methods(["GET"])
+@story_condition
+def story_summary(request, story_id):
+    """
+    Returns a story's dashboard totals from its StorySummary row.
     
     Args:
         request (HttpRequest): The request object.
+        story_id (int): The story to summarize.
+    
+    Returns:
+        JsonResponse: Goals, assists, appearances, trophies, awards and
+        transfer spend, income and net spend.
+    """
+    story = get_object_or_404(Story.objects.only('id'), id=story_id, user=request.user)
+    summary = StorySummary.objects.filter(story=story).first()
+    if summary is None:
+        refresh_summary(story.id)
+        summary = StorySummary.objects.get(story=story)
+
+    return JsonResponse({
+        'success': True,
+        'total_goals': summary.total_goals,
+        'total_assists': summary.total_assists,
+        'total_appearances': summary.total_appearances,
+        'trophies': summary.trophies,
+        'awards': summary.awards,
+        'transfer_spend': summary.transfer_spend,
+        'transfer_income': summary.transfer_income,
+        'net_spend': summary.net_spend,
+    })
+
+@login_required
+@require_http_methods(["GET"])
+def story_background(request, story_id):
+    """
+    Returns a story's background HTML, which the story list leaves out.
+    
+    Args:
+        request (HttpRequest): The request object.
+        story_id (int): The story to read.
+    
+    Returns:
+        JsonResponse: The background HTML.
+    """
+    story = get_object_or_404(Story.objects.only('background'), id=story_id, user=request.user)
+    return JsonResponse({'success': True, 'background': story.background})
+
+@login_required
+@require_http_methods(["GET"])
+@story_condition
+def story_leaderboards(request, story_id):
+    """
+    Returns a story's all-time leaderboards for goals, assists, appearances,
+    clean sheets and average rating, summed across every season.
+    
+    The boards are computed in one query and cached until the story's
+    data_version changes, so repeat requests cost only the version lookup
+    that the ETag check makes anyway.
+    
+    Args:
+        request (HttpRequest): The request object. `?limit=` sets the
+            players per board, up to LEADERBOARD_MAX_SIZE.
+        story_id (int): The story to rank.
     
     Returns:
-        HttpResponse: The page displaying the user's stories.
+        JsonResponse: One ranked list of players per leaderboard.
     """
-    stories = Story.objects.filter(user=request.user).order_by('-created_at')  # Get only user's stories
-    return render(request, 'cmGenerator/my_stories.html', {'stories': stories})
+    data_version = story_data_version(request, story_id)
+    if data_version is None:
+        raise Http404("No Story matches the given query.")
+    try:
+        limit = int(request.GET.get('limit', settings.LEADERBOARD_SIZE))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'limit must be a number'}, status=400)
+    if not 1 <= limit <= settings.LEADERBOARD_MAX_SIZE:
+        return JsonResponse({
+            'success': False, 'error': f'limit must be between 1 and {settings.LEADERBOARD_MAX_SIZE}'
+        }, status=400)
+
+    return JsonResponse({'success': True, 'leaderboards': get_leaderboards(story_id, data_version, limit)})
 
 @login_required
 def add_season(request, story_id):
@@ -362,6 +725,35 @@ def save_transfer(request, story_id):
             'error': str(e)
         }, status=400)
 
+@login_required
+@require_http_methods(["POST"])
+def batch_transfers(request, story_id):
+    """
+    Applies several transfer creates, updates and deletes in one request.
+    
+    The payload is {"operations": [...]} where each operation is
+    {"op": "create" | "update", "transfer": {...}} or {"op": "delete", "id": ...}.
+    All operations succeed or fail together.
+    
+    Args:
+        request (HttpRequest): The request object.
+        story_id (int): The story the transfers belong to.
+    
+    Returns:
+        JsonResponse: The transfer id touched by each operation, or
+        per-operation validation errors.
+    """
+    story = get_object_or_404(Story, id=story_id, user=request.user)
+    try:
+        data = json.loads(request.body)
+        ids = apply_transfer_batch(story, data.get('operations', []))
+    except TransferValidationError as e:
+        return JsonResponse({'success': False, 'error': str(e), 'errors': e.errors}, status=400)
+    except (IntegrityError, DataError, ValueError) as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+    return JsonResponse({'success': True, 'transfer_ids': ids})
+
 @require_http_methods(["POST"])
 def delete_transfer(request, story_id):
     try:
@@ -381,23 +773,19 @@ def delete_transfer(request, story_id):
             'error': str(e)
         }, status=400)
 
+@login_required
 @require_http_methods(["GET"])
+@story_condition
 def get_transfers(request, story_id):
     try:
+        story = Story.objects.select_related('club').get(id=story_id, user=request.user)
         season = request.GET.get('season')
         
-        # Get transfers for the season
-        transfers_in = Transfer.objects.filter(
-            story_id=story_id,
-            season=season,
-            direction='in'
-        ).values('id', 'player_name', 'club', 'fee')
-        
-        transfers_out = Transfer.objects.filter(
-            story_id=story_id,
-            season=season,
-            direction='out'
-        ).values('id', 'player_name', 'club', 'fee')
+        # Get transfers for the season, split by direction relative to the story's club
+        transfers = Transfer.objects.filter(story=story, season__name=season)\
+                        .select_related('player', 'from_club', 'to_club')\
+                        .order_by('transfer_date', 'id')
+        transfers_in, transfers_out = split_transfers(story, transfers)
         
         return JsonResponse({
             'success': True,
@@ -410,6 +798,7 @@ def get_transfers(request, story_id):
             'error': str(e)
         }, status=400)
 
+@story_condition
 def get_seasons(request, story_id):
     if request.method == 'GET':
         try:
@@ -419,8 +808,8 @@ def get_seasons(request, story_id):
             
             # Get seasons from Season model
             seasons = Season.objects.filter(story=story)\
-                          .values_list('season', flat=True)\
-                          .distinct()
+                          .order_by('season_number')\
+                          .values_list('name', flat=True)
             
             return JsonResponse({'success': True, 'seasons': list(seasons)})
             
@@ -431,3 +820,64 @@ def get_seasons(request, story_id):
             
     return JsonResponse({'success': False, 'error': 'Invalid request method'})
 
+@login_required
+@require_http_methods(["GET"])
+def export_story_view(request, story_id):
+    """
+    Streams a whole story as a download.
+    
+    The story, its seasons, player and competition stats, transfers,
+    competition winners and award winners are read through server-side
+    cursors and written out as they are fetched, so memory use stays flat
+    however many seasons the story has.
+    
+    Args:
+        request (HttpRequest): The request object. `?format=` picks 'ndjson'
+            (the default), 'json' or 'zip' (one CSV per section).
+        story_id (int): The story to export.
+    
+    Returns:
+        StreamingHttpResponse: The export as an attachment.
+    """
+    story = get_object_or_404(Story, id=story_id, user=request.user)
+    fmt = request.GET.get('format', 'ndjson')
+    if fmt not in EXPORT_FORMATS:
+        return JsonResponse({'success': False, 'error': 'Unknown export format'}, status=400)
+
+    content_type, extension = EXPORT_FORMATS[fmt]
+    response = StreamingHttpResponse(export_story(story, fmt), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{story.slug or story.id}.{extension}"'
+    return response
+
+@login_required
+@require_http_methods(["POST"])
+def import_story(request):
+    """
+    Restores an uploaded story export as a new story for the current user.
+    
+    The upload is a multipart form with `file`, an NDJSON, JSON or zip
+    export from export_story_view. The file is read as a stream and written
+    in one transaction, so either the whole story is restored or nothing is.
+    
+    Args:
+        request (HttpRequest): The request object.
+    
+    Returns:
+        JsonResponse: The new story id and the rows restored per section,
+        or the error count and per-record errors with status 400.
+    """
+    upload = request.FILES.get('file')
+    if upload is None:
+        return JsonResponse({'success': False, 'error': 'No file uploaded'}, status=400)
+
+    try:
+        # The format is told from the content, not the file name
+        with upload.open('rb') as stream:
+            story, counts = restore_story(request.user, stream)
+    except StoryImportError as e:
+        return JsonResponse({'success': False, 'error': str(e), 'error_count': e.error_count,
+                             'errors': e.errors}, status=400)
+    except UnicodeDecodeError:
+        return JsonResponse({'success': False, 'error': 'The file is not UTF-8'}, status=400)
+
+    return JsonResponse({'success': True, 'story_id': story.id, 'counts': counts})